@@ -0,0 +1,6 @@
+"""
+Бенчмарки сервисных функций на синтетических данных клиники.
+
+generator — детерминированный генератор владельцев, пациентов, врачей и записей и загрузка их в БД;
+run — замер функций сервисов и сохранение результатов в JSON.
+"""
@@ -0,0 +1,159 @@
+import argparse
+import http.client
+import json
+import threading
+import time
+from datetime import date, datetime
+from http import HTTPStatus
+from typing import Any, Optional
+
+from benchmarks.booking_load import BookingLoad, build_arg_parser, build_report, console, render_report
+from benchmarks.run import RESULTS_DIR, git_revision
+from db.database import Database
+from services.appointment_service import SlotTakenError
+
+
+class ApiResponseError(Exception):
+    """Ответ API с неожиданным статусом"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class ApiBookingLoad(BookingLoad):
+    """
+    Сценарий BookingLoad через HTTP JSON API (server.py): слоты — GET /doctors/<id>/availability,
+    запись — POST /appointments, отмена — DELETE /appointments/<id>.
+
+    Каждая сессия держит свое keep-alive соединение с сервером. БД клиент читает только
+    при подготовке (врачи, диапазон id пациентов, шаблоны расписаний для стратегии BLIND).
+    """
+
+    ERRORS = (ApiResponseError, http.client.HTTPException, OSError, ValueError)
+
+    def __init__(self, db: Database, api_host: str, api_port: int, timeout: float = 30.0, **options):
+        super().__init__(db, **options)
+        self.api_host = api_host
+        self.api_port = api_port
+        self.timeout = timeout
+        self._local = threading.local() # соединение с API у каждой сессии свое
+
+    def _request(self, method: str, path: str, body: Optional[dict] = None) -> tuple[int, Any]:
+        """Выполняет запрос к API на соединении сессии; возвращает (статус, разобранный JSON)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.api_host, self.api_port, timeout=self.timeout)
+
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            response = conn.getresponse()
+            payload = json.loads(response.read() or b"null")
+        except (http.client.HTTPException, OSError):
+            # разорванное соединение не переиспользуем: следующий запрос откроет новое
+            conn.close()
+            self._local.conn = None
+            raise
+
+        if response.will_close:
+            conn.close()
+            self._local.conn = None
+        return response.status, payload
+
+    def _free_slots(self, doctor_id: int, day: date) -> list[datetime]:
+        status, payload = self._request("GET", f"/doctors/{doctor_id}/availability?start={day.isoformat()}&days=1")
+        if status != HTTPStatus.OK:
+            raise ApiResponseError(status, payload.get("error", ""))
+        return [datetime.fromisoformat(slot) for slot in payload.get(day.isoformat(), [])]
+
+    def _book(self, patient_id: int, doctor_id: int, slot: datetime) -> int:
+        status, payload = self._request("POST", "/appointments", {
+            "patient_id": patient_id,
+            "doctor_id": doctor_id,
+            "date_time": slot.isoformat()
+        })
+        if status == HTTPStatus.CONFLICT:
+            raise SlotTakenError(payload.get("error", ""))
+        if status != HTTPStatus.CREATED:
+            raise ApiResponseError(status, payload.get("error", ""))
+        return payload["id"]
+
+    def _cancel(self, appointment_id: int, slot: datetime) -> bool:
+        status, payload = self._request("DELETE", f"/appointments/{appointment_id}?date_time={slot.isoformat()}")
+        if status not in (HTTPStatus.OK, HTTPStatus.NOT_FOUND):
+            raise ApiResponseError(status, payload.get("error", ""))
+        return status == HTTPStatus.OK
+
+    def _error_name(self, error: Exception) -> str:
+        if isinstance(error, ApiResponseError):
+            return f"HTTP {error.status}"
+        return super()._error_name(error)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = build_arg_parser("Нагрузочный тест HTTP JSON API: одновременная запись к врачам через server.py.")
+    parser.add_argument("--api-host", default="127.0.0.1", help="адрес server.py")
+    parser.add_argument("--api-port", type=int, default=8080, help="порт server.py")
+    parser.add_argument("--timeout", type=float, default=30.0, help="таймаут запроса к API, секунд")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # БД нужна только для подготовки сценария: хватит одного соединения
+    db = Database(
+        host=args.host,
+        port=args.port,
+        database=args.database,
+        user=args.user,
+        password=args.password,
+        max_connections=args.max_connections or 1
+    )
+    db.connect()
+
+    try:
+        load = ApiBookingLoad(
+            db,
+            api_host=args.api_host,
+            api_port=args.api_port,
+            timeout=args.timeout,
+            sessions=args.sessions,
+            duration=args.duration,
+            days=args.days,
+            doctor_skew=args.doctor_skew,
+            slot_skew=args.slot_skew,
+            strategy=args.strategy,
+            max_retries=args.max_retries,
+            seed=args.seed
+        )
+
+        api = f"http://{args.api_host}:{args.api_port}"
+        console.print(f"[cyan]{api}: {args.sessions} сессий, {args.duration:.0f} с, стратегия {args.strategy}...[/cyan]")
+        started_at = datetime.now()
+        started = time.perf_counter()
+        stats = load.run()
+        report = build_report(load, stats, time.perf_counter() - started)
+
+        if not args.keep:
+            console.print(f"Удалено созданных записей: {load.cleanup(stats)}")
+    finally:
+        db.close()
+
+    report["api"] = api
+    report["started_at"] = started_at.isoformat(timespec="seconds")
+    report["git_revision"] = git_revision()
+
+    output = args.output or RESULTS_DIR / f"api-booking-{started_at:%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    console.print(render_report(report))
+    console.print(f"[green]Результаты сохранены в {output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import psycopg2
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.run import RESULTS_DIR, git_revision, summarize
+from db.database import Database
+from db.pool import PoolTimeoutError
+from services.appointment_service import (
+    SlotTakenError,
+    create_appointment,
+    delete_appointment,
+    get_all_doctors,
+    get_available_slots_for_day,
+)
+from services.schedule_service import get_slot_template
+
+
+# стратегии сессии регистратора
+CHECK = "check" # сначала смотрит свободные слоты (get_available_slots_for_day), потом записывает
+BLIND = "blind" # сразу пытается записать на выбранный слот расписания врача
+
+console = Console()
+
+
+def zipf_weights(count: int, skew: float) -> list[float]:
+    """
+    Накопленные веса для выбора с перекосом: i-й элемент выбирается с весом 1 / (i + 1) ** skew.
+    skew = 0 — равномерный выбор, чем больше skew, тем чаще выбираются первые элементы.
+    """
+    return list(itertools.accumulate(1 / (i + 1) ** skew for i in range(count)))
+
+
+class SessionStats:
+    """Замеры одной сессии регистратора"""
+
+    def __init__(self):
+        self.booked = 0 # успешных записей
+        self.conflicts = 0 # попыток, завершившихся SlotTakenError
+        self.gave_up = 0 # записей, не удавшихся за max_retries повторов
+        self.no_free_slots = 0 # у выбранного врача на выбранный день не осталось слотов
+        self.errors: dict[str, int] = {} # прочие ошибки по типу
+        self.retries: list[int] = [] # число повторов на каждую успешную запись
+        self.attempt_ms: list[float] = [] # длительность каждого вызова create_appointment
+        self.booking_ms: list[float] = [] # длительность записи целиком (просмотр слотов + повторы)
+        self.created: list[tuple[int, datetime]] = [] # (id, начало приема) созданных записей (для очистки)
+
+
+class BookingLoad:
+    """
+    Генератор нагрузки «утренний наплыв»: sessions регистраторов одновременно записывают
+    пациентов к одним и тем же врачам на ближайшие дни через services/appointment_service.py.
+
+    Врачи и слоты выбираются с перекосом (zipf_weights): популярные врачи и ранние слоты
+    запрашиваются чаще, что и создает конкуренцию за одни и те же интервалы.
+    Просмотр слотов, запись и отмена вынесены в _free_slots / _book / _cancel,
+    чтобы тот же сценарий можно было гонять через HTTP API (benchmarks/api_load.py).
+    """
+
+    # ошибки, которые сессия считает и продолжает работу
+    ERRORS: tuple[type[Exception], ...] = (PoolTimeoutError, ValueError, psycopg2.Error)
+
+    def __init__(
+            self,
+            db: Database,
+            sessions: int,
+            duration: float,
+            days: int = 1,
+            start_day: Optional[date] = None,
+            doctor_skew: float = 1.0,
+            slot_skew: float = 1.0,
+            strategy: str = CHECK,
+            max_retries: int = 3,
+            seed: int = 42
+    ):
+        if strategy not in (CHECK, BLIND):
+            raise ValueError(f"Неизвестная стратегия: {strategy}")
+
+        self.db = db
+        self.sessions = sessions
+        self.duration = duration
+        self.days = [(start_day or date.today() + timedelta(days=1)) + timedelta(days=i) for i in range(days)]
+        self.doctor_skew = doctor_skew
+        self.slot_skew = slot_skew
+        self.strategy = strategy
+        self.max_retries = max_retries
+        self.seed = seed
+
+        self.doctor_ids = [doctor.id for doctor in get_all_doctors(db)]
+        if not self.doctor_ids:
+            raise RuntimeError("В базе нет врачей.")
+
+        with db.cursor() as cursor:
+            cursor.execute("SELECT MIN(id), MAX(id) FROM patients")
+            self.min_patient_id, self.max_patient_id = cursor.fetchone()
+        if self.min_patient_id is None:
+            raise RuntimeError("В базе нет пациентов.")
+
+        self._doctor_weights = zipf_weights(len(self.doctor_ids), doctor_skew)
+        self._slot_weights: dict[int, list[float]] = {} # число слотов -> накопленные веса
+
+    def _free_slots(self, doctor_id: int, day: date) -> list[datetime]:
+        """Свободные слоты врача на день (стратегия CHECK)"""
+        return get_available_slots_for_day(self.db, doctor_id, day)
+
+    def _book(self, patient_id: int, doctor_id: int, slot: datetime) -> int:
+        """Записывает пациента; занятый слот — SlotTakenError"""
+        return create_appointment(self.db, patient_id, doctor_id, slot)
+
+    def _cancel(self, appointment_id: int, slot: datetime) -> bool:
+        """Отменяет запись, созданную нагрузкой"""
+        return delete_appointment(self.db, appointment_id, slot)
+
+    def _error_name(self, error: Exception) -> str:
+        """Под каким именем ошибка попадает в отчет"""
+        return type(error).__name__
+
+    def _pick_slot(self, rng: random.Random, slots: list[datetime]) -> datetime:
+        """Выбирает слот с перекосом к ранним (веса по длине списка: у врачей разные смены)"""
+        weights = self._slot_weights.get(len(slots))
+        if weights is None:
+            weights = self._slot_weights[len(slots)] = zipf_weights(len(slots), self.slot_skew)
+        return rng.choices(slots, cum_weights=weights)[0]
+
+    def _book_once(self, rng: random.Random, stats: SessionStats) -> None:
+        """Одна запись пациента: выбор врача и слота, попытка записи, повторы при конфликте"""
+        patient_id = rng.randint(self.min_patient_id, self.max_patient_id)
+        doctor_id = rng.choices(self.doctor_ids, cum_weights=self._doctor_weights)[0]
+        day = rng.choice(self.days)
+        started = time.perf_counter()
+
+        for retry in range(self.max_retries + 1):
+            if self.strategy == CHECK:
+                slots = self._free_slots(doctor_id, day)
+            else:
+                # слоты по шаблону расписания врача (из кэша справочников), без проверки занятости
+                slots = get_slot_template(self.db, doctor_id).slots(day)
+
+            if not slots:
+                stats.no_free_slots += 1 # все занято или врач в этот день не работает
+                return
+
+            slot = self._pick_slot(rng, slots)
+            attempt_started = time.perf_counter()
+            try:
+                appointment_id = self._book(patient_id, doctor_id, slot)
+            except SlotTakenError:
+                stats.conflicts += 1
+                continue
+            finally:
+                stats.attempt_ms.append((time.perf_counter() - attempt_started) * 1000)
+
+            stats.booked += 1
+            stats.retries.append(retry)
+            stats.booking_ms.append((time.perf_counter() - started) * 1000)
+            stats.created.append((appointment_id, slot))
+            return
+
+        stats.gave_up += 1
+
+    def _session(self, index: int, deadline: float, stats: SessionStats) -> None:
+        """Цикл одной сессии регистратора до deadline"""
+        rng = random.Random(f"{self.seed}:session:{index}")
+
+        while time.perf_counter() < deadline:
+            try:
+                self._book_once(rng, stats)
+            except self.ERRORS as e:
+                name = self._error_name(e)
+                stats.errors[name] = stats.errors.get(name, 0) + 1
+
+    def run(self) -> list[SessionStats]:
+        """Запускает все сессии одновременно и ждет их завершения"""
+        stats = [SessionStats() for _ in range(self.sessions)]
+        deadline = time.perf_counter() + self.duration
+
+        threads = [
+            threading.Thread(target=self._session, args=(i, deadline, stats[i]), daemon=True)
+            for i in range(self.sessions)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return stats
+
+    def cleanup(self, stats: list[SessionStats]) -> int:
+        """Удаляет записи, созданные нагрузкой"""
+        deleted = 0
+        for session in stats:
+            for appointment_id, slot in session.created:
+                deleted += self._cancel(appointment_id, slot)
+        return deleted
+
+
+def build_report(load: BookingLoad, stats: list[SessionStats], elapsed: float) -> dict:
+    """Сводный отчет по всем сессиям"""
+    booked = sum(s.booked for s in stats)
+    conflicts = sum(s.conflicts for s in stats)
+    attempts = booked + conflicts
+    retries = [r for s in stats for r in s.retries]
+    attempt_ms = [ms for s in stats for ms in s.attempt_ms]
+    booking_ms = [ms for s in stats for ms in s.booking_ms]
+
+    errors: dict[str, int] = {}
+    for session in stats:
+        for name, count in session.errors.items():
+            errors[name] = errors.get(name, 0) + count
+
+    retry_histogram: dict[int, int] = {}
+    for r in retries:
+        retry_histogram[r] = retry_histogram.get(r, 0) + 1
+
+    return {
+        "sessions": load.sessions,
+        "duration_s": elapsed,
+        "strategy": load.strategy,
+        "days": [day.isoformat() for day in load.days],
+        "doctors": len(load.doctor_ids),
+        "doctor_skew": load.doctor_skew,
+        "slot_skew": load.slot_skew,
+        "max_retries": load.max_retries,
+        "booked": booked,
+        "throughput_per_s": booked / elapsed if elapsed else 0.0,
+        "attempts": attempts,
+        "conflicts": conflicts,
+        "conflict_rate": conflicts / attempts if attempts else 0.0,
+        "gave_up": sum(s.gave_up for s in stats),
+        "no_free_slots": sum(s.no_free_slots for s in stats),
+        "errors": errors,
+        "retries": retry_histogram,
+        "attempt_latency": summarize(attempt_ms) if attempt_ms else None,
+        "booking_latency": summarize(booking_ms) if booking_ms else None,
+    }
+
+
+def render_report(report: dict) -> Table:
+    """Таблица отчета для консоли"""
+    table = Table(show_header=False)
+    table.add_column("Показатель", style="bold cyan")
+    table.add_column("Значение", justify="right")
+
+    table.add_row("Записей создано", str(report["booked"]))
+    table.add_row("Пропускная способность, записей/с", f"{report['throughput_per_s']:.1f}")
+    table.add_row("Попыток записи", str(report["attempts"]))
+    table.add_row("Конфликтов (слот занят)", f"{report['conflicts']} ({report['conflict_rate']:.1%})")
+    table.add_row("Отказались после повторов", str(report["gave_up"]))
+    table.add_row("Нет свободных слотов", str(report["no_free_slots"]))
+    table.add_row("Повторы: число -> записей", ", ".join(f"{k}: {v}" for k, v in sorted(report["retries"].items())) or "—")
+    table.add_row("Прочие ошибки", ", ".join(f"{k}: {v}" for k, v in report["errors"].items()) or "—")
+
+    for key, title in (("attempt_latency", "create_appointment"), ("booking_latency", "запись целиком")):
+        latency = report[key]
+        if latency is not None:
+            table.add_row(
+                f"{title}, p50 / p95 / p99, мс",
+                f"{latency['p50_ms']:.2f} / {latency['p95_ms']:.2f} / {latency['p99_ms']:.2f}"
+            )
+
+    return table
+
+
+def build_arg_parser(description: str) -> argparse.ArgumentParser:
+    """Аргументы сценария и базы, общие для booking_load и api_load"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sessions", type=int, default=8, help="число одновременных регистраторов")
+    parser.add_argument("--duration", type=float, default=30.0, help="длительность теста, секунд")
+    parser.add_argument("--days", type=int, default=1, help="на сколько ближайших дней записывать (начиная с завтра)")
+    parser.add_argument("--doctor-skew", type=float, default=1.0, help="перекос выбора врачей (0 — равномерно)")
+    parser.add_argument("--slot-skew", type=float, default=1.0, help="перекос к ранним слотам (0 — равномерно)")
+    parser.add_argument("--strategy", choices=(CHECK, BLIND), default=CHECK, help="смотреть ли свободные слоты перед записью")
+    parser.add_argument("--max-retries", type=int, default=3, help="сколько раз повторять запись при конфликте")
+    parser.add_argument("--seed", type=int, default=42, help="зерно генератора")
+    parser.add_argument("--max-connections", type=int, help="размер пула (по умолчанию — по числу сессий)")
+    parser.add_argument("--keep", action="store_true", help="не удалять созданные записи")
+    parser.add_argument("--output", type=Path, help="куда сохранить JSON (по умолчанию в benchmarks/results/)")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--database", default="veterinary_clinic_bench", help="база с данными (например, загруженными benchmarks.run)")
+    parser.add_argument("--user", default="postgres")
+    parser.add_argument("--password", default="your_password")
+    return parser
+
+
+def parse_args() -> argparse.Namespace:
+    parser = build_arg_parser("Нагрузочный тест одновременной записи к врачам (утренний наплыв регистраторов).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    db = Database(
+        host=args.host,
+        port=args.port,
+        database=args.database,
+        user=args.user,
+        password=args.password,
+        max_connections=args.max_connections or args.sessions
+    )
+    db.connect()
+
+    try:
+        load = BookingLoad(
+            db,
+            sessions=args.sessions,
+            duration=args.duration,
+            days=args.days,
+            doctor_skew=args.doctor_skew,
+            slot_skew=args.slot_skew,
+            strategy=args.strategy,
+            max_retries=args.max_retries,
+            seed=args.seed
+        )
+
+        console.print(f"[cyan]{args.sessions} сессий, {args.duration:.0f} с, стратегия {args.strategy}...[/cyan]")
+        started_at = datetime.now()
+        started = time.perf_counter()
+        stats = load.run()
+        report = build_report(load, stats, time.perf_counter() - started)
+
+        if not args.keep:
+            console.print(f"Удалено созданных записей: {load.cleanup(stats)}")
+    finally:
+        db.close()
+
+    report["started_at"] = started_at.isoformat(timespec="seconds")
+    report["git_revision"] = git_revision()
+
+    output = args.output or RESULTS_DIR / f"booking-{started_at:%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    console.print(render_report(report))
+    console.print(f"[green]Результаты сохранены в {output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import csv
+import io
+import math
+import random
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+from db.database import Database
+from services.appointment_service import APPOINTMENT_DURATION, BOOKING_HORIZON_DAYS, generate_daily_slots
+from services.medical_card_cache import medical_card_cache
+from services.partition_service import ensure_partitions, get_partitions
+from services.patient_service import _CopyStream
+from services.reference_cache import reference_cache
+
+
+# заполненность расписания врачей в сгенерированных данных (доля занятых слотов)
+DEFAULT_FILL = 0.6
+
+# сколько в среднем записей приходится на одного пациента и пациентов на одного владельца
+APPOINTMENTS_PER_PATIENT = 5
+PATIENTS_PER_OWNER = 1.5
+
+LAST_NAMES = (
+    "Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Васильев", "Соколов",
+    "Михайлов", "Новиков", "Федоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семенов",
+)
+FIRST_NAMES = (
+    "Иван", "Петр", "Алексей", "Дмитрий", "Сергей", "Андрей", "Михаил", "Николай",
+    "Анна", "Мария", "Елена", "Ольга", "Наталья", "Ирина", "Татьяна", "Светлана",
+)
+MIDDLE_NAMES = (
+    "Иванович", "Петрович", "Алексеевич", "Дмитриевич", "Сергеевич", "Андреевич",
+    "Ивановна", "Петровна", "Алексеевна", "Дмитриевна", "Сергеевна", "Андреевна",
+)
+PET_NAMES = (
+    "Барсик", "Шарик", "Мурка", "Кеша", "Рыжик", "Бобик", "Пушок", "Снежок",
+    "Тузик", "Дымка", "Лаки", "Марс", "Жужа", "Граф", "Люси", "Зефир",
+)
+SPECIES = ("Кот", "Кошка", "Собака", "Попугай", "Хомяк", "Кролик", "Морская свинка", "Черепаха")
+
+
+class ClinicDataset:
+    """
+    Параметры синтетических данных клиники.
+
+    По числу записей вычисляются остальные размеры: врачей столько, чтобы их расписание
+    за years лет было заполнено примерно на fill, пациентов — по APPOINTMENTS_PER_PATIENT записей
+    на пациента, владельцев — по PATIENTS_PER_OWNER пациентов на владельца.
+    Записи покрывают years лет до end_day и BOOKING_HORIZON_DAYS дней после него (предстоящие записи).
+    При одинаковых параметрах и seed данные получаются одинаковыми.
+    """
+
+    def __init__(
+            self,
+            appointments: int,
+            years: int = 3,
+            fill: float = DEFAULT_FILL,
+            seed: int = 42,
+            end_day: Optional[date] = None
+    ):
+        if appointments < 1 or years < 1 or not (0 < fill <= 1):
+            raise ValueError("Некорректные параметры синтетических данных.")
+
+        self.appointments = appointments
+        self.years = years
+        self.fill = fill
+        self.seed = seed
+        self.end_day = end_day or date.today()
+
+        self.start_day = self.end_day - timedelta(days=365 * years)
+        self.days = (self.end_day - self.start_day).days + BOOKING_HORIZON_DAYS
+        self.slots_per_day = len(generate_daily_slots(self.start_day))
+
+        self.doctors = max(1, math.ceil(appointments / (self.days * self.slots_per_day * fill)))
+        self.patients = max(1, appointments // APPOINTMENTS_PER_PATIENT)
+        self.owners = max(1, math.ceil(self.patients / PATIENTS_PER_OWNER))
+
+
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return (
+            f"ClinicDataset(appointments={self.appointments}, doctors={self.doctors}, "
+            f"patients={self.patients}, owners={self.owners}, seed={self.seed})"
+        )
+
+
+    def describe(self) -> dict:
+        """Параметры набора данных (для отчета)"""
+        return {
+            "appointments": self.appointments,
+            "doctors": self.doctors,
+            "patients": self.patients,
+            "owners": self.owners,
+            "years": self.years,
+            "fill": self.fill,
+            "seed": self.seed,
+            "start_day": self.start_day.isoformat(),
+            "end_day": self.end_day.isoformat(),
+        }
+
+    def _rng(self, stream: str) -> random.Random:
+        """Отдельный генератор случайных чисел для каждой таблицы: таблицы не зависят друг от друга"""
+        return random.Random(f"{self.seed}:{stream}")
+
+    def owner_rows(self) -> Iterator[tuple]:
+        """Владельцы: (id, ФИО, телефон); телефоны уникальны"""
+        rng = self._rng("owners")
+        for owner_id in range(1, self.owners + 1):
+            full_name = f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(MIDDLE_NAMES)}"
+            yield owner_id, full_name, f"+79{owner_id:09d}"
+
+    def patient_rows(self) -> Iterator[tuple]:
+        """Пациенты: (id, id владельца, кличка, вид); у каждого владельца есть хотя бы один пациент"""
+        rng = self._rng("patients")
+        for patient_id in range(1, self.patients + 1):
+            if patient_id <= self.owners:
+                owner_id = patient_id
+            else:
+                owner_id = rng.randint(1, self.owners)
+            yield patient_id, owner_id, rng.choice(PET_NAMES), rng.choice(SPECIES)
+
+    def doctor_rows(self) -> Iterator[tuple]:
+        """Врачи: (id, ФИО)"""
+        rng = self._rng("doctors")
+        for doctor_id in range(1, self.doctors + 1):
+            yield doctor_id, f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(MIDDLE_NAMES)}"
+
+    def appointment_rows(self) -> Iterator[tuple]:
+        """
+        Записи: (id, id пациента, id врача, начало, конец), ровно appointments штук.
+        Слоты выбираются потоковой выборкой без возвращения (алгоритм S Кнута),
+        поэтому записи не пересекаются и не нужно держать в памяти весь список слотов.
+        """
+        rng = self._rng("appointments")
+        total = self.days * self.doctors * self.slots_per_day
+        needed = min(self.appointments, total)
+        seen = 0
+        appointment_id = 0
+
+        for day_index in range(self.days):
+            day = self.start_day + timedelta(days=day_index)
+            slots = generate_daily_slots(day)
+
+            for doctor_id in range(1, self.doctors + 1):
+                for slot in slots:
+                    if needed and rng.random() * (total - seen) < needed:
+                        appointment_id += 1
+                        needed -= 1
+                        yield (
+                            appointment_id,
+                            rng.randint(1, self.patients),
+                            doctor_id,
+                            slot,
+                            slot + APPOINTMENT_DURATION,
+                        )
+                    seen += 1
+
+
+def _csv_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    """Превращает строки в строки CSV для COPY"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    for row in rows:
+        writer.writerow(
+            value.isoformat(sep=" ") if isinstance(value, datetime) else value
+            for value in row
+        )
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        yield line
+
+
+def load_dataset(db: Database, dataset: ClinicDataset) -> None:
+    """
+    Очищает таблицы клиники и загружает в них набор данных через COPY.
+    Все данные БД удаляются — запускать только на отдельной базе для бенчмарков!
+    """
+    tables = (
+        ("owners", "id, full_name, phone", dataset.owner_rows()),
+        ("patients", "id, owner_id, name, species", dataset.patient_rows()),
+        ("doctors", "id, full_name", dataset.doctor_rows()),
+        ("appointments", "id, patient_id, doctor_id, date_time, end_time", dataset.appointment_rows()),
+    )
+
+    # архивные секции прошлых загрузок удаляются, иначе их месяцы не получат секций в appointments
+    archived = get_partitions(db, "appointments_archive")
+
+    with db.connection():
+        with db.cursor() as cursor:
+            for name, _ in archived:
+                cursor.execute(f'DROP TABLE "{name}"')
+            cursor.execute(
+                "TRUNCATE appointments, patients, owners, doctors, doctor_schedules, schedule_exceptions, "
+                "doctor_day_stats, doctor_day_changes RESTART IDENTITY"
+            )
+
+        # секции на всю историю, окно записи и следующий за ним день (там создает записи benchmarks.run)
+        ensure_partitions(db, dataset.start_day, dataset.end_day + timedelta(days=BOOKING_HORIZON_DAYS + 1))
+
+    with db.cursor() as cursor:
+        for table, columns, rows in tables:
+            cursor.copy_expert(
+                f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)",
+                _CopyStream(_csv_lines(rows))
+            )
+
+        # следующие id из последовательностей не должны совпасть с загруженными
+        for table, _, _ in tables:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+            )
+
+        # после массовой загрузки планировщику нужна свежая статистика
+        cursor.execute("ANALYZE owners, patients, doctors, appointments")
+
+    # данные в кэшах процесса относятся к старому содержимому таблиц
+    reference_cache.invalidate()
+    medical_card_cache.invalidate()
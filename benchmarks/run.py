@@ -0,0 +1,260 @@
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.generator import ClinicDataset, load_dataset
+from db.database import Database
+from services.appointment_service import (
+    BOOKING_HORIZON_DAYS,
+    create_appointment,
+    delete_appointment,
+    generate_daily_slots,
+    get_available_slots_for_day,
+    get_future_appointments,
+)
+from services.patient_service import get_all_patients, get_patient_appointments, register_patient
+
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# телефоны владельцев, которых создает бенчмарк register_patient (не пересекаются с генератором: +79...)
+BENCH_PHONE_PREFIX = "+78"
+
+console = Console()
+
+
+def percentile(sorted_samples: list[float], p: float) -> float:
+    """Перцентиль по методу ближайшего ранга (выборка уже отсортирована)"""
+    rank = max(1, math.ceil(p / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+def summarize(samples: list[float]) -> dict:
+    """Сводка по замерам (в миллисекундах)"""
+    ordered = sorted(samples)
+    return {
+        "iterations": len(ordered),
+        "min_ms": ordered[0],
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1],
+        "mean_ms": sum(ordered) / len(ordered),
+    }
+
+
+def measure(
+    call: Callable[[int], object],
+    iterations: int,
+    warmup: int = 1,
+    after: Optional[Callable[[object], None]] = None
+) -> list[float]:
+    """
+    Вызывает call(i) iterations раз и возвращает время каждого вызова в миллисекундах.
+    after(результат) выполняется вне замера (например, удаление созданных данных).
+    """
+    for i in range(warmup):
+        result = call(-1 - i)
+        if after is not None:
+            after(result)
+
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        result = call(i)
+        samples.append((time.perf_counter() - started) * 1000)
+        if after is not None:
+            after(result)
+
+    return samples
+
+
+class Benchmarks:
+    """Набор замеров сервисных функций на загруженном наборе данных"""
+
+    def __init__(self, db: Database, dataset: ClinicDataset, iterations: int):
+        self.db = db
+        self.dataset = dataset
+        self.iterations = iterations
+        self.rng = random.Random(f"{dataset.seed}:bench")
+
+        # тяжелые выборки (все пациенты, все предстоящие записи) повторяем реже
+        self.listing_iterations = max(3, iterations // 20)
+
+        # новые записи создаются после горизонта данных, чтобы не пересекаться с существующими
+        self.booking_day = dataset.end_day + timedelta(days=BOOKING_HORIZON_DAYS + 1)
+        self.booking_slots = generate_daily_slots(self.booking_day)
+
+    def _random_day(self) -> date:
+        """Случайный день в окне записи"""
+        return self.dataset.end_day + timedelta(days=self.rng.randrange(BOOKING_HORIZON_DAYS))
+
+    def _new_booking(self, i: int) -> tuple[int, int, datetime]:
+        """Пациент, врач и гарантированно свободный слот для i-й новой записи"""
+        index = i % (self.dataset.doctors * len(self.booking_slots))
+        doctor_id = index // len(self.booking_slots) + 1
+        slot = self.booking_slots[index % len(self.booking_slots)]
+        return self.rng.randint(1, self.dataset.patients), doctor_id, slot
+
+    def _drop_patient(self, patient) -> None:
+        """Удаляет пациента и владельца, созданных бенчмарком"""
+        with self.db.cursor() as cursor:
+            cursor.execute("DELETE FROM patients WHERE id = %s", (patient.id,))
+            cursor.execute(
+                "DELETE FROM owners o WHERE o.id = %s AND NOT EXISTS (SELECT 1 FROM patients p WHERE p.owner_id = o.id)",
+                (patient.owner_id,)
+            )
+
+    def run(self) -> dict[str, dict]:
+        """Выполняет все замеры и возвращает сводки по функциям"""
+        db = self.db
+        dataset = self.dataset
+        n = self.iterations
+
+        cases = {
+            "get_all_patients": lambda: measure(
+                lambda i: get_all_patients(db), self.listing_iterations
+            ),
+            "get_future_appointments": lambda: measure(
+                lambda i: get_future_appointments(db), self.listing_iterations
+            ),
+            "get_available_slots_for_day": lambda: measure(
+                lambda i: get_available_slots_for_day(db, self.rng.randint(1, dataset.doctors), self._random_day()), n
+            ),
+            "create_appointment": lambda: measure(
+                # нельзя создать больше записей, чем слотов в дне бронирования у всех врачей
+                lambda i: create_appointment(db, *self._new_booking(i)),
+                min(n, dataset.doctors * len(self.booking_slots)),
+                after=lambda appointment_id: delete_appointment(db, appointment_id)
+            ),
+            "register_patient": lambda: measure(
+                lambda i: register_patient(
+                    db, "Бенчмарков Тест Тестович", f"{BENCH_PHONE_PREFIX}{i % 10**9:09d}", "Тест", "Кот"
+                ),
+                n,
+                after=self._drop_patient
+            ),
+            "get_patient_appointments": lambda: measure(
+                lambda i: get_patient_appointments(db, self.rng.randint(1, dataset.patients)), n
+            ),
+        }
+
+        results = {}
+        for name, case in cases.items():
+            console.print(f"[cyan]Замер {name}...[/cyan]")
+            results[name] = summarize(case())
+
+        return results
+
+
+def git_revision() -> Optional[str]:
+    """Текущий коммит репозитория (для сравнения запусков)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def server_version(db: Database) -> str:
+    """Версия PostgreSQL"""
+    with db.cursor() as cursor:
+        cursor.execute("SHOW server_version")
+        return cursor.fetchone()[0]
+
+
+def render_results(results: dict[str, dict]) -> Table:
+    """Таблица результатов для консоли"""
+    table = Table(show_header=True, header_style="bold cyan")
+    table.add_column("Функция")
+    for column in ("N", "p50, мс", "p95, мс", "p99, мс", "max, мс"):
+        table.add_column(column, justify="right")
+
+    for name, summary in results.items():
+        table.add_row(
+            name,
+            str(summary["iterations"]),
+            f"{summary['p50_ms']:.2f}",
+            f"{summary['p95_ms']:.2f}",
+            f"{summary['p99_ms']:.2f}",
+            f"{summary['max_ms']:.2f}",
+        )
+
+    return table
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Бенчмарк сервисных функций на синтетических данных клиники."
+    )
+    parser.add_argument("--appointments", type=int, default=10_000, help="число записей (10k ... 10M)")
+    parser.add_argument("--years", type=int, default=3, help="за сколько лет сгенерировать историю")
+    parser.add_argument("--seed", type=int, default=42, help="зерно генератора")
+    parser.add_argument("--iterations", type=int, default=200, help="сколько раз вызывать каждую функцию")
+    parser.add_argument("--skip-load", action="store_true", help="не перезагружать данные (уже загружены с теми же параметрами)")
+    parser.add_argument("--output", type=Path, help="куда сохранить JSON (по умолчанию benchmarks/results/<время>.json)")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--database", default="veterinary_clinic_bench", help="отдельная БД со схемой schema.sql; ее данные будут удалены")
+    parser.add_argument("--user", default="postgres")
+    parser.add_argument("--password", default="your_password")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    dataset = ClinicDataset(args.appointments, years=args.years, seed=args.seed)
+    db = Database(
+        host=args.host,
+        port=args.port,
+        database=args.database,
+        user=args.user,
+        password=args.password
+    )
+    db.connect()
+
+    try:
+        if not args.skip_load:
+            console.print(f"Загрузка данных: {dataset}")
+            started = time.perf_counter()
+            load_dataset(db, dataset)
+            console.print(f"[green]Данные загружены за {time.perf_counter() - started:.1f} с[/green]")
+
+        results = Benchmarks(db, dataset, args.iterations).run()
+        postgres = server_version(db)
+    finally:
+        db.close()
+
+    report = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "postgres": postgres,
+        "dataset": dataset.describe(),
+        "iterations": args.iterations,
+        "results": results,
+    }
+
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{args.appointments}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    console.print(render_results(results))
+    console.print(f"[green]Результаты сохранены в {output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+import argparse
+import csv
+import json
+import shlex
+import sys
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Optional, TextIO
+
+import psycopg2
+
+from db.database import READ, READ_PRIMARY, WRITE, Database
+
+
+# форматы вывода
+JSON = "json"
+CSV = "csv"
+
+SEARCH_LIMIT = 10 # сколько пациентов возвращает поиск по умолчанию
+EARLIEST_LIMIT = 10 # сколько ближайших слотов возвращает slots без врача по умолчанию
+
+
+class CommandError(Exception):
+    """Ошибка разбора или выполнения команды (сообщение выводится пользователю)"""
+
+
+class CommandParser(argparse.ArgumentParser):
+    """
+    Разбор аргументов без завершения процесса: ошибка превращается в CommandError,
+    чтобы в пакетном режиме неверная строка не прерывала остальные команды.
+    """
+
+    def error(self, message):
+        raise CommandError(f"{self.prog}: {message}")
+
+
+# ТИПЫ АРГУМЕНТОВ
+
+def _positive_int(value: str) -> int:
+    if not value.isdigit() or int(value) < 1:
+        raise argparse.ArgumentTypeError(f"ожидается положительное число, получено {value!r}")
+    return int(value)
+
+
+def _date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"дата должна быть в формате ГГГГ-ММ-ДД, получено {value!r}")
+
+
+def _datetime(value: str) -> datetime:
+    try:
+        result = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"дата и время должны быть в формате ГГГГ-ММ-ДДTЧЧ:ММ, получено {value!r}")
+
+    # расписание и записи хранятся в местном времени без часового пояса
+    if result.tzinfo is not None:
+        raise argparse.ArgumentTypeError(f"дата и время указываются без часового пояса, получено {value!r}")
+    return result
+
+
+# КОМАНДЫ
+# Сервисы импортируются внутри команд: разовый вызов загружает только то, что ему нужно.
+# Каждая команда возвращает объект для JSON (словарь или список словарей).
+# Режим соединения команды (mode в set_defaults парсера): WRITE — только для записи и отмены,
+# чтение идет с реплики (READ) или с основного сервера, если его требует сервис (READ_PRIMARY);
+# None — команда не оборачивается в общую транзакцию, и каждый запрос сервиса выбирает режим сам.
+
+def patients_search_command(db: Database, args: argparse.Namespace) -> Any:
+    """patients search ТЕКСТ — поиск пациентов по кличке, ФИО владельца или телефону"""
+    from services.patient_service import search_patients
+
+    return [
+        {
+            "id": patient.id,
+            "name": patient.name,
+            "species": patient.species,
+            "owner_full_name": patient.owner_full_name,
+            "owner_phone": patient.owner_phone
+        }
+        for patient in search_patients(db, " ".join(args.text), args.limit)
+    ]
+
+
+def slots_command(db: Database, args: argparse.Namespace) -> Any:
+    """
+    slots [ID_ВРАЧА] — свободные слоты врача на несколько дней;
+    без врача — ближайшие свободные слоты у любого врача.
+    """
+    from services.appointment_service import find_earliest_slots, get_availability_range
+
+    duration = timedelta(minutes=args.duration)
+    start_day = args.start or date.today()
+
+    if args.doctor_id is None:
+        after = datetime.combine(start_day, datetime.min.time())
+        return [
+            {"doctor_id": doctor_id, "date_time": slot}
+            for doctor_id, slot in find_earliest_slots(db, after, args.limit, duration=duration, days=args.days)
+        ]
+
+    availability = get_availability_range(db, args.doctor_id, start_day, args.days, duration)
+
+    return [
+        {"doctor_id": args.doctor_id, "date_time": slot}
+        for slots in availability.values()
+        for slot in slots
+    ]
+
+
+def book_command(db: Database, args: argparse.Namespace) -> Any:
+    """book ID_ПАЦИЕНТА ID_ВРАЧА ДАТА_ВРЕМЯ — запись на прием"""
+    from services.appointment_service import create_appointment
+
+    duration = timedelta(minutes=args.duration)
+    appointment_id = create_appointment(db, args.patient_id, args.doctor_id, args.date_time, duration)
+
+    return {
+        "id": appointment_id,
+        "patient_id": args.patient_id,
+        "doctor_id": args.doctor_id,
+        "date_time": args.date_time,
+        "end_time": args.date_time + duration
+    }
+
+
+def cancel_command(db: Database, args: argparse.Namespace) -> Any:
+    """cancel ID_ЗАПИСИ [--date-time ДАТА_ВРЕМЯ] — отмена записи (со временем приема читается одна секция)"""
+    from services.appointment_service import delete_appointment
+
+    if not delete_appointment(db, args.appointment_id, args.date_time):
+        raise CommandError("Запись с таким ID не найдена.")
+
+    return {"id": args.appointment_id, "deleted": True}
+
+
+def card_command(db: Database, args: argparse.Namespace) -> Any:
+    """card ID_ПАЦИЕНТА — медицинская карта"""
+    from services.patient_service import get_medical_card
+
+    card = get_medical_card(db, args.patient_id)
+    if card is None:
+        raise CommandError("Пациент с таким id не найден.")
+
+    return {
+        "id": card.patient_id,
+        "name": card.name,
+        "species": card.species,
+        "owner_full_name": card.owner_full_name,
+        "owner_phone": card.owner_phone,
+        "appointments": [
+            {"id": visit.id, "doctor_full_name": visit.doctor_full_name, "date_time": visit.date_time}
+            for visit in card.appointments
+        ]
+    }
+
+
+Command = Callable[[Database, argparse.Namespace], Any]
+
+
+def build_parser() -> CommandParser:
+    """
+    Парсер командной строки main.py. Без подкоманды запускается интерактивное меню,
+    подкоманда batch читает команды из stdin (по одной в строке).
+    """
+    from services.appointment_service import APPOINTMENT_DURATION, BOOKING_HORIZON_DAYS
+
+    default_minutes = APPOINTMENT_DURATION.seconds // 60
+
+    parser = CommandParser(description="Ветеринарная клиника: интерактивное меню или разовые команды.")
+    parser.add_argument(
+        "--format", choices=(JSON, CSV), default=JSON,
+        help="формат вывода команд (по умолчанию json)"
+    )
+    commands = parser.add_subparsers(dest="command", metavar="КОМАНДА")
+
+    patients = commands.add_parser("patients", help="пациенты")
+    patients_commands = patients.add_subparsers(dest="patients_command", metavar="КОМАНДА", required=True)
+    search = patients_commands.add_parser("search", help="поиск пациентов")
+    search.add_argument("text", nargs="+", help="кличка, ФИО владельца или начало телефона")
+    search.add_argument("--limit", type=_positive_int, default=SEARCH_LIMIT, help=f"по умолчанию {SEARCH_LIMIT}")
+    search.set_defaults(handler=patients_search_command, mode=READ)
+
+    slots = commands.add_parser("slots", help="свободные слоты врача или ближайшие у любого врача")
+    slots.add_argument("doctor_id", type=int, nargs="?", help="ID врача (без него — ближайшие слоты у всех врачей)")
+    slots.add_argument("--start", type=_date, help="с какого дня искать, ГГГГ-ММ-ДД (по умолчанию сегодня)")
+    slots.add_argument(
+        "--days", type=_positive_int, default=BOOKING_HORIZON_DAYS,
+        help=f"на сколько дней (по умолчанию {BOOKING_HORIZON_DAYS})"
+    )
+    slots.add_argument(
+        "--duration", type=_positive_int, default=default_minutes,
+        help=f"длительность приема в минутах (по умолчанию {default_minutes})"
+    )
+    slots.add_argument(
+        "--limit", type=_positive_int, default=EARLIEST_LIMIT,
+        help=f"сколько ближайших слотов вернуть без ID врача (по умолчанию {EARLIEST_LIMIT})"
+    )
+    # шаблоны расписаний читаются с основного сервера, занятость — с реплики: общей транзакции нет
+    slots.set_defaults(handler=slots_command, mode=None)
+
+    book = commands.add_parser("book", help="запись на прием")
+    book.add_argument("patient_id", type=int, help="ID пациента")
+    book.add_argument("doctor_id", type=int, help="ID врача")
+    book.add_argument("date_time", type=_datetime, help="начало приема, ГГГГ-ММ-ДДTЧЧ:ММ")
+    book.add_argument(
+        "--duration", type=_positive_int, default=default_minutes,
+        help=f"длительность приема в минутах (по умолчанию {default_minutes})"
+    )
+    book.set_defaults(handler=book_command, mode=WRITE)
+
+    cancel = commands.add_parser("cancel", help="отмена записи")
+    cancel.add_argument("appointment_id", type=int, help="ID записи")
+    cancel.add_argument(
+        "--date-time", type=_datetime,
+        help="начало приема, ГГГГ-ММ-ДДTЧЧ:ММ (если известно: отмена не просматривает все секции)"
+    )
+    cancel.set_defaults(handler=cancel_command, mode=WRITE)
+
+    card = commands.add_parser("card", help="медицинская карта пациента")
+    card.add_argument("patient_id", type=int, help="ID пациента")
+    # get_medical_card читает с основного сервера (карта кэшируется в долгоживущих процессах)
+    card.set_defaults(handler=card_command, mode=READ_PRIMARY)
+
+    commands.add_parser(
+        "batch",
+        help="выполнить команды из stdin по одной в строке (одно соединение с БД)"
+    )
+
+    return parser
+
+
+# ВЫВОД
+
+def _to_json(value: Any) -> Any:
+    """Приводит даты к строкам ISO 8601 для json.dumps"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Объект типа {type(value).__name__} не сериализуется в JSON")
+
+
+def _csv_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _csv_rows(payload: Any) -> list[dict]:
+    """
+    Плоские строки для CSV: список словарей выводится как есть, словарь — одной строкой.
+    Вложенный список словаря (например, записи медкарты) разворачивается в строку на элемент,
+    его поля получают префикс имени списка (appointments_id, ...).
+    """
+    if isinstance(payload, list):
+        return payload
+
+    scalars = {key: value for key, value in payload.items() if not isinstance(value, list)}
+    nested = [(key, value) for key, value in payload.items() if isinstance(value, list)]
+    if not nested:
+        return [scalars]
+
+    key, items = nested[0]
+    if not items:
+        return [scalars]
+    return [{**scalars, **{f"{key}_{name}": value for name, value in item.items()}} for item in items]
+
+
+def write_result(payload: Any, output_format: str, out: TextIO) -> None:
+    """Выводит результат команды: JSON — одной строкой, CSV — с заголовком"""
+    if output_format == JSON:
+        out.write(json.dumps(payload, ensure_ascii=False, default=_to_json) + "\n")
+        return
+
+    rows = _csv_rows(payload)
+    if not rows:
+        return
+
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]), lineterminator="\n")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({key: _csv_value(value) for key, value in row.items()})
+
+
+def write_error(message: str, output_format: str, out: TextIO, line: Optional[int] = None) -> None:
+    """
+    Выводит ошибку команды. В JSON — объект {"error": ...} на месте результата
+    (в пакетном режиме с номером строки), в CSV — в stderr, чтобы не портить таблицу.
+    """
+    if output_format == JSON:
+        error = {"error": message} if line is None else {"line": line, "error": message}
+        out.write(json.dumps(error, ensure_ascii=False) + "\n")
+    else:
+        prefix = f"строка {line}: " if line is not None else ""
+        sys.stderr.write(f"{prefix}{message}\n")
+
+
+# ВЫПОЛНЕНИЕ
+
+def run_command(db: Database, args: argparse.Namespace) -> Any:
+    """Выполняет одну разобранную команду в своей транзакции (в режиме соединения команды, см. КОМАНДЫ)"""
+    handler: Command = args.handler
+    if args.mode is None:
+        return handler(db, args)
+
+    with db.connection(args.mode):
+        return handler(db, args)
+
+
+def run_batch(db: Database, parser: CommandParser, output_format: str, lines: TextIO, out: TextIO) -> int:
+    """
+    Выполняет команды из lines (по одной в строке, синтаксис как в командной строке) на одном
+    соединении; пустые строки и строки с # пропускаются. Каждая команда — отдельная транзакция:
+    ошибка одной команды выводится на ее месте и не отменяет остальные.
+    Возвращает число команд с ошибкой.
+    """
+    failed = 0
+
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        try:
+            args = parser.parse_args(shlex.split(line))
+            if args.command in (None, "batch"):
+                raise CommandError("Ожидается команда: patients, slots, book, cancel или card.")
+            payload = run_command(db, args)
+        except (CommandError, ValueError, psycopg2.Error) as e:
+            failed += 1
+            write_error(str(e).strip(), output_format, out, number)
+            continue
+
+        write_result(payload, output_format, out)
+
+    out.flush()
+    return failed
+
+
+def run_cli(db: Database, parser: CommandParser, args: argparse.Namespace) -> int:
+    """
+    Выполняет разовую команду или пакет из stdin на подключенной БД.
+    Возвращает код выхода: 0 — успех, 1 — ошибка (в пакете — хотя бы одна команда с ошибкой).
+    """
+    if args.command == "batch":
+        return 1 if run_batch(db, parser, args.format, sys.stdin, sys.stdout) else 0
+
+    try:
+        payload = run_command(db, args)
+    except (CommandError, ValueError, psycopg2.Error) as e:
+        write_error(str(e).strip(), args.format, sys.stdout)
+        return 1
+
+    write_result(payload, args.format, sys.stdout)
+    return 0
@@ -1,30 +1,45 @@
-import re
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Optional
 
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
 from db.database import Database
+from db.models import AppointmentRow, Doctor, PatientRow
 from services.appointment_service import (
+    APPOINTMENT_DURATIONS,
+    BOOKING_HORIZON_DAYS,
     create_appointment,
     delete_appointment,
+    find_earliest_slots,
     get_all_doctors,
-    get_available_dates,
-    get_available_slots_for_day,
-    get_future_appointments,
+    get_doctors,
+    get_availability_range,
+    get_future_appointment_time,
+    get_future_appointments_page,
 )
+from services.medical_card_cache import medical_card_cache
+from services.pagination import PAGE_SIZE, NEXT, PREV, Page
 from services.patient_service import (
-    get_all_patients,
-    get_patient_appointments,
-    get_patient_card_info,
+    get_patients_page,
     register_patient,
-    get_owner_by_phone
+    get_owner_by_phone,
+    search_patients,
+    PHONE_PATTERN
 )
+from services.workload_service import DAY, WEEK, get_peak_hours, get_workload, refresh_workload
 
 
-# шаблон для проверки номера телефона владельца
-PHONE_PATTERN = re.compile(r"^\+7\d{10}$")
+# сколько найденных пациентов показывать при поиске
+SEARCH_LIMIT = 10
+
+# за сколько дней / недель строится отчет о загрузке врачей
+REPORT_DAYS = 7
+REPORT_WEEKS = 4
+
+# сколько ближайших свободных слотов предлагать при записи к любому врачу
+EARLIEST_SLOTS_LIMIT = 10
 
 console = Console()
 
@@ -53,6 +68,7 @@ def show_menu() -> None:
     console.print("4. Показать список предстоящих записей")
     console.print("5. Отменить запись")
     console.print("6. Просмотр медицинской карты пациента")
+    console.print("7. Загрузка врачей")
     console.print("0. Выход")
     
 
@@ -146,7 +162,7 @@ def register_patient_menu(db: Database) -> None:
     console.input("Нажмите Enter, чтобы вернуться в меню...")
     
 
-def render_patients_table(patients: list[tuple[int, str, str, str, str]]) -> Table:
+def render_patients_table(patients: list[PatientRow]) -> Table:
     """
     Строит таблицу пациентов.
     """
@@ -157,13 +173,13 @@ def render_patients_table(patients: list[tuple[int, str, str, str, str]]) -> Tab
     table.add_column("Владелец")
     table.add_column("Телефон")
 
-    for pid, name, species, owner, phone in patients:
-        table.add_row(str(pid), name, species, owner, phone)
+    for patient in patients:
+        table.add_row(str(patient.id), patient.name, patient.species, patient.owner_full_name, patient.owner_phone)
     
     return table
 
 
-def render_doctors_table(doctors: list[tuple[int, str]]) -> Table:
+def render_doctors_table(doctors: list[Doctor]) -> Table:
     """
     Строит таблицу врачей.
     """
@@ -171,13 +187,13 @@ def render_doctors_table(doctors: list[tuple[int, str]]) -> Table:
     table.add_column("ID")
     table.add_column("ФИО")
 
-    for did, full_name in doctors:
-        table.add_row(str(did), full_name)
+    for doctor in doctors:
+        table.add_row(str(doctor.id), doctor.full_name)
     
     return table
 
 
-def render_appointments_table(appointments: list[tuple[int, str, str, str, str, str, datetime]]) -> Table:
+def render_appointments_table(appointments: list[AppointmentRow]) -> Table:
     """
     Строит таблицу записей.
     """
@@ -190,29 +206,144 @@ def render_appointments_table(appointments: list[tuple[int, str, str, str, str,
     table.add_column("Доктор")
     table.add_column("Дата и время")
 
-    for aid, name, species, owner, owner_phone, full_name, date_time in appointments:
-        table.add_row(str(aid), name, species, owner, owner_phone, full_name, date_time.strftime("%Y-%m-%d %H:%M"))
+    for appointment in appointments:
+        table.add_row(
+            str(appointment.id),
+            appointment.patient_name,
+            appointment.patient_species,
+            appointment.owner_full_name,
+            appointment.owner_phone,
+            appointment.doctor_full_name,
+            appointment.date_time.strftime("%Y-%m-%d %H:%M")
+        )
     
     return table
 
 
+def browse_pages(
+    fetch_page: Callable[[Optional[Any], str], Page],
+    render: Callable[[list], Table],
+    exit_hint: str = "Enter — продолжить"
+) -> bool:
+    """
+    Постраничный просмотр таблицы.
+    Одновременно загружается и отрисовывается только одна страница.
+
+    Примечания:
+    - n — следующая страница, p — предыдущая, Enter — выход из просмотра;
+    - возвращает False, если показывать нечего (первая страница пуста).
+    """
+    page = fetch_page(None, NEXT)
+
+    if not page.rows:
+        return False
+
+    page_number = 1
+
+    while True:
+        console.print(render(page.rows))
+
+        hints = []
+        if page.has_prev:
+            hints.append("p — предыдущая")
+        if page.has_next:
+            hints.append("n — следующая")
+        hints.append(exit_hint)
+
+        choice = console.input(f"Страница {page_number}. {', '.join(hints)}: ").strip().lower()
+
+        if choice == "":
+            return True
+
+        if choice == "n" and page.has_next:
+            page = fetch_page(page.next_cursor, NEXT)
+            page_number += 1
+        elif choice == "p" and page.has_prev:
+            page = fetch_page(page.prev_cursor, PREV)
+            page_number -= 1
+        else:
+            console.print("[red]Неверный выбор, попробуйте снова.[/red]")
+
+
+def browse_patients(db: Database, exit_hint: str = "Enter — продолжить") -> bool:
+    """
+    Постраничный просмотр списка пациентов.
+    """
+    return browse_pages(
+        lambda cursor, direction: get_patients_page(db, PAGE_SIZE, cursor, direction),
+        render_patients_table,
+        exit_hint
+    )
+
+
+def browse_future_appointments(db: Database, exit_hint: str = "Enter — продолжить") -> bool:
+    """
+    Постраничный просмотр предстоящих записей.
+    """
+    return browse_pages(
+        lambda cursor, direction: get_future_appointments_page(db, PAGE_SIZE, cursor, direction),
+        render_appointments_table,
+        exit_hint
+    )
+
+
+def choose_patient(db: Database, cancel_message: str) -> Optional[int]:
+    """
+    Выбор пациента через поиск: вместо полного списка показываются только лучшие совпадения.
+    Возвращает id пациента или None, если пользователь прервал выбор (пустой поисковый запрос).
+    """
+    while True:
+        query = console.input("Поиск пациента (кличка, ФИО владельца или телефон): ").strip()
+
+        if query == "":
+            console.print(f"[blue]{cancel_message}[/blue]")
+            console.input("Нажмите Enter, чтобы вернуться в меню...")
+            return None
+
+        patients = search_patients(db, query, SEARCH_LIMIT)
+
+        if not patients:
+            console.print("[blue]Ничего не найдено, попробуйте другой запрос.[/blue]")
+            continue
+
+        console.print(render_patients_table(patients))
+
+        # id найденных пациентов для проверки ввода
+        patient_ids = {patient.id for patient in patients}
+
+        while True:
+            patient_id_str = console.input("Введите ID пациента (Enter — новый поиск): ").strip()
+
+            if patient_id_str == "":
+                break # возвращаемся к поиску
+
+            if not patient_id_str.isdigit():
+                console.print("[red]ID пациента должен быть числом.[/red]")
+                console.input("Нажмите Enter, чтобы попробовать еще раз.")
+                continue
+
+            patient_id = int(patient_id_str)
+
+            if patient_id not in patient_ids:
+                console.print("[red]Пациента с таким ID нет среди найденных.[/red]")
+                console.input("Нажмите Enter, чтобы попробовать еще раз.")
+                continue
+
+            return patient_id
+
+
 def show_patients(db: Database) -> None:
     """
-    Вывод списка пациентов с информацией о владельцах в виде таблицы.
+    Вывод списка пациентов с информацией о владельцах в виде таблицы (постранично).
     """
     console.print("\n[bold cyan]Список пациентов[/bold cyan]")
 
-    patients = get_all_patients(db)
-
     # если список пациентов оказался пустым -> информируем пользователя
-    if not patients:
+    if not browse_patients(db, exit_hint="Enter — вернуться в меню"):
         console.print("[blue]Пациентов пока нет.[/blue]")
         console.input("\nНажмите Enter, чтобы вернуться в меню...")
         return
 
-    console.print(render_patients_table(patients))
-    console.input("\nНажмите Enter, чтобы вернуться в меню...")
-
 
 def create_appointment_menu(db: Database) -> None:
     """
@@ -220,20 +351,15 @@ def create_appointment_menu(db: Database) -> None:
 
     Примечания:
     - в любом поле можно нажать Enter для отмены;
-    - дата выбирается из списка (2 недели вперед);
-    - время выбирается из доступных слотов (09:00-16:30, шаг 30 минут).
+    - пациент выбирается через поиск (кличка, ФИО владельца или телефон);
+    - дата выбирается из списка (2 недели вперед), показываются только даты со свободными слотами;
+    - длительность приема выбирается из списка (30, 60 или 90 минут);
+    - время выбирается из доступных слотов по расписанию врача (с шагом 30 минут от начала смены);
+    - вместо ID врача можно ввести 0: будут предложены ближайшие свободные слоты у любого врача.
     """
     console.print("\n\n[bold cyan]Запись к врачу[/bold cyan]")
     console.print("Для выхода из режима записи к врачу оставьте любое поле пустым (нажмите Enter).\n")
 
-    # получаем список пациентов
-    patients = get_all_patients(db)
-    # если он пуст -> сообщаем пользователю и возвращаемся в главное меню
-    if not patients:
-        console.print("[blue]Нет пациентов для записи.[/blue]")
-        console.input("Нажмите Enter, чтобы вернуться в меню...")
-        return
-    
     # получаем список врачей
     doctors = get_all_doctors(db)
     if not doctors:
@@ -241,67 +367,95 @@ def create_appointment_menu(db: Database) -> None:
         console.input("Нажмите Enter, чтобы вернуться в меню...")
         return
     
-    # собираем id пациентов и врачей для дальнейшей проверки ввода
-    patient_ids = {pid for pid, *_ in patients}
-    doctor_ids = {did for did, _ in doctors}
+    # собираем id врачей для дальнейшей проверки ввода
+    doctor_ids = {doctor.id for doctor in doctors}
 
-    # показываем пациентов
-    console.print(render_patients_table(patients))
+    # ищем пациента по кличке, ФИО владельца или телефону
+    patient_id = choose_patient(db, cancel_message="Процесс записи прерван.")
+    if patient_id is None:
+        return
+
+    # показваем врачей
+    console.print("\n", render_doctors_table(doctors))
 
     while True:
-        patient_id_str = console.input("Введите ID пациента: ").strip()
+        doctor_id_str = console.input("Введите ID врача (0 — ближайшее свободное время у любого врача): ").strip()
 
-        if patient_id_str == "":
+        if doctor_id_str == "":
             console.print("[blue]Процесс записи прерван.[/blue]")
             console.input("Нажмите Enter, чтобы вернуться в меню...")
             return
         
-        if not patient_id_str.isdigit():
-            console.print("[red]ID пациента должен быть числом.[/red]")
+        if not doctor_id_str.isdigit():
+            console.print("[red]ID врача должен быть числом.[/red]")
             console.input("Нажмите Enter, чтобы попробовать еще раз.")
             continue
 
-        patient_id = int(patient_id_str)
+        doctor_id = int(doctor_id_str)
 
-        if patient_id not in patient_ids:
-            console.print("[red]Пациент с таким ID не найден.[/red]")
+        if doctor_id == 0:
+            doctor_id = None # врач будет выбран вместе со слотом
+            break
+
+        if doctor_id not in doctor_ids:
+            console.print("[red]Врач с таким ID не найден.[/red]")
             console.input("Нажмите Enter, чтобы попробовать еще раз.")
             continue
 
-        break # выходим из цикла выбора пациента
+        break # выходим из цикла выбора врача
 
-    # показваем врачей
-    console.print("\n", render_doctors_table(doctors))
+    # выбор длительности приема
+    console.print("\n[bold]Выберите длительность приема:[/bold]")
+    for i, option in enumerate(APPOINTMENT_DURATIONS, start=1):
+        console.print(f"{i}. {int(option.total_seconds() // 60)} минут")
 
     while True:
-        doctor_id_str = console.input("Введите ID врача: ").strip()
+        duration_choice = console.input("Номер длительности: ").strip()
 
-        if doctor_id_str == "":
+        if duration_choice == "":
             console.print("[blue]Процесс записи прерван.[/blue]")
             console.input("Нажмите Enter, чтобы вернуться в меню...")
             return
-        
-        if not doctor_id_str.isdigit():
-            console.print("[red]ID врача должен быть числом.[/red]")
+
+        if not duration_choice.isdigit():
+            console.print("[red]Номер длительности должен быть числом.[/red]")
             console.input("Нажмите Enter, чтобы попробовать еще раз.")
             continue
 
-        doctor_id = int(doctor_id_str)
-
-        if doctor_id not in doctor_ids:
-            console.print("[red]Врач с таким ID не найден.[/red]")
+        duration_idx = int(duration_choice) - 1
+        if not (0 <= duration_idx < len(APPOINTMENT_DURATIONS)):
+            console.print("[red]Неверный номер длительности.[/red]")
             console.input("Нажмите Enter, чтобы попробовать еще раз.")
             continue
 
-        break # выходим из цикла выбора врача
+        duration = APPOINTMENT_DURATIONS[duration_idx]
+        break # выходим из цикла выбора длительности
 
-    dates = get_available_dates()
+    if doctor_id is None:
+        choice = choose_earliest_slot(db, {doctor.id: doctor.full_name for doctor in doctors}, duration)
+        if choice is None:
+            return
+
+        doctor_id, appointment_dt = choice
+        book_appointment(db, patient_id, doctor_id, appointment_dt, duration)
+        return
+
+    # свободные слоты врача на весь горизонт записи — одним запросом
+    availability = get_availability_range(db, doctor_id, date.today(), BOOKING_HORIZON_DAYS, duration)
+
+    if not availability:
+        console.print("[blue]У выбранного врача нет свободных номерков в ближайшие дни.[/blue]")
+        console.input("Нажмите Enter, чтобы вернуться в меню...")
+        return
+
+    # показываем только даты, на которые еще есть свободное время
+    dates = list(availability)
 
     console.print("\n[bold]Выберите дату:[/bold]")
     for i, d in enumerate(dates, start=1):
-        console.print(f"{i}. {d.strftime('%Y-%m-%d')}")
+        console.print(f"{i}. {d.strftime('%Y-%m-%d')} (свободно: {len(availability[d])})")
 
-    # выбор времени
+    # выбор даты
     while True:
         date_choice = console.input("Номер даты: ").strip()
 
@@ -324,11 +478,7 @@ def create_appointment_menu(db: Database) -> None:
         chosen_day = dates[date_idx]
 
         # выбор времени
-        slots = get_available_slots_for_day(db, doctor_id, chosen_day)
-        if not slots:
-            console.print("[blue]На выбранную дату нет доступных номерков.[/blue]")
-            console.input("Нажмите Enter, чтобы выбрать другую дату...")
-            continue
+        slots = availability[chosen_day]
 
         console.print("\n[bold]Доступное время:[/bold]")
         for i, slot in enumerate(slots, start=1):
@@ -358,9 +508,53 @@ def create_appointment_menu(db: Database) -> None:
 
         break  # выходим из цикла выбора даты
 
-    # создаем запись
+    book_appointment(db, patient_id, doctor_id, appointment_dt, duration)
+
+
+def choose_earliest_slot(db: Database, doctors: dict[int, str], duration: timedelta) -> Optional[tuple[int, datetime]]:
+    """
+    Предлагает ближайшие свободные слоты у любого врача (один запрос find_earliest_slots)
+    и возвращает выбранную пару (id врача, начало приема) или None, если выбор отменен.
+    """
+    slots = find_earliest_slots(db, limit=EARLIEST_SLOTS_LIMIT, doctor_ids=doctors, duration=duration)
+
+    if not slots:
+        console.print("[blue]Свободных номерков в ближайшие дни нет.[/blue]")
+        console.input("Нажмите Enter, чтобы вернуться в меню...")
+        return None
+
+    console.print("\n[bold]Ближайшее свободное время:[/bold]")
+    for i, (doctor_id, slot) in enumerate(slots, start=1):
+        console.print(f"{i}. {slot.strftime('%Y-%m-%d %H:%M')} — {doctors[doctor_id]}")
+
+    while True:
+        slot_choice = console.input("Номер времени: ").strip()
+
+        if slot_choice == "":
+            console.print("[blue]Процесс записи прерван.[/blue]")
+            console.input("Нажмите Enter, чтобы вернуться в меню...")
+            return None
+
+        if not slot_choice.isdigit():
+            console.print("[red]Номер времени должен быть числом.[/red]")
+            console.input("Нажмите Enter, чтобы попробовать еще раз.")
+            continue
+
+        slot_idx = int(slot_choice) - 1
+        if not (0 <= slot_idx < len(slots)):
+            console.print("[red]Неверный номер времени.[/red]")
+            console.input("Нажмите Enter, чтобы попробовать еще раз.")
+            continue
+
+        return slots[slot_idx]
+
+
+def book_appointment(db: Database, patient_id: int, doctor_id: int, appointment_dt: datetime, duration: timedelta) -> None:
+    """
+    Создает запись и сообщает результат.
+    """
     try:
-        create_appointment(db, patient_id, doctor_id, appointment_dt)
+        create_appointment(db, patient_id, doctor_id, appointment_dt, duration)
     except Exception as e:
         console.print("[red]Ошибка при создании записи.[/red]")
         console.print(e)
@@ -369,26 +563,19 @@ def create_appointment_menu(db: Database) -> None:
 
     console.print("[green]Запись успешно создана![/green]")
     console.input("Нажмите Enter, чтобы вернуться в меню...")
-    return
 
 
 def show_future_appointments(db: Database) -> None:
     """
-    Выводит список предстоящих записей на прием.
+    Выводит список предстоящих записей на прием (постранично).
     """
     console.print("\n[bold cyan]Список записей к врачу[/bold cyan]")
 
-    appointments = get_future_appointments(db)
-
-    if not appointments:
+    if not browse_future_appointments(db, exit_hint="Enter — вернуться в главное меню"):
         console.print("[blue]Записей пока нет[/blue]")
         console.input("\nНажмите Enter, чтобы вернуться в главное меню...")
         return
 
-    console.print(render_appointments_table(appointments))
-    console.input("\nНажмите Enter, чтобы вернуться в главное меню...")
-    return
-
 
 def cancel_appointment_menu(db: Database) -> None:
     """
@@ -398,18 +585,11 @@ def cancel_appointment_menu(db: Database) -> None:
     console.print("\n[bold cyan]Отмена записи[/bold cyan]")
     console.print("Для выхода из режима отмены записи к врачу оставьте любое поле пустым (нажмите Enter).\n")
 
-    appointments = get_future_appointments(db)
-
-    if not appointments:
+    if not browse_future_appointments(db, exit_hint="Enter — выбрать запись"):
         console.print("[blue]Нет предстоящих записей.[/blue]")
         console.input("Нажмите Enter, чтобы вернуться в меню...")
         return
 
-    console.print(render_appointments_table(appointments))
-
-    # множество id для проверки
-    appointment_ids = {aid for aid, *_ in appointments}
-
     while True:
         aid_str = console.input("Введите ID записи для отмены: ").strip()
 
@@ -425,7 +605,8 @@ def cancel_appointment_menu(db: Database) -> None:
 
         appointment_id = int(aid_str)
 
-        if appointment_id not in appointment_ids:
+        date_time = get_future_appointment_time(db, appointment_id)
+        if date_time is None:
             console.print("[red]Запись с таким ID не найдена.[/red]")
             console.input("Нажмите Enter, чтобы попробовать еще раз.")
             continue
@@ -436,7 +617,7 @@ def cancel_appointment_menu(db: Database) -> None:
             confirm = console.input("\nВы уверены, что хотите отменить эту запись? (да/нет): ").strip().lower()
 
             if confirm == "да":
-                success = delete_appointment(db, appointment_id) # удаление
+                success = delete_appointment(db, appointment_id, date_time) # удаление (одна секция)
                 break
             elif confirm == "нет":
                 console.print("[blue]Запись не будет удалена.[/blue]")
@@ -463,57 +644,29 @@ def show_medical_card_menu(db: Database) -> None:
     console.print("\n[bold cyan]Просмотр медицинской карты[/bold cyan]")
     console.print("Для выхода из режима просмотра медицинской карты оставьте поле выбора пациента пустым (нажмите Enter).\n")
 
-    patients = get_all_patients(db)
-    if not patients:
-        console.print("[blue]Пациентов пока нет.[/blue]")
-        console.input("Нажмите Enter, чтобы вернуться в меню...")
+    # ищем пациента по кличке, ФИО владельца или телефону
+    patient_id = choose_patient(db, cancel_message="Просмотр медкарты отменен.")
+    if patient_id is None:
         return
 
-    # Показываем список пациентов (полная таблица)
-    console.print(render_patients_table(patients))
-
-    patient_ids = {pid for pid, *_ in patients}
-
-    while True:
-        patient_id_str = console.input("Введите ID пациента: ").strip()
-        if patient_id_str == "":
-            console.print("[blue]Просмотр медкарты отменен.[/blue]")
-            console.input("Нажмите Enter, чтобы вернуться в меню...")
-            return
-        if not patient_id_str.isdigit():
-            console.print("[red]ID пациента должен быть числом.[/red]")
-            console.input("Нажмите Enter, чтобы попробовать еще раз.")
-            continue
-
-        patient_id = int(patient_id_str)
-        if patient_id not in patient_ids:
-            console.print("[red]Пациент с таким ID не найден.[/red]")
-            console.input("Нажмите Enter, чтобы попробовать еще раз.")
-            continue
-        break
-
-    # Шапка медкарты
-    info = get_patient_card_info(db, patient_id)
-    if info is None:
+    # шапка и история записей — одним запросом (или из кэша медкарт)
+    card = medical_card_cache.get(db, patient_id)
+    if card is None:
         console.print("[red]Не удалось найти данные пациента.[/red]")
         console.input("Нажмите Enter, чтобы вернуться в меню...")
         return
 
-    pid, patient_name, species, owner_name, owner_phone = info
-
     header_text = (
-        f"[bold]Пациент:[/bold] {patient_name}\n"
-        f"[bold]Вид:[/bold] {species}\n\n"
-        f"[bold]Владелец:[/bold] {owner_name}\n"
-        f"[bold]Телефон:[/bold] {owner_phone}"
+        f"[bold]Пациент:[/bold] {card.name}\n"
+        f"[bold]Вид:[/bold] {card.species}\n\n"
+        f"[bold]Владелец:[/bold] {card.owner_full_name}\n"
+        f"[bold]Телефон:[/bold] {card.owner_phone}"
     )
     
-    console.print("\n", Panel(header_text, title=f"Медкарта №{pid}", style="cyan", expand=False))
+    console.print("\n", Panel(header_text, title=f"Медкарта №{card.patient_id}", style="cyan", expand=False))
 
     # Записи пациента
-    appointments = get_patient_appointments(db, pid)
-
-    if not appointments:
+    if not card.appointments:
         console.print("\n[blue]Записей к врачу нет.[/blue]")
         console.input("\nНажмите Enter, чтобы вернуться в меню...")
         return
@@ -523,11 +676,11 @@ def show_medical_card_menu(db: Database) -> None:
     table.add_column("Врач")
     table.add_column("Дата и время")
 
-    for aid, doctor_full_name, date_time in appointments:
+    for visit in card.appointments:
         table.add_row(
-            str(aid),
-            doctor_full_name,
-            date_time.strftime("%Y-%m-%d %H:%M")
+            str(visit.id),
+            visit.doctor_full_name,
+            visit.date_time.strftime("%Y-%m-%d %H:%M")
         )
 
     console.print("\n[bold]Записи к врачу:[/bold]")
@@ -536,6 +689,131 @@ def show_medical_card_menu(db: Database) -> None:
     console.input("\nНажмите Enter, чтобы вернуться в меню...")
 
 
+def show_workload_report(db: Database) -> None:
+    """
+    Отчет о загрузке врачей по дням или неделям: записи, занятое время против рабочего, часы пик.
+    Данные берутся из сводки doctor_day_stats; пересчет изменившихся дней — отдельный пункт
+    (обычно сводку обновляет refresh_workload.py по расписанию).
+    """
+    console.print("\n[bold cyan]Загрузка врачей[/bold cyan]")
+    console.print(f"1. По дням ({REPORT_DAYS} дней)")
+    console.print(f"2. По неделям ({REPORT_WEEKS} недели)")
+    console.print("3. Обновить сводку (пересчитать изменившиеся дни)")
+
+    period_choice = console.input("Ваш выбор (Enter — вернуться в меню): ").strip()
+    if period_choice == "":
+        return
+
+    if period_choice == "3":
+        count = refresh_workload(db)
+        console.print(f"[green]Сводка обновлена, пересчитано дней врачей: {count}.[/green]")
+        console.input("Нажмите Enter, чтобы вернуться в меню...")
+        return
+
+    if period_choice not in ("1", "2"):
+        console.print("[red]Неверный выбор.[/red]")
+        console.input("Нажмите Enter, чтобы вернуться в меню...")
+        return
+
+    start_input = console.input("Начальная дата ГГГГ-ММ-ДД (Enter — сегодня): ").strip()
+    try:
+        start = date.fromisoformat(start_input) if start_input else date.today()
+    except ValueError:
+        console.print("[red]Дата должна быть в формате ГГГГ-ММ-ДД.[/red]")
+        console.input("Нажмите Enter, чтобы вернуться в меню...")
+        return
+
+    if period_choice == "1":
+        period, end = DAY, start + timedelta(days=REPORT_DAYS - 1)
+    else:
+        period, end = WEEK, start + timedelta(weeks=REPORT_WEEKS) - timedelta(days=1)
+
+    rows = get_workload(db, start, end, period)
+    doctors = get_doctors(db)
+
+    if not rows:
+        console.print("[blue]Врачей пока нет.[/blue]")
+        console.input("Нажмите Enter, чтобы вернуться в меню...")
+        return
+
+    table = Table(show_header=True, header_style="bold cyan", title=f"Загрузка врачей {start} — {end}")
+    table.add_column("День" if period == DAY else "Неделя с")
+    table.add_column("Врач")
+    table.add_column("Записей", justify="right")
+    table.add_column("Занято / рабочих, ч", justify="right")
+    table.add_column("Загрузка", justify="right")
+    table.add_column("Первый прием")
+    table.add_column("Последний прием")
+
+    for row in rows:
+        table.add_row(
+            row.period_start.strftime("%Y-%m-%d"),
+            doctors.get(row.doctor_id, f"#{row.doctor_id}"),
+            str(row.booked),
+            f"{row.booked_minutes / 60:.1f} / {row.capacity_minutes / 60:.0f}",
+            f"{row.utilization:.0%}",
+            row.first_slot.strftime("%Y-%m-%d %H:%M") if row.first_slot else "—",
+            row.last_slot.strftime("%Y-%m-%d %H:%M") if row.last_slot else "—"
+        )
+
+    console.print("\n", table)
+
+    peak_hours = get_peak_hours(db, start, end)
+    if peak_hours:
+        top = sorted(peak_hours.items(), key=lambda item: item[1], reverse=True)[:3]
+        console.print("\n[bold]Часы пик:[/bold] " + ", ".join(f"{hour:02d}:00 ({count})" for hour, count in top))
+
+    console.input("\nНажмите Enter, чтобы вернуться в меню...")
+
+
+def show_query_stats(db: Database) -> None:
+    """
+    Статистика запросов к БД и журнал медленных запросов (скрытый пункт меню "s").
+    """
+    if db.query_stats is None:
+        console.print("[blue]Учет запросов отключен.[/blue]")
+        console.input("Нажмите Enter, чтобы вернуться в меню...")
+        return
+
+    stats = db.query_stats.snapshot()
+    if not stats:
+        console.print("[blue]Запросов еще не было.[/blue]")
+        console.input("Нажмите Enter, чтобы вернуться в меню...")
+        return
+
+    table = Table(show_header=True, header_style="bold cyan", title="Запросы к БД")
+    table.add_column("Запрос")
+    table.add_column("Вызовов", justify="right")
+    table.add_column("Ошибок", justify="right")
+    table.add_column("Всего, мс", justify="right")
+    table.add_column("Сред., мс", justify="right")
+    table.add_column("Макс., мс", justify="right")
+    table.add_column("Строк", justify="right")
+
+    for stat in stats:
+        table.add_row(
+            stat["name"],
+            str(stat["calls"]),
+            str(stat["errors"]),
+            f"{stat['total_ms']:.1f}",
+            f"{stat['avg_ms']:.2f}",
+            f"{stat['max_ms']:.2f}",
+            str(stat["rows"])
+        )
+
+    console.print("\n", table)
+
+    slow = db.query_stats.slow_queries()
+    console.print(f"\n[bold]Медленные запросы (дольше {db.query_stats.slow_query_ms:.0f} мс):[/bold] {len(slow)}")
+
+    for entry in slow[:10]:
+        console.print(f"\n[yellow]{entry['at']} {entry['name']}: {entry['duration_ms']:.1f} мс, строк: {entry['rows']}[/yellow]")
+        if entry["plan"]:
+            console.print(entry["plan"], markup=False, highlight=False)
+
+    console.input("\nНажмите Enter, чтобы вернуться в меню...")
+
+
 def run_menu(db: Database):
     while True:
         show_header()
@@ -555,6 +833,10 @@ def run_menu(db: Database):
             cancel_appointment_menu(db)
         elif choice == "6":
             show_medical_card_menu(db)
+        elif choice == "7":
+            show_workload_report(db)
+        elif choice == "s":
+            show_query_stats(db) # скрытый пункт: статистика запросов
         elif choice == "0":
             break
         else:
@@ -0,0 +1,131 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional, Sequence
+
+from psycopg import AsyncConnection, AsyncCursor
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import args_row
+from psycopg_pool import AsyncConnectionPool
+
+from db.database import RowFactory
+from db.events import ChangeNotifier
+from db.prepared import PreparedStatement
+
+
+class AsyncDatabase(ChangeNotifier):
+    """
+    Асинхронное подключение к PostgreSQL (psycopg 3) со своим пулом соединений.
+
+    Повторяет интерфейс Database: `async with db.connection()` / `async with db.cursor()`,
+    вложенные блоки одной задачи asyncio получают то же соединение и одну транзакцию.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        database: str,
+        user: str,
+        password: str,
+        min_connections: int = 1,
+        max_connections: int = 10,
+        pool_timeout: float = 30.0
+    ):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.database = database
+        self.user = user
+        self.password = password
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self._pool: Optional[AsyncConnectionPool] = None
+
+        # соединение и очередь событий, выданные текущей задаче asyncio
+        self._conn: ContextVar[Optional[AsyncConnection]] = ContextVar("async_db_conn", default=None)
+        self._pending_events: ContextVar[Optional[list]] = ContextVar("async_db_pending", default=None)
+
+    async def connect(self) -> None:
+        """Создает и открывает пул соединений с БД"""
+        if self._pool is None:
+            pool = AsyncConnectionPool(
+                make_conninfo(
+                    host=self.host,
+                    port=self.port,
+                    dbname=self.database,
+                    user=self.user,
+                    password=self.password
+                ),
+                min_size=self.min_connections,
+                max_size=self.max_connections,
+                timeout=self.pool_timeout,
+                # соединение проверяется при каждой выдаче из пула, разорванное заменяется новым
+                check=AsyncConnectionPool.check_connection,
+                open=False
+            )
+            await pool.open(wait=True)
+            self._pool = pool
+
+    def get_pool(self) -> AsyncConnectionPool:
+        """Возвращает активный пул соединений"""
+        if self._pool is None:
+            raise RuntimeError("Не удалось установить соединение с базой данных")
+        return self._pool
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[AsyncConnection]:
+        """
+        Выдает соединение из пула на время блока async with.
+        При успешном выходе из внешнего блока транзакция фиксируется, при исключении — откатывается.
+        """
+        conn = self._conn.get()
+
+        # вложенный вызов: транзакцией управляет внешний блок
+        if conn is not None:
+            yield conn
+            return
+
+        pending: list = []
+
+        # пул сам выполняет commit / rollback при возврате соединения
+        async with self.get_pool().connection() as conn:
+            conn_token = self._conn.set(conn)
+            pending_token = self._pending_events.set(pending)
+            try:
+                yield conn
+            finally:
+                self._conn.reset(conn_token)
+                self._pending_events.reset(pending_token)
+
+        # об изменениях сообщаем только после успешного commit
+        self._dispatch_all(pending)
+
+    @asynccontextmanager
+    async def cursor(self, row_factory: Optional[RowFactory] = None) -> AsyncIterator[AsyncCursor]:
+        """Выдает курсор на соединении из пула (см. connection); row_factory — как в Database.cursor"""
+        async with self.connection() as conn:
+            if row_factory is None:
+                async with conn.cursor() as cur:
+                    yield cur
+                return
+
+            async with conn.cursor(row_factory=args_row(row_factory)) as cur:
+                yield cur
+
+    async def execute_prepared(self, cur: AsyncCursor, statement: PreparedStatement, params: Sequence = ()) -> None:
+        """
+        Выполняет подготовленный запрос сервиса (тот же, что Database.execute_prepared).
+        psycopg 3 сам готовит запрос на соединении при первом выполнении (prepare=True).
+        """
+        await cur.execute(statement.query, statement.query_params(params), prepare=True)
+
+    def _pending(self) -> Optional[list]:
+        """Очередь событий транзакции текущей задачи"""
+        return self._pending_events.get()
+
+    async def close(self) -> None:
+        """Закрывает все соединения пула"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
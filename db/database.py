@@ -1,45 +1,414 @@
+import itertools
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Sequence
+
 import psycopg2
-from psycopg2.extensions import connection
-from typing import Optional
+from psycopg2.extensions import connection, cursor
+
+from db.events import ChangeNotifier
+from db.listener import NotificationListener
+from db.pool import ConnectionPool, PoolTimeoutError
+from db.prepared import PreparedStatement, PreparedStatements
+from db.stats import SLOW_QUERY_MS, QueryStats, caller_query_name
+
+
+logger = logging.getLogger(__name__)
+
+# режимы блока connection() / cursor(): куда направить транзакцию
+WRITE = "write" # основной сервер; транзакция считается записью
+READ = "read" # только чтение: реплика, если с последней записи потока прошло больше окна read_your_writes
+READ_PRIMARY = "read_primary" # только чтение, но на основном сервере (свежие данные для кэшей и проверок перед записью)
+
+READ_YOUR_WRITES_SECONDS = 5.0 # сколько секунд после записи поток читает с основного сервера
+REPLICA_RETRY_SECONDS = 30.0 # сколько секунд не обращаться к реплике после ошибки подключения
+
+# конструктор строки результата: вызывается со значениями колонок по порядку (например, класс модели)
+RowFactory = Callable[..., Any]
+
+
+class RowFactoryCursor(cursor):
+    """
+    Курсор, который отдает строки результата не кортежами, а объектами make_row(*значения)
+    (без make_row — обычными кортежами). Его выдает db.cursor().
+    """
+
+    make_row: Optional[RowFactory] = None
+
+    def execute(self, query, vars=None, name: Optional[str] = None):
+        # name — имя запроса для статистики, учитывается в InstrumentedCursor
+        return super().execute(query, vars)
+
+    def copy_expert(self, sql, file, size=8192, name: Optional[str] = None):
+        return super().copy_expert(sql, file, size)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is None or self.make_row is None:
+            return row
+        return self.make_row(*row)
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self.make_row is None:
+            return rows
+        return [self.make_row(*row) for row in rows]
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if self.make_row is None:
+            return rows
+        return [self.make_row(*row) for row in rows]
+
+    def __iter__(self):
+        row = self.fetchone()
+        while row is not None:
+            yield row
+            row = self.fetchone()
+
+
+class InstrumentedCursor(RowFactoryCursor):
+    """
+    Курсор, который учитывает каждый запрос в QueryStats (см. db/stats.py).
+    Имя запроса — функция, вызвавшая execute, или явно переданное name.
+    """
+
+    stats: Optional[QueryStats] = None
+
+    def execute(self, query, vars=None, name: Optional[str] = None):
+        name = name or caller_query_name()
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except BaseException:
+            self.stats.record(name, (time.perf_counter() - started) * 1000, 0, failed=True)
+            raise
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.stats.record(name, duration_ms, self.rowcount)
+
+        if self.stats.is_slow(duration_ms):
+            plan = self._explain(query, vars) if self.stats.explain_slow else None
+            sql = query.decode(errors="replace") if isinstance(query, bytes) else str(query)
+            self.stats.record_slow(name, sql, duration_ms, self.rowcount, plan)
+
+        return result
+
+    def copy_expert(self, sql, file, size=8192, name: Optional[str] = None):
+        name = name or caller_query_name()
+        started = time.perf_counter()
+        try:
+            result = super().copy_expert(sql, file, size)
+        except BaseException:
+            self.stats.record(name, (time.perf_counter() - started) * 1000, 0, failed=True)
+            raise
+
+        self.stats.record(name, (time.perf_counter() - started) * 1000, self.rowcount)
+        return result
+
+    def _explain(self, query, vars) -> str:
+        """
+        Снимает EXPLAIN (ANALYZE, BUFFERS) медленного запроса отдельным курсором того же соединения.
+        Запрос выполняется повторно внутри SAVEPOINT, изменения данных откатываются.
+        """
+        prefix = b"EXPLAIN (ANALYZE, BUFFERS) " if isinstance(query, bytes) else "EXPLAIN (ANALYZE, BUFFERS) "
+
+        with self.connection.cursor() as cursor:
+            cursor.execute("SAVEPOINT query_stats_explain")
+            try:
+                cursor.execute(prefix + query, vars)
+                return "\n".join(row[0] for row in cursor.fetchall())
+            except psycopg2.Error as e:
+                return f"EXPLAIN не выполнен: {e}".strip()
+            finally:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_stats_explain")
+                cursor.execute("RELEASE SAVEPOINT query_stats_explain")
+
+
+class Database(ChangeNotifier):
+    """
+    Класс для подключения к PostgreSQL.
+
+    Соединения берутся из пула: каждый поток получает собственное соединение
+    на время блока `with db.connection()` / `with db.cursor()`.
+    Запросы через db.cursor() учитываются в db.query_stats (если не передано instrument=False).
 
+    Чтение с реплик: если переданы replica_dsns, блоки с mode=READ выполняются на репликах
+    (по очереди), остальные — на основном сервере. После записи (блок WRITE) поток еще
+    read_your_writes секунд читает с основного сервера, чтобы видеть свои изменения,
+    пока они доезжают до реплик.
 
-class Database:
-    """Класс для подключения к PostgreSQL"""
+    Примечания:
+    - окно read_your_writes отсчитывается для каждого потока отдельно
+      (в HTTP-сервере — для каждого клиентского соединения);
+    - окно не гарантирует свежесть при отставании реплики дольше read_your_writes;
+    - недоступная реплика пропускается на REPLICA_RETRY_SECONDS, чтение уходит на основной сервер.
+
+    Изменения из других процессов: start_listener() запускает NotificationListener, который
+    передает подписчикам (subscribe) уведомления триггеров об изменениях appointments, patients,
+    owners и doctors. Соединения процесса помечаются параметром clinic.origin = origin,
+    чтобы слушатель пропускал уведомления о собственных изменениях.
+    """
 
     def __init__(
         self,
-        host: str,
-        port: int,
-        database: str,
-        user: str,
-        password: str
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        database: Optional[str] = None,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        min_connections: int = 1,
+        max_connections: int = 10,
+        pool_timeout: float = 30.0,
+        health_check_after: float = 60.0,
+        instrument: bool = True,
+        slow_query_ms: float = SLOW_QUERY_MS,
+        explain_slow: bool = False,
+        dsn: Optional[str] = None,
+        replica_dsns: Sequence[str] = (),
+        read_your_writes: float = READ_YOUR_WRITES_SECONDS
     ):
+        """
+        Аргументы:
+            host, port, database, user, password: параметры основного сервера
+            dsn: строка подключения к основному серверу (параметры выше, если заданы, ее дополняют)
+            replica_dsns: строки подключения к репликам для чтения (пусто — все на основном сервере)
+            read_your_writes: сколько секунд после записи поток читает с основного сервера
+        """
+        super().__init__()
         self.host = host
         self.port = port
         self.database = database
         self.user = user
         self.password = password
-        self._connection: Optional[connection] = None
+        self.dsn = dsn
+        self.replica_dsns = list(replica_dsns)
+        self.read_your_writes = read_your_writes
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.health_check_after = health_check_after
+        self._pool: Optional[ConnectionPool] = None
+        self._replica_pools: list[ConnectionPool] = []
+        self._replica_down_until: list[float] = [] # до какого момента реплика пропускается
+        self._replica_order = itertools.count() # очередь реплик (по кругу)
+        self._local = threading.local() # соединение, выданное текущему потоку
+
+        # метка соединений процесса (попадает в уведомления триггеров) и слушатель уведомлений
+        self.origin = uuid.uuid4().hex
+        self.listener: Optional[NotificationListener] = None
+
+        # подготовленные запросы по соединениям пула
+        self.prepared = PreparedStatements()
+
+        # статистика запросов (None — курсоры без учета, см. InstrumentedCursor)
+        self.query_stats: Optional[QueryStats] = None
+        if instrument:
+            self.query_stats = QueryStats(slow_query_ms=slow_query_ms, explain_slow=explain_slow)
+
+    def _new_connection(self) -> connection:
+        """Открывает новое физическое соединение с основным сервером"""
+        return psycopg2.connect(
+            self.dsn,
+            host=self.host,
+            port=self.port,
+            dbname=self.database,
+            user=self.user,
+            password=self.password,
+            options=f"-c clinic.origin={self.origin}"
+        )
 
     def connect(self) -> None:
-        """Устанавливает соединение с БД"""
-        if self._connection is None:
-            self._connection = psycopg2.connect(
-                host=self.host,
-                port=self.port,
-                dbname=self.database,
-                user=self.user,
-                password=self.password
+        """
+        Создает пулы соединений: с основным сервером и с каждой репликой.
+        Пулы реплик открывают соединения по мере надобности, поэтому недоступная реплика
+        не мешает запуску.
+        """
+        if self._pool is None:
+            self._pool = ConnectionPool(
+                self._new_connection,
+                min_size=self.min_connections,
+                max_size=self.max_connections,
+                timeout=self.pool_timeout,
+                health_check_after=self.health_check_after
             )
 
-    def get_connection(self) -> connection:
-        """Возвращает активное соединение с БД"""
-        if self._connection is None:
+            self._replica_pools = [
+                ConnectionPool(
+                    lambda replica_dsn=replica_dsn: psycopg2.connect(replica_dsn),
+                    min_size=0,
+                    max_size=self.max_connections,
+                    timeout=self.pool_timeout,
+                    health_check_after=self.health_check_after
+                )
+                for replica_dsn in self.replica_dsns
+            ]
+            self._replica_down_until = [0.0] * len(self._replica_pools)
+
+    def get_pool(self) -> ConnectionPool:
+        """Возвращает активный пул соединений"""
+        if self._pool is None:
             raise RuntimeError("Не удалось установить соединение с базой данных")
-        return self._connection
+        return self._pool
+
+    def _replica_conn(self) -> Optional[tuple[ConnectionPool, connection]]:
+        """
+        Соединение с очередной доступной репликой: (пул, соединение).
+        None — реплик нет, или ни к одной не удалось подключиться.
+        """
+        count = len(self._replica_pools)
+        if count == 0:
+            return None
+
+        first = next(self._replica_order)
+        for i in range(count):
+            index = (first + i) % count
+            if self._replica_down_until[index] > time.monotonic():
+                continue
+
+            pool = self._replica_pools[index]
+            try:
+                return pool, pool.getconn()
+            except (psycopg2.OperationalError, PoolTimeoutError):
+                logger.warning("Реплика %s недоступна, чтение идет на другие серверы", index + 1, exc_info=True)
+                self._replica_down_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+
+        return None
+
+    def _in_write_window(self) -> bool:
+        """Была ли у текущего потока запись меньше read_your_writes секунд назад"""
+        last_write = getattr(self._local, "last_write", None)
+        return last_write is not None and time.monotonic() - last_write < self.read_your_writes
+
+    @contextmanager
+    def connection(self, mode: str = WRITE) -> Iterator[connection]:
+        """
+        Выдает соединение из пула на время блока with.
+
+        Аргументы:
+            mode: WRITE — основной сервер (по умолчанию); READ — только чтение, реплика
+                  вне окна read_your_writes; READ_PRIMARY — только чтение на основном сервере
+
+        Примечания:
+        - при успешном выходе из внешнего блока транзакция фиксируется, при исключении — откатывается;
+        - вложенные блоки в том же потоке получают то же соединение,
+          поэтому несколько сервисных функций можно объединить в одну транзакцию;
+        - блок WRITE или READ_PRIMARY внутри блока, открытого на реплике, — ошибка (RuntimeError):
+          такой блок получил бы соединение с репликой и мог бы прочитать устаревшие данные.
+        """
+        if mode not in (WRITE, READ, READ_PRIMARY):
+            raise ValueError(f"Неизвестный режим соединения: {mode}")
+
+        conn = getattr(self._local, "conn", None)
+
+        # вложенный вызов: транзакцией управляет внешний блок
+        if conn is not None:
+            if mode != READ and self._local.on_replica:
+                raise RuntimeError(
+                    "Запись внутри блока чтения с реплики." if mode == WRITE
+                    else "Чтение с основного сервера внутри блока чтения с реплики."
+                )
+            if mode == WRITE:
+                self._local.wrote = True
+            yield conn
+            return
+
+        pool = self.get_pool()
+        replica = None
+        if mode == READ and not self._in_write_window():
+            replica = self._replica_conn()
+
+        if replica is not None:
+            pool, conn = replica
+        else:
+            conn = pool.getconn()
+
+        self._local.conn = conn
+        self._local.on_replica = replica is not None
+        self._local.wrote = mode == WRITE
+        self._local.pending = []
+
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass # соединение разорвано — пул его закроет
+            raise
+        finally:
+            pending = self._local.pending
+            wrote = self._local.wrote
+            self._local.conn = None
+            self._local.pending = []
+            pool.putconn(conn)
+
+            # окно read-your-writes открывается и после неудачной записи: часть изменений могла пройти
+            if wrote:
+                self._local.last_write = time.monotonic()
+
+        # об изменениях сообщаем только после успешного commit
+        self._dispatch_all(pending)
+
+    @contextmanager
+    def cursor(self, row_factory: Optional[RowFactory] = None, mode: str = WRITE) -> Iterator[cursor]:
+        """
+        Выдает курсор на соединении из пула (см. connection, в том числе про mode).
+        С row_factory строки результата собираются как row_factory(*значения колонок),
+        например db.cursor(row_factory=Owner); без него — обычные кортежи.
+        Если включен учет запросов (instrument=True), курсор записывает их в db.query_stats.
+        """
+        with self.connection(mode) as conn:
+            if self.query_stats is not None:
+                with conn.cursor(cursor_factory=InstrumentedCursor) as cur:
+                    cur.make_row = row_factory
+                    cur.stats = self.query_stats
+                    yield cur
+                return
+
+            with conn.cursor(cursor_factory=RowFactoryCursor) as cur:
+                cur.make_row = row_factory
+                yield cur
+
+    def execute_prepared(self, cur: cursor, statement: PreparedStatement, params: Sequence = ()) -> None:
+        """
+        Выполняет подготовленный запрос на курсоре из db.cursor().
+        На соединении запрос готовится один раз (PREPARE), дальше выполняется через EXECUTE.
+        """
+        self.prepared.execute(cur, statement, params)
+
+    def _pending(self) -> Optional[list]:
+        """Очередь событий транзакции текущего потока"""
+        if getattr(self._local, "conn", None) is None:
+            return None
+        return self._local.pending
+
+    def start_listener(self) -> NotificationListener:
+        """
+        Запускает слушатель изменений из других процессов (повторный вызов возвращает уже запущенный).
+        Подписчики db.subscribe начинают получать и чужие изменения — из фонового потока слушателя.
+        """
+        if self.listener is None:
+            listener = NotificationListener(self, self._new_connection, self.origin)
+            listener.start()
+            self.listener = listener
+        return self.listener
 
     def close(self) -> None:
-        """Закрывает соединение с БД"""
-        if self._connection is not None:
-            self._connection.close()
-            self._connection = None
+        """Останавливает слушатель изменений и закрывает все соединения пулов"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+
+        for pool in self._replica_pools:
+            pool.closeall()
+        self._replica_pools = []
+        self._replica_down_until = []
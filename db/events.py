@@ -0,0 +1,65 @@
+import logging
+from typing import Any, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# обработчик изменения данных: (операция, данные строки)
+ChangeListener = Callable[[str, dict[str, Any]], None]
+
+# операция "таблица могла измениться как угодно" (строка пустая): после потери уведомлений
+# из других процессов или после массового изменения; подписчик сбрасывает все, что знает о таблице
+RESYNC = "resync"
+
+
+class ChangeNotifier:
+    """
+    Подписка на изменения таблиц.
+
+    Сервисы сообщают об измененных строках через emit, подписчики
+    (кэши, матрица доступности) получают события после commit транзакции.
+    """
+
+    def __init__(self):
+        self._listeners: dict[str, list[ChangeListener]] = {}
+
+    def _pending(self) -> Optional[list]:
+        """
+        Очередь событий текущей транзакции или None, если транзакция не открыта.
+        Реализуется классом подключения.
+        """
+        return None
+
+    def subscribe(self, table: str, listener: ChangeListener) -> None:
+        """Подписывает обработчик на изменения таблицы"""
+        self._listeners.setdefault(table, []).append(listener)
+
+    def unsubscribe(self, table: str, listener: ChangeListener) -> None:
+        """Отписывает обработчик от изменений таблицы"""
+        listeners = self._listeners.get(table, [])
+        if listener in listeners:
+            listeners.remove(listener)
+
+    def emit(self, table: str, op: str, row: dict[str, Any]) -> None:
+        """
+        Сообщает подписчикам об изменении строки таблицы.
+        Внутри блока connection() событие откладывается до commit и отбрасывается при rollback.
+        """
+        pending = self._pending()
+        if pending is not None:
+            pending.append((table, op, row))
+        else:
+            self._dispatch(table, op, row)
+
+    def _dispatch(self, table: str, op: str, row: dict[str, Any]) -> None:
+        """Вызывает обработчики; ошибка одного обработчика не мешает остальным"""
+        for listener in list(self._listeners.get(table, [])):
+            try:
+                listener(op, row)
+            except Exception:
+                logger.exception("Ошибка в обработчике изменений таблицы %s", table)
+
+    def _dispatch_all(self, pending: list) -> None:
+        """Рассылает события, накопленные за транзакцию"""
+        for table, op, row in pending:
+            self._dispatch(table, op, row)
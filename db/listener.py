@@ -0,0 +1,169 @@
+import json
+import logging
+import select
+import threading
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+import psycopg2
+from psycopg2.extensions import connection
+
+from db.events import RESYNC, ChangeNotifier
+
+
+logger = logging.getLogger(__name__)
+
+CHANGES_CHANNEL = "clinic_changes" # канал, в который пишут триггеры notify_changes (schema.sql)
+# таблицы с триггерами notify_changes
+NOTIFY_TABLES = ("appointments", "patients", "owners", "doctors", "doctor_schedules", "schedule_exceptions")
+
+POLL_TIMEOUT = 1.0 # сколько секунд ждать уведомлений, прежде чем проверить флаг остановки
+RECONNECT_DELAY = 1.0 # пауза перед первой попыткой переподключения
+RECONNECT_MAX_DELAY = 30.0 # пауза растет вдвое до этого предела
+
+# поля строк, которые приходят строками ISO 8601, а подписчикам нужны как datetime
+TIMESTAMP_FIELDS = ("date_time", "end_time")
+
+
+def parse_change(payload: str) -> tuple[str, str, Optional[str], dict[str, Any]]:
+    """
+    Разбирает сообщение триггера notify_changes: (таблица, операция, метка процесса-источника, строка).
+    Формат: {"t": таблица, "op": "insert" | "delete" | "resync", "o": метка, "r": {колонка: значение}}.
+    """
+    message = json.loads(payload)
+    row = message.get("r") or {}
+
+    for field in TIMESTAMP_FIELDS:
+        if isinstance(row.get(field), str):
+            row[field] = datetime.fromisoformat(row[field])
+
+    return message["t"], message["op"], message.get("o"), row
+
+
+class NotificationListener:
+    """
+    Слушатель изменений из других процессов (LISTEN / NOTIFY).
+
+    Триггеры таблиц публикуют компактные сообщения об измененных строках в канал CHANGES_CHANNEL,
+    а слушатель в фоновом потоке принимает их на отдельном соединении и передает подписчикам
+    notifier (db.subscribe) так же, как события собственных транзакций процесса, — кэши
+    узнают о записях и отменах других регистратур через миллисекунды после их commit.
+
+    Примечания:
+    - сообщения от соединений самого процесса (метка origin) пропускаются: о своих изменениях
+      подписчики уже узнали через emit, а повтор после более поздних событий вернул бы старое состояние;
+    - обработчики вызываются в потоке слушателя и должны быть потокобезопасными;
+    - после разрыва соединение восстанавливается, а подписчики всех NOTIFY_TABLES получают RESYNC:
+      уведомления, отправленные во время разрыва, потеряны.
+    """
+
+    def __init__(
+        self,
+        notifier: ChangeNotifier,
+        connect: Callable[[], connection],
+        origin: Optional[str] = None,
+        channel: str = CHANGES_CHANNEL
+    ):
+        """
+        Аргументы:
+            notifier: кому передавать изменения (обычно Database)
+            connect: открывает новое соединение с основным сервером (на репликах LISTEN не работает)
+            origin: метка соединений своего процесса (Database.origin)
+            channel: канал уведомлений
+        """
+        self.notifier = notifier
+        self.channel = channel
+        self.origin = origin
+        self._connect = connect
+        self._conn: Optional[connection] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.received = 0 # сколько уведомлений передано подписчикам
+        self.skipped = 0 # сколько своих уведомлений пропущено
+
+    def start(self) -> None:
+        """
+        Подключается, подписывается на канал и запускает фоновый поток.
+        Ошибка первого подключения выбрасывается сразу.
+        """
+        if self._thread is not None:
+            return
+
+        self._conn = self._listen()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Останавливает поток и закрывает соединение"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _listen(self) -> connection:
+        """Открывает соединение в режиме autocommit и выполняет LISTEN"""
+        conn = self._connect()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return conn
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+            self._conn = None
+
+    def _run(self) -> None:
+        delay = RECONNECT_DELAY
+
+        try:
+            while not self._stop.is_set():
+                if self._conn is None:
+                    try:
+                        self._conn = self._listen()
+                    except psycopg2.OperationalError:
+                        logger.warning("Слушатель изменений не может подключиться, повтор через %.0f с", delay)
+                        self._stop.wait(delay)
+                        delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                        continue
+
+                    delay = RECONNECT_DELAY
+                    for table in NOTIFY_TABLES:
+                        self.notifier._dispatch(table, RESYNC, {})
+
+                try:
+                    self._poll()
+                except (psycopg2.OperationalError, psycopg2.InterfaceError, OSError):
+                    logger.warning("Слушатель изменений потерял соединение", exc_info=True)
+                    self._close()
+        finally:
+            self._close()
+
+    def _poll(self) -> None:
+        """Ждет уведомлений не дольше POLL_TIMEOUT и передает пришедшие подписчикам"""
+        if select.select([self._conn], [], [], POLL_TIMEOUT) == ([], [], []):
+            return
+
+        self._conn.poll()
+        while self._conn.notifies:
+            self.handle(self._conn.notifies.pop(0).payload)
+
+    def handle(self, payload: str) -> None:
+        """Передает подписчикам одно уведомление (некорректное сообщение пропускается с записью в журнал)"""
+        try:
+            table, op, origin, row = parse_change(payload)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            logger.warning("Некорректное уведомление об изменении: %r", payload)
+            return
+
+        if origin is not None and origin == self.origin:
+            self.skipped += 1
+            return
+
+        self.received += 1
+        self.notifier._dispatch(table, op, row)
@@ -1,10 +1,12 @@
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 
 
 class Owner:
     """Класс для представления хозяев животных"""
 
+    __slots__ = ("id", "full_name", "phone")
+
     def __init__(
             self,
             id: Optional[int],
@@ -33,6 +35,8 @@ class Owner:
 class Patient:
     """Класс для представления пациентов клиники (животных)"""
 
+    __slots__ = ("id", "owner_id", "name", "species")
+
     def __init__(
             self,
             id: Optional[int],
@@ -63,6 +67,9 @@ class Patient:
 
 class Doctor:
     """Класс для представления докторов клиники"""
+
+    __slots__ = ("id", "full_name")
+
     def __init__(
             self,
             id: Optional[int],
@@ -89,12 +96,15 @@ class Doctor:
 class Appointment:
     """Класс для представления записей на прием"""
 
+    __slots__ = ("id", "patient_id", "doctor_id", "date_time", "end_time")
+
     def __init__(
             self,
             id: Optional[int],
             patient_id: int,
             doctor_id: int,
-            date_time: datetime
+            date_time: datetime,
+            end_time: datetime
     ):
         """
         Конструктор класса Appointment
@@ -103,14 +113,154 @@ class Appointment:
             id: идентификатор записи (может быть None до сохранения в БД)
             patient_id: идентификатор пациента, записанного на прием
             doctor_id: идентификатор доктора, проводящего прием
-            date_time: дата и время приема
+            date_time: дата и время начала приема
+            end_time: дата и время окончания приема
         """
         self.id = id
         self.patient_id = patient_id
         self.doctor_id = doctor_id
         self.date_time = date_time
+        self.end_time = end_time
+
+
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return f"Appointment(id={self.id}, patient_id={self.patient_id}, doctor_id={self.doctor_id}, date_time='{self.date_time}', end_time='{self.end_time}')"
+
+
+
+# СТРОКИ ВЫБОРОК
+# Результаты запросов с JOIN: строятся прямо из строк курсора (db.cursor(row_factory=...)),
+# порядок аргументов конструктора совпадает с порядком колонок в SELECT.
+
+
+class PatientRow:
+    """Пациент с данными владельца (списки пациентов, поиск, шапка медкарты)"""
+
+    __slots__ = ("id", "name", "species", "owner_full_name", "owner_phone")
+
+    def __init__(
+            self,
+            id: int,
+            name: str,
+            species: str,
+            owner_full_name: str,
+            owner_phone: str
+    ):
+        self.id = id
+        self.name = name
+        self.species = species
+        self.owner_full_name = owner_full_name
+        self.owner_phone = owner_phone
+
+
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return f"PatientRow(id={self.id}, name='{self.name}', species='{self.species}', owner_full_name='{self.owner_full_name}')"
+
+
+
+class AppointmentRow:
+    """Запись на прием с данными пациента, владельца и врача (списки предстоящих записей)"""
+
+    __slots__ = (
+        "id",
+        "patient_name",
+        "patient_species",
+        "owner_full_name",
+        "owner_phone",
+        "doctor_full_name",
+        "date_time"
+    )
+
+    def __init__(
+            self,
+            id: int,
+            patient_name: str,
+            patient_species: str,
+            owner_full_name: str,
+            owner_phone: str,
+            doctor_full_name: str,
+            date_time: datetime
+    ):
+        self.id = id
+        self.patient_name = patient_name
+        self.patient_species = patient_species
+        self.owner_full_name = owner_full_name
+        self.owner_phone = owner_phone
+        self.doctor_full_name = doctor_full_name
+        self.date_time = date_time
 
 
     def __repr__(self):
         """Строковое представление (для отладки)"""
-        return f"Appointment(id={self.id}, patient_id={self.patient_id}, doctor_id={self.doctor_id}, date_time='{self.date_time}')"
\ No newline at end of file
+        return f"AppointmentRow(id={self.id}, patient_name='{self.patient_name}', doctor_full_name='{self.doctor_full_name}', date_time='{self.date_time}')"
+
+
+
+class VisitRow:
+    """Запись в истории пациента (медкарта): id записи, врач, дата и время"""
+
+    __slots__ = ("id", "doctor_full_name", "date_time")
+
+    def __init__(
+            self,
+            id: int,
+            doctor_full_name: str,
+            date_time: datetime
+    ):
+        self.id = id
+        self.doctor_full_name = doctor_full_name
+        self.date_time = date_time
+
+
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return f"VisitRow(id={self.id}, doctor_full_name='{self.doctor_full_name}', date_time='{self.date_time}')"
+
+
+
+class WorkloadRow:
+    """
+    Загрузка врача за период (отчет по сводке doctor_day_stats):
+    записей, занятые минуты, рабочие минуты периода, первый и последний прием
+    """
+
+    __slots__ = (
+        "doctor_id",
+        "period_start",
+        "booked",
+        "booked_minutes",
+        "capacity_minutes",
+        "first_slot",
+        "last_slot"
+    )
+
+    def __init__(
+            self,
+            doctor_id: int,
+            period_start: date,
+            booked: int,
+            booked_minutes: int,
+            capacity_minutes: int,
+            first_slot: Optional[datetime],
+            last_slot: Optional[datetime]
+    ):
+        self.doctor_id = doctor_id
+        self.period_start = period_start
+        self.booked = booked
+        self.booked_minutes = booked_minutes
+        self.capacity_minutes = capacity_minutes
+        self.first_slot = first_slot
+        self.last_slot = last_slot
+
+
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return f"WorkloadRow(doctor_id={self.doctor_id}, period_start='{self.period_start}', booked={self.booked}, utilization={self.utilization:.0%})"
+
+
+    @property
+    def utilization(self) -> float:
+        """Доля занятого рабочего времени"""
+        return self.booked_minutes / self.capacity_minutes if self.capacity_minutes else 0.0
@@ -0,0 +1,160 @@
+import threading
+import time
+from typing import Callable, Optional
+
+import psycopg2
+from psycopg2.extensions import connection, TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeoutError(RuntimeError):
+    """Все соединения пула заняты, и ни одно не освободилось за отведенное время"""
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений с PostgreSQL.
+
+    Примечания:
+    - при создании открывается min_size соединений, дальше пул растет до max_size;
+    - если все соединения заняты, getconn ждет не дольше timeout секунд;
+    - соединение, простоявшее без дела дольше health_check_after секунд,
+      перед выдачей проверяется запросом SELECT 1 и при необходимости пересоздается.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], connection],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        health_check_after: float = 60.0
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Некорректные размеры пула соединений.")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+
+        self._idle: list[tuple[connection, float]] = [] # (соединение, время возврата в пул)
+        self._size = 0 # сколько соединений сейчас открыто (свободные + выданные)
+        self._closed = False
+        self._cond = threading.Condition()
+
+        for _ in range(min_size):
+            self._idle.append((self._open(), time.monotonic()))
+
+    def _open(self) -> connection:
+        """Открывает новое соединение и учитывает его в размере пула"""
+        conn = self._connect()
+        self._size += 1
+        return conn
+
+    def _discard(self, conn: connection) -> None:
+        """Закрывает соединение и убирает его из учета (вызывается под блокировкой)"""
+        self._size -= 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_alive(self, conn: connection) -> bool:
+        """Проверяет, что соединение живое"""
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout: Optional[float] = None) -> connection:
+        """
+        Выдает соединение из пула.
+        Если свободных нет и пул уже максимального размера — ждет освобождения.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            conn: Optional[connection] = None
+            released_at = 0.0
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Пул соединений закрыт")
+
+                    if self._idle:
+                        conn, released_at = self._idle.pop()
+                        break
+
+                    if self._size < self.max_size:
+                        self._size += 1 # резервируем место, само подключение — вне блокировки
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"Нет свободных соединений с БД (ожидание {timeout:.1f} с, размер пула {self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            # давно не использованное соединение могло быть разорвано сервером
+            idle_for = time.monotonic() - released_at
+            if conn.closed or (idle_for > self.health_check_after and not self._is_alive(conn)):
+                with self._cond:
+                    self._discard(conn)
+                    self._cond.notify()
+                continue
+
+            return conn
+
+    def putconn(self, conn: connection) -> None:
+        """Возвращает соединение в пул"""
+        # незавершенная транзакция не должна достаться следующему потоку
+        if not conn.closed and conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+
+        with self._cond:
+            if self._closed or conn.closed or conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+
+            self._cond.notify()
+
+    def closeall(self) -> None:
+        """Закрывает все свободные соединения; выданные закроются при возврате"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+    @property
+    def size(self) -> int:
+        """Количество открытых соединений"""
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        """Количество свободных соединений"""
+        return len(self._idle)
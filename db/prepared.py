@@ -0,0 +1,118 @@
+import re
+import threading
+import weakref
+from typing import Optional, Sequence
+
+import psycopg2
+import psycopg2.errors
+from psycopg2.extensions import connection, cursor
+
+
+# позиционный параметр подготовленного запроса ($1, $2, ...)
+PARAMETER_PATTERN = re.compile(r"\$(\d+)")
+
+class PreparedStatement:
+    """
+    Описание серверного подготовленного запроса (PREPARE / EXECUTE).
+
+    sql записывается с позиционными параметрами $1, $2, ..., param_types — их типы PostgreSQL.
+    Описания объявляются в сервисах константами модуля, а готовятся лениво:
+    на каждом соединении при первом выполнении (см. PreparedStatements).
+
+    query — тот же запрос с именованными параметрами драйвера (%(p1)s::тип, ...) для psycopg 3,
+    который готовит запросы сам (cursor.execute(..., prepare=True), см. AsyncDatabase.execute_prepared).
+    """
+
+    __slots__ = ("name", "sql", "param_types", "execute_sql", "query")
+
+    def __init__(self, name: str, sql: str, param_types: Sequence[str]):
+        self.name = name
+        self.sql = sql
+        self.param_types = tuple(param_types)
+
+        # команда EXECUTE с местами для параметров (%s)
+        placeholders = ", ".join(["%s"] * len(self.param_types))
+        self.execute_sql = f"EXECUTE {name}({placeholders})" if self.param_types else f"EXECUTE {name}"
+
+        # $n -> %(pn)s::тип: явное приведение сохраняет типы параметров из PREPARE
+        self.query = PARAMETER_PATTERN.sub(
+            lambda match: f"%(p{match[1]})s::{self.param_types[int(match[1]) - 1]}",
+            sql.replace("%", "%%")
+        )
+
+
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return f"PreparedStatement(name='{self.name}', param_types={self.param_types})"
+
+
+    @property
+    def prepare_sql(self) -> str:
+        """Команда PREPARE для этого запроса"""
+        types = f" ({', '.join(self.param_types)})" if self.param_types else ""
+        return f"PREPARE {self.name}{types} AS {self.sql}"
+
+
+    def query_params(self, params: Sequence) -> dict[str, object]:
+        """Параметры для query: значения $1, $2, ... под именами p1, p2, ..."""
+        return {f"p{number}": value for number, value in enumerate(params, start=1)}
+
+
+class PreparedStatements:
+    """
+    Реестр подготовленных запросов по соединениям пула.
+
+    Для каждого соединения помнится, какие запросы на нем уже подготовлены, и PID серверного процесса.
+    Запрос готовится (PREPARE) при первом выполнении на соединении, дальше выполняется только EXECUTE —
+    разбор и планирование уходят с горячего пути.
+
+    Примечания:
+    - соединение, пересозданное пулом, — это новый объект: для него запросы готовятся заново;
+    - если у соединения сменился серверный процесс (переподключение), реестр соединения сбрасывается;
+    - если подготовленный запрос пропал на сервере (DEALLOCATE / DISCARD ALL в обход реестра),
+      EXECUTE завершится ошибкой, запрос будет забыт и со следующей транзакции подготовлен снова.
+    """
+
+    def __init__(self):
+        # соединение -> (PID серверного процесса, имена подготовленных запросов)
+        self._prepared: weakref.WeakKeyDictionary[connection, tuple[int, set[str]]] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _names(self, conn: connection) -> set[str]:
+        """Имена запросов, подготовленных на соединении"""
+        pid = conn.info.backend_pid
+        with self._lock:
+            entry = self._prepared.get(conn)
+            if entry is None or entry[0] != pid:
+                entry = self._prepared[conn] = (pid, set())
+            return entry[1]
+
+    def forget(self, conn: connection, statement: Optional[PreparedStatement] = None) -> None:
+        """Забывает подготовленный запрос соединения (или все его запросы)"""
+        with self._lock:
+            if statement is None:
+                self._prepared.pop(conn, None)
+                return
+
+            entry = self._prepared.get(conn)
+            if entry is not None:
+                entry[1].discard(statement.name)
+
+    def is_prepared(self, conn: connection, statement: PreparedStatement) -> bool:
+        """Подготовлен ли запрос на соединении"""
+        return statement.name in self._names(conn)
+
+    def execute(self, cur: cursor, statement: PreparedStatement, params: Sequence = ()) -> None:
+        """Выполняет подготовленный запрос на курсоре, при необходимости сначала готовит его"""
+        conn = cur.connection
+        names = self._names(conn)
+
+        if statement.name not in names:
+            cur.execute(statement.prepare_sql, name=f"prepare:{statement.name}")
+            names.add(statement.name)
+
+        try:
+            cur.execute(statement.execute_sql, tuple(params))
+        except psycopg2.errors.InvalidSqlStatementName:
+            self.forget(conn, statement)
+            raise
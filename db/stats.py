@@ -0,0 +1,158 @@
+import bisect
+import logging
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+
+logger = logging.getLogger("db.slow_queries")
+
+# верхние границы корзин гистограммы задержек, мс (последняя корзина — все, что дольше)
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+SLOW_QUERY_MS = 200.0 # запросы дольше этого попадают в журнал медленных запросов
+SLOW_LOG_SIZE = 100 # сколько последних медленных запросов хранить
+SLOW_SQL_MAX_CHARS = 2000 # текст запроса в журнале обрезается до этой длины
+
+
+def caller_query_name() -> str:
+    """
+    Имя запроса по умолчанию — функция, вызвавшая execute: "<модуль>.<функция>",
+    например "patient_service.search_patients". Кадры драйвера и слоя db пропускаются.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(("psycopg2", "db.")):
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class QueryStat:
+    """Накопленная статистика одного именованного запроса"""
+
+    __slots__ = ("name", "calls", "errors", "total_ms", "max_ms", "rows", "histogram")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+    @property
+    def avg_ms(self) -> float:
+        """Средняя задержка"""
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+    def as_dict(self) -> dict:
+        """Статистика в виде словаря (для JSON и отчетов)"""
+        buckets = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": self.total_ms,
+            "avg_ms": self.avg_ms,
+            "max_ms": self.max_ms,
+            "rows": self.rows,
+            "histogram": dict(zip(buckets, self.histogram)),
+        }
+
+
+class SlowQuery:
+    """Запись журнала медленных запросов"""
+
+    __slots__ = ("name", "sql", "duration_ms", "rows", "at", "plan")
+
+    def __init__(self, name: str, sql: str, duration_ms: float, rows: int, plan: Optional[str] = None):
+        self.name = name
+        self.sql = sql
+        self.duration_ms = duration_ms
+        self.rows = rows
+        self.at = datetime.now()
+        self.plan = plan
+
+
+    def as_dict(self) -> dict:
+        """Запись в виде словаря (для JSON и отчетов)"""
+        return {
+            "name": self.name,
+            "sql": self.sql,
+            "duration_ms": self.duration_ms,
+            "rows": self.rows,
+            "at": self.at.isoformat(timespec="seconds"),
+            "plan": self.plan,
+        }
+
+
+class QueryStats:
+    """
+    Статистика запросов Database: по каждому именованному запросу — число вызовов,
+    суммарная / средняя / максимальная задержка, число строк и гистограмма задержек.
+
+    Примечания:
+    - запросы дольше slow_query_ms пишутся в журнал медленных запросов (логгер db.slow_queries
+      и последние SLOW_LOG_SIZE записей в памяти);
+    - с explain_slow=True для медленного запроса дополнительно снимается EXPLAIN (ANALYZE, BUFFERS):
+      запрос выполняется еще раз внутри SAVEPOINT, который затем откатывается;
+    - параметры запросов не сохраняются (в них персональные данные).
+    """
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS, explain_slow: bool = False):
+        self.slow_query_ms = slow_query_ms
+        self.explain_slow = explain_slow
+        self._stats: dict[str, QueryStat] = {}
+        self._slow: deque[SlowQuery] = deque(maxlen=SLOW_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, duration_ms: float, rows: int, failed: bool = False) -> None:
+        """Учитывает выполнение запроса"""
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = QueryStat(name)
+
+            stat.calls += 1
+            stat.total_ms += duration_ms
+            stat.max_ms = max(stat.max_ms, duration_ms)
+            stat.rows += max(rows, 0)
+            stat.histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+            if failed:
+                stat.errors += 1
+
+    def is_slow(self, duration_ms: float) -> bool:
+        """Нужно ли записать запрос в журнал медленных запросов"""
+        return duration_ms >= self.slow_query_ms
+
+    def record_slow(self, name: str, sql: str, duration_ms: float, rows: int, plan: Optional[str] = None) -> None:
+        """Добавляет запрос в журнал медленных запросов"""
+        entry = SlowQuery(name, sql[:SLOW_SQL_MAX_CHARS], duration_ms, rows, plan)
+        with self._lock:
+            self._slow.append(entry)
+
+        logger.warning("Медленный запрос %s: %.1f мс, строк: %d", name, duration_ms, rows)
+
+    def snapshot(self) -> list[dict]:
+        """Статистика всех запросов, самые затратные (по суммарному времени) первыми"""
+        with self._lock:
+            stats = sorted(self._stats.values(), key=lambda stat: stat.total_ms, reverse=True)
+            return [stat.as_dict() for stat in stats]
+
+    def slow_queries(self) -> list[dict]:
+        """Журнал медленных запросов, последние первыми"""
+        with self._lock:
+            return [entry.as_dict() for entry in reversed(self._slow)]
+
+    def reset(self) -> None:
+        """Сбрасывает статистику и журнал медленных запросов"""
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
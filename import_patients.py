@@ -0,0 +1,54 @@
+import argparse
+import csv
+
+from rich.console import Console
+
+from main import create_database
+from services.patient_service import bulk_register_patients
+
+
+console = Console()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Массовый импорт пациентов из CSV (ФИО владельца, телефон, кличка, вид)."
+    )
+    parser.add_argument("path", help="путь к CSV-файлу")
+    parser.add_argument("--delimiter", default=",", help="разделитель полей (по умолчанию запятая)")
+    parser.add_argument("--encoding", default="utf-8", help="кодировка файла (по умолчанию utf-8)")
+    parser.add_argument("--no-header", action="store_true", help="в файле нет строки заголовка")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    db = create_database()
+    db.connect()
+
+    try:
+        with open(args.path, newline="", encoding=args.encoding) as file:
+            reader = csv.reader(file, delimiter=args.delimiter)
+
+            if not args.no_header:
+                next(reader, None) # пропускаем заголовок
+
+            result = bulk_register_patients(db, reader)
+    finally:
+        db.close()
+
+    # номера строк в отчете — номера строк данных; с заголовком строка файла на 1 больше
+    offset = 0 if args.no_header else 1
+
+    console.print(f"[green]Импортировано пациентов:[/green] {result.imported}")
+    console.print(f"[green]Создано владельцев:[/green] {result.owners_created}")
+
+    if result.rejects:
+        console.print(f"[red]Отклонено строк:[/red] {len(result.rejects)}")
+        for line_no, reason in result.rejects:
+            console.print(f"  строка {line_no + offset}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,91 @@
+import sys
+
 from db.database import Database
-from cli.menu import run_menu
 
 
-def main():
-    db = Database(
+# реплики для чтения (строки подключения), например:
+# "host=localhost port=5433 dbname=veterinary_clinic user=postgres password=your_password"
+REPLICA_DSNS: list[str] = []
+
+
+def create_database(**pool_options) -> Database:
+    """
+    Создает объект подключения к БД с параметрами приложения.
+    pool_options — параметры пула (min_connections, max_connections, pool_timeout)
+    и другие параметры Database (например, replica_dsns вместо REPLICA_DSNS).
+    """
+    pool_options.setdefault("replica_dsns", REPLICA_DSNS)
+
+    return Database(
         host="localhost",
         port=5432,
         database="veterinary_clinic",
         user="postgres",
-        password="your_password"
+        password="your_password",
+        **pool_options
     )
-    
+
+
+def enable_change_feed(db: Database) -> None:
+    """
+    Подписывает кэши процесса на изменения из других процессов (LISTEN / NOTIFY):
+    справочник врачей сбрасывается при изменении doctors, шаблоны расписаний — при изменении
+    doctor_schedules и schedule_exceptions, медкарты подписываются сами при первом обращении,
+    а поиск свободных слотов переходит на матрицу доступности в памяти.
+    Для долгоживущих процессов (меню, HTTP-сервер).
+    """
+    from services.availability_matrix import enable_availability_matrix
+    from services.reference_cache import reference_cache
+    from services.schedule_service import SCHEDULES_KEY
+
+    reference_cache.attach(db, "doctors")
+    # подписчики вызываются по порядку подписки: шаблоны сбрасываются раньше, чем матрица их перечитает
+    reference_cache.attach(db, "doctor_schedules", SCHEDULES_KEY)
+    reference_cache.attach(db, "schedule_exceptions", SCHEDULES_KEY)
+    db.start_listener()
+    enable_availability_matrix(db)
+
+
+def main():
+    # без аргументов — интерактивное меню; rich и меню загружаются только для него
+    if len(sys.argv) == 1:
+        from cli.menu import run_menu
+
+        db = create_database()
+        db.connect()
+        enable_change_feed(db)
+
+        try:
+            run_menu(db) # запуск главного меню
+        finally:
+            db.close()
+        return
+
+    from cli.commands import CommandError, build_parser, run_cli
+
+    parser = build_parser()
+    try:
+        args = parser.parse_args()
+    except CommandError as e:
+        parser.print_usage(sys.stderr)
+        sys.stderr.write(f"{e}\n")
+        sys.exit(2)
+
+    if args.command is None:
+        parser.print_help()
+        return
+
+    # команды выполняются последовательно: одного соединения без учета запросов достаточно
+    db = create_database(min_connections=1, max_connections=1, instrument=False)
     db.connect()
 
     try:
-        run_menu(db) # запуск главного меню
+        code = run_cli(db, parser, args)
     finally:
         db.close()
 
+    sys.exit(code)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,59 @@
+import argparse
+
+from rich.console import Console
+
+from main import create_database
+from services.partition_service import ARCHIVE_AFTER_MONTHS, PARTITION_MONTHS_AHEAD, maintain_partitions
+
+
+console = Console()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Обслуживание секций таблицы записей: создание будущих секций и архивация старых."
+    )
+    parser.add_argument(
+        "--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD,
+        help=f"на сколько месяцев вперед создать секции (по умолчанию {PARTITION_MONTHS_AHEAD})"
+    )
+    parser.add_argument(
+        "--archive-after", type=int, default=ARCHIVE_AFTER_MONTHS,
+        help=f"переносить в архив секции старше стольких месяцев (по умолчанию {ARCHIVE_AFTER_MONTHS})"
+    )
+    parser.add_argument("--no-archive", action="store_true", help="не переносить старые секции")
+    parser.add_argument(
+        "--detach", action="store_true",
+        help="не присоединять старые секции к архиву, а оставить отдельными таблицами (для выгрузки и удаления)"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    db = create_database()
+    db.connect()
+
+    try:
+        created, archived = maintain_partitions(
+            db,
+            months_ahead=args.months_ahead,
+            archive_after_months=None if args.no_archive else args.archive_after,
+            detach_only=args.detach
+        )
+    finally:
+        db.close()
+
+    console.print(f"[green]Создано секций:[/green] {len(created)}")
+    for name in created:
+        console.print(f"  {name}")
+
+    title = "Отсоединено секций" if args.detach else "Перенесено в архив секций"
+    console.print(f"[green]{title}:[/green] {len(archived)}")
+    for name in archived:
+        console.print(f"  {name}")
+
+
+if __name__ == "__main__":
+    main()
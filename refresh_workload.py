@@ -0,0 +1,38 @@
+import argparse
+
+from rich.console import Console
+
+from main import create_database
+from services.workload_service import rebuild_workload, refresh_workload
+
+
+console = Console()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Обновление сводки загрузки врачей (doctor_day_stats) по измененным дням."
+    )
+    parser.add_argument("--rebuild", action="store_true", help="построить сводку заново по всей истории записей")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    db = create_database()
+    db.connect()
+
+    try:
+        if args.rebuild:
+            count = rebuild_workload(db)
+        else:
+            count = refresh_workload(db)
+    finally:
+        db.close()
+
+    console.print(f"[green]Пересчитано дней врачей:[/green] {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,9 @@
+-- Расширение для поиска по подстроке (триграммные индексы)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Расширение для ограничения-исключения по (врач, интервал приема)
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
 -- Таблица владельцев
 CREATE TABLE owners (
     id SERIAL PRIMARY KEY,
@@ -22,12 +28,63 @@ CREATE TABLE doctors (
     full_name VARCHAR(255) NOT NULL
 );
 
--- Таблица записей на прием
-CREATE TABLE appointments (
+-- Недельное расписание врачей: рабочие интервалы по дням недели (1 — понедельник ... 7 — воскресенье).
+-- Врач без строк здесь работает по общей сетке 09:00–17:00 каждый день
+CREATE TABLE doctor_schedules (
+    id SERIAL PRIMARY KEY,
+    doctor_id INTEGER NOT NULL,
+    weekday SMALLINT NOT NULL,
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    CONSTRAINT fk_doctor_schedules_doctor
+        FOREIGN KEY (doctor_id)
+        REFERENCES doctors(id)
+        ON DELETE CASCADE,
+    CONSTRAINT check_schedule_weekday
+        CHECK (weekday BETWEEN 1 AND 7),
+    CONSTRAINT check_schedule_time
+        CHECK (end_time > start_time)
+);
+
+CREATE INDEX idx_doctor_schedules_doctor_id ON doctor_schedules (doctor_id);
+
+-- Исключения из расписания на даты [start_day, end_day]: отпуск, больничный (is_working = false,
+-- без времени — весь день) или дополнительная смена (is_working = true, время обязательно)
+CREATE TABLE schedule_exceptions (
     id SERIAL PRIMARY KEY,
+    doctor_id INTEGER NOT NULL,
+    start_day DATE NOT NULL,
+    end_day DATE NOT NULL,
+    start_time TIME,
+    end_time TIME,
+    is_working BOOLEAN NOT NULL,
+    CONSTRAINT fk_schedule_exceptions_doctor
+        FOREIGN KEY (doctor_id)
+        REFERENCES doctors(id)
+        ON DELETE CASCADE,
+    CONSTRAINT check_exception_days
+        CHECK (end_day >= start_day),
+    CONSTRAINT check_exception_time
+        CHECK (
+            (start_time IS NULL AND end_time IS NULL AND NOT is_working)
+            OR end_time > start_time
+        )
+);
+
+CREATE INDEX idx_schedule_exceptions_end_day ON schedule_exceptions (end_day);
+
+-- Таблица записей на прием, секционированная по месяцам начала приема (date_time).
+-- Предстоящие записи и проверки занятости читают только секции своего окна;
+-- старые секции переносятся в appointments_archive (см. maintain_partitions.py)
+CREATE TABLE appointments (
+    id SERIAL,
     patient_id INTEGER NOT NULL,
     doctor_id INTEGER NOT NULL,
     date_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP NOT NULL,
+    -- ключ секционированной таблицы обязан включать ключ секционирования
+    CONSTRAINT appointments_pkey
+        PRIMARY KEY (id, date_time),
     CONSTRAINT fk_appointments_patient
         FOREIGN KEY (patient_id)
         REFERENCES patients(id)
@@ -36,11 +93,267 @@ CREATE TABLE appointments (
         FOREIGN KEY (doctor_id)
         REFERENCES doctors(id)
         ON DELETE CASCADE,
-    CONSTRAINT unique_doctor_datetime
-        UNIQUE (doctor_id, date_time)
+    CONSTRAINT check_appointment_duration
+        CHECK (end_time > date_time),
+    -- прием не переходит через полночь: пересекающиеся приемы врача всегда лежат в одной секции,
+    -- а занятые интервалы в [start, end) начинаются не раньше start - 1 день
+    CONSTRAINT check_appointment_single_day
+        CHECK (end_time <= date_trunc('day', date_time) + INTERVAL '1 day')
+) PARTITION BY RANGE (date_time);
+
+-- Архив: старые секции appointments, перенесенные из горячей таблицы.
+-- Строки не копируются — секция отсоединяется от appointments и присоединяется сюда
+CREATE TABLE appointments_archive (
+    id INTEGER NOT NULL,
+    patient_id INTEGER NOT NULL,
+    doctor_id INTEGER NOT NULL,
+    date_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP NOT NULL,
+    CONSTRAINT appointments_archive_pkey
+        PRIMARY KEY (id, date_time)
+) PARTITION BY RANGE (date_time);
+
+-- Вся история записей (горячие и архивные секции) — для медкарты
+CREATE VIEW appointment_history AS
+    SELECT id, patient_id, doctor_id, date_time, end_time FROM appointments
+    UNION ALL
+    SELECT id, patient_id, doctor_id, date_time, end_time FROM appointments_archive;
+
+-- Создает секцию appointments за месяц, в который попадает month (если ее еще нет).
+-- Ограничение-исключение no_doctor_overlap объявляется на каждой секции: на секционированной
+-- таблице оно невозможно, а благодаря check_appointment_single_day пересечения
+-- между секциями не бывает. Возвращает имя созданной секции или NULL
+CREATE FUNCTION create_appointments_partition(month DATE) RETURNS TEXT AS $$
+DECLARE
+    month_start DATE := date_trunc('month', month);
+    partition_name TEXT := 'appointments_' || to_char(month_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF appointments FOR VALUES FROM (%L) TO (%L)',
+        partition_name, month_start, (month_start + INTERVAL '1 month')::DATE
+    );
+
+    -- GiST-индекс ограничения используется и для поиска занятого времени врача
+    EXECUTE format(
+        'ALTER TABLE %I ADD CONSTRAINT %I EXCLUDE USING gist (doctor_id WITH =, tsrange(date_time, end_time) WITH &&)',
+        partition_name, partition_name || '_no_doctor_overlap'
+    );
 
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Секции на текущий месяц и три месяца вперед (дальше их создает maintain_partitions.py)
+SELECT create_appointments_partition(month::DATE)
+FROM generate_series(date_trunc('month', CURRENT_DATE), CURRENT_DATE + INTERVAL '3 months', INTERVAL '1 month') AS month;
+
+-- Индексы для поиска пациентов: по кличке, ФИО владельца (подстрока) и началу телефона
+CREATE INDEX idx_patients_name_trgm ON patients USING gist (name gist_trgm_ops);
+CREATE INDEX idx_owners_full_name_trgm ON owners USING gist (full_name gist_trgm_ops);
+CREATE INDEX idx_owners_phone_prefix ON owners (phone varchar_pattern_ops);
+CREATE INDEX idx_patients_owner_id ON patients (owner_id);
+
+-- Индекс для постраничного просмотра предстоящих записей (keyset-пагинация по (date_time, id))
+CREATE INDEX idx_appointments_date_time_id ON appointments (date_time, id);
+
+-- Индексы для истории записей пациента (медкарта читает все секции, включая архивные)
+CREATE INDEX idx_appointments_patient_id ON appointments (patient_id);
+CREATE INDEX idx_appointments_archive_patient_id ON appointments_archive (patient_id);
+
+-- Сводка загрузки врачей: врач × день -> число записей, занятые минуты, первый и последний прием,
+-- записи по часам начала ({"9": 2, "10": 1, ...}). Отчеты читают только ее, а не appointments
+CREATE TABLE doctor_day_stats (
+    doctor_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    booked INTEGER NOT NULL,
+    booked_minutes INTEGER NOT NULL,
+    first_slot TIMESTAMP NOT NULL,
+    last_slot TIMESTAMP NOT NULL,
+    hourly JSONB NOT NULL,
+    PRIMARY KEY (doctor_id, day),
+    CONSTRAINT fk_doctor_day_stats_doctor
+        FOREIGN KEY (doctor_id)
+        REFERENCES doctors(id)
+        ON DELETE CASCADE
 );
 
+CREATE INDEX idx_doctor_day_stats_day ON doctor_day_stats (day);
+
+-- Журнал измененных дней врачей: его пишут триггеры appointments, а refresh_workload
+-- пересчитывает по нему только изменившиеся строки сводки и очищает его.
+-- Ключа нет намеренно: вставка в журнал никогда не ждет параллельных записей к тому же врачу
+CREATE TABLE doctor_day_changes (
+    doctor_id INTEGER NOT NULL,
+    day DATE NOT NULL
+);
+
+CREATE FUNCTION log_doctor_day_changes() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO doctor_day_changes (doctor_id, day)
+        SELECT DISTINCT doctor_id, date_time::DATE FROM new_rows;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO doctor_day_changes (doctor_id, day)
+        SELECT DISTINCT doctor_id, date_time::DATE FROM old_rows;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- триггеры уровня оператора: COPY и многострочный INSERT пишут в журнал по одной строке на врача и день
+CREATE TRIGGER appointments_log_insert
+    AFTER INSERT ON appointments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_doctor_day_changes();
+
+CREATE TRIGGER appointments_log_update
+    AFTER UPDATE ON appointments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_doctor_day_changes();
+
+CREATE TRIGGER appointments_log_delete
+    AFTER DELETE ON appointments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_doctor_day_changes();
+
+-- Уведомления об изменениях для кэшей других процессов (LISTEN clinic_changes, см. db/listener.py).
+-- Сообщение: {"t": таблица, "op": "insert" | "delete", "o": метка процесса, "r": {колонки строки}};
+-- UPDATE публикуется как delete старой версии строки и insert новой.
+-- Аргументы триггера: имя таблицы (у секций TG_TABLE_NAME — имя секции) и колонки для "r".
+-- Если оператор изменил больше 100 строк, отправляется одно сообщение {"op": "resync"}:
+-- подписчики сбрасывают все данные таблицы, а очередь уведомлений не забивается при COPY
+CREATE FUNCTION change_message(tbl TEXT, op TEXT, rec JSONB, columns TEXT[]) RETURNS TEXT AS $$
+    SELECT json_build_object(
+        't', tbl,
+        'op', op,
+        'o', current_setting('clinic.origin', true),
+        'r', (SELECT jsonb_object_agg(key, value) FROM jsonb_each(rec) WHERE key = ANY(columns))
+    )::TEXT
+$$ LANGUAGE sql STABLE;
+
+CREATE FUNCTION notify_changes() RETURNS TRIGGER AS $$
+DECLARE
+    tbl TEXT := TG_ARGV[0];
+    columns TEXT[] := TG_ARGV[1:TG_NARGS - 1];
+    changed BIGINT := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        changed := changed + (SELECT COUNT(*) FROM old_rows);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        changed := changed + (SELECT COUNT(*) FROM new_rows);
+    END IF;
+
+    IF changed > 100 THEN
+        PERFORM pg_notify('clinic_changes', change_message(tbl, 'resync', NULL, columns));
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('clinic_changes', change_message(tbl, 'delete', to_jsonb(r), columns))
+        FROM old_rows r;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('clinic_changes', change_message(tbl, 'insert', to_jsonb(r), columns))
+        FROM new_rows r;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER appointments_notify_insert
+    AFTER INSERT ON appointments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('appointments', 'id', 'patient_id', 'doctor_id', 'date_time', 'end_time');
+
+CREATE TRIGGER appointments_notify_update
+    AFTER UPDATE ON appointments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('appointments', 'id', 'patient_id', 'doctor_id', 'date_time', 'end_time');
+
+CREATE TRIGGER appointments_notify_delete
+    AFTER DELETE ON appointments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('appointments', 'id', 'patient_id', 'doctor_id', 'date_time', 'end_time');
+
+-- новые пациенты и владельцы ничьих кэшей не делают устаревшими, поэтому INSERT не публикуется
+CREATE TRIGGER patients_notify_update
+    AFTER UPDATE ON patients
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('patients', 'id', 'owner_id');
+
+CREATE TRIGGER patients_notify_delete
+    AFTER DELETE ON patients
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('patients', 'id', 'owner_id');
+
+CREATE TRIGGER owners_notify_update
+    AFTER UPDATE ON owners
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('owners', 'id');
+
+CREATE TRIGGER owners_notify_delete
+    AFTER DELETE ON owners
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('owners', 'id');
+
+-- справочник врачей кэшируется целиком, поэтому публикуется и добавление
+CREATE TRIGGER doctors_notify_insert
+    AFTER INSERT ON doctors
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('doctors', 'id');
+
+CREATE TRIGGER doctors_notify_update
+    AFTER UPDATE ON doctors
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('doctors', 'id');
+
+CREATE TRIGGER doctors_notify_delete
+    AFTER DELETE ON doctors
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('doctors', 'id');
+
+-- расписания тоже кэшируются целиком (шаблоны слотов и матрица доступности)
+CREATE TRIGGER doctor_schedules_notify_insert
+    AFTER INSERT ON doctor_schedules
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('doctor_schedules', 'id', 'doctor_id', 'weekday');
+
+CREATE TRIGGER doctor_schedules_notify_update
+    AFTER UPDATE ON doctor_schedules
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('doctor_schedules', 'id', 'doctor_id', 'weekday');
+
+CREATE TRIGGER doctor_schedules_notify_delete
+    AFTER DELETE ON doctor_schedules
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('doctor_schedules', 'id', 'doctor_id', 'weekday');
+
+CREATE TRIGGER schedule_exceptions_notify_insert
+    AFTER INSERT ON schedule_exceptions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('schedule_exceptions', 'id', 'doctor_id');
+
+CREATE TRIGGER schedule_exceptions_notify_update
+    AFTER UPDATE ON schedule_exceptions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('schedule_exceptions', 'id', 'doctor_id');
+
+CREATE TRIGGER schedule_exceptions_notify_delete
+    AFTER DELETE ON schedule_exceptions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('schedule_exceptions', 'id', 'doctor_id');
+
 -- Тестовые данные
 INSERT INTO owners (full_name, phone) VALUES
 ('Иванов Иван Иванович', '+79161234567'),
@@ -56,3 +369,16 @@ INSERT INTO patients (owner_id, name, species) VALUES
 INSERT INTO doctors (full_name) VALUES
 ('Смирнова Ольга Петровна'),
 ('Кузнецов Дмитрий Алексеевич');
+
+-- Расписание: первый врач — будни 09:00–17:00, второй — пн/ср/пт с утра, вт/чт после обеда
+INSERT INTO doctor_schedules (doctor_id, weekday, start_time, end_time) VALUES
+(1, 1, '09:00', '17:00'),
+(1, 2, '09:00', '17:00'),
+(1, 3, '09:00', '17:00'),
+(1, 4, '09:00', '17:00'),
+(1, 5, '09:00', '17:00'),
+(2, 1, '09:00', '13:00'),
+(2, 2, '13:00', '19:00'),
+(2, 3, '09:00', '13:00'),
+(2, 4, '13:00', '19:00'),
+(2, 5, '09:00', '13:00');
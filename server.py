@@ -0,0 +1,426 @@
+import argparse
+import ipaddress
+import json
+import re
+import threading
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlparse
+
+from db.database import Database
+from db.pool import PoolTimeoutError
+from main import create_database, enable_change_feed
+from services.appointment_service import (
+    APPOINTMENT_DURATION,
+    BOOKING_HORIZON_DAYS,
+    DoctorNotFoundError,
+    NoPartitionError,
+    OutsideScheduleError,
+    PatientNotFoundError,
+    SlotTakenError,
+    create_appointment,
+    delete_appointment,
+    get_availability_range,
+)
+from services.medical_card_cache import medical_card_cache
+from services.patient_service import (
+    PHONE_PATTERN,
+    get_owner_by_phone,
+    register_patient,
+    search_patients,
+)
+
+
+MAX_BODY_BYTES = 64 * 1024 # наибольший размер тела запроса; запросы API укладываются в сотни байт
+
+
+class ApiError(Exception):
+    """Ошибка запроса, которая возвращается клиенту с указанным HTTP-статусом"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _to_json(value: Any) -> Any:
+    """Приводит даты к строкам ISO 8601 для json.dumps"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Объект типа {type(value).__name__} не сериализуется в JSON")
+
+
+def _require(body: dict, field: str, kind: type) -> Any:
+    """Достает обязательное поле тела запроса нужного типа"""
+    value = body.get(field)
+    if not isinstance(value, kind) or isinstance(value, bool) or (kind is str and not value.strip()):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Поле {field} обязательно ({kind.__name__}).")
+    return value.strip() if kind is str else value
+
+
+def _parse_datetime(value: str, field: str) -> datetime:
+    """Разбирает дату и время в формате ISO 8601"""
+    try:
+        result = datetime.fromisoformat(value)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Поле {field} должно быть в формате ГГГГ-ММ-ДДTЧЧ:ММ.")
+
+    # расписание и записи хранятся в местном времени без часового пояса
+    if result.tzinfo is not None:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Поле {field} указывается без часового пояса.")
+    return result
+
+
+# ОБРАБОТЧИКИ
+
+def register_patient_handler(db: Database, match: re.Match, query: dict, body: dict) -> tuple[HTTPStatus, Any]:
+    """POST /patients — регистрация пациента"""
+    owner_full_name = _require(body, "owner_full_name", str)
+    owner_phone = _require(body, "owner_phone", str)
+    patient_name = _require(body, "patient_name", str)
+    species = _require(body, "species", str)
+
+    if not PHONE_PATTERN.match(owner_phone):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Телефон должен быть в формате +7XXXXXXXXXX.")
+
+    # как и в меню: владельца с другим ФИО используем только с явного согласия
+    existing_owner = get_owner_by_phone(db, owner_phone)
+    if (
+        existing_owner is not None
+        and existing_owner.full_name != owner_full_name
+        and not body.get("use_existing_owner", False)
+    ):
+        raise ApiError(
+            HTTPStatus.CONFLICT,
+            f"Телефон принадлежит владельцу {existing_owner.full_name}; "
+            f"передайте use_existing_owner=true, чтобы использовать его."
+        )
+
+    patient = register_patient(db, owner_full_name, owner_phone, patient_name, species)
+
+    return HTTPStatus.CREATED, {
+        "id": patient.id,
+        "owner_id": patient.owner_id,
+        "name": patient.name,
+        "species": patient.species
+    }
+
+
+def search_patients_handler(db: Database, match: re.Match, query: dict, body: dict) -> tuple[HTTPStatus, Any]:
+    """GET /patients?q=...&limit=... — поиск пациентов"""
+    text = query.get("q", [""])[0]
+    limit = _query_int(query, "limit", 10, maximum=100)
+
+    return HTTPStatus.OK, [
+        {
+            "id": patient.id,
+            "name": patient.name,
+            "species": patient.species,
+            "owner_full_name": patient.owner_full_name,
+            "owner_phone": patient.owner_phone
+        }
+        for patient in search_patients(db, text, limit)
+    ]
+
+
+def medical_card_handler(db: Database, match: re.Match, query: dict, body: dict) -> tuple[HTTPStatus, Any]:
+    """GET /patients/<id>/card — медицинская карта"""
+    patient_id = int(match.group("id"))
+
+    card = medical_card_cache.get(db, patient_id)
+    if card is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, "Пациент с таким id не найден.")
+
+    return HTTPStatus.OK, {
+        "id": card.patient_id,
+        "name": card.name,
+        "species": card.species,
+        "owner_full_name": card.owner_full_name,
+        "owner_phone": card.owner_phone,
+        "appointments": [
+            {"id": visit.id, "doctor_full_name": visit.doctor_full_name, "date_time": visit.date_time}
+            for visit in card.appointments
+        ]
+    }
+
+
+def availability_handler(db: Database, match: re.Match, query: dict, body: dict) -> tuple[HTTPStatus, Any]:
+    """GET /doctors/<id>/availability?start=...&days=...&duration=... — свободные слоты врача"""
+    doctor_id = int(match.group("id"))
+
+    start_value = query.get("start", [None])[0]
+    try:
+        start_day = date.fromisoformat(start_value) if start_value else date.today()
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Параметр start должен быть в формате ГГГГ-ММ-ДД.")
+
+    days = _query_int(query, "days", BOOKING_HORIZON_DAYS, maximum=BOOKING_HORIZON_DAYS)
+    duration = timedelta(minutes=_query_int(query, "duration", APPOINTMENT_DURATION.seconds // 60, maximum=8 * 60))
+
+    availability = get_availability_range(db, doctor_id, start_day, days, duration)
+
+    return HTTPStatus.OK, {day.isoformat(): slots for day, slots in availability.items()}
+
+
+def book_handler(db: Database, match: re.Match, query: dict, body: dict) -> tuple[HTTPStatus, Any]:
+    """POST /appointments — запись на прием"""
+    patient_id = _require(body, "patient_id", int)
+    doctor_id = _require(body, "doctor_id", int)
+    start = _parse_datetime(_require(body, "date_time", str), "date_time")
+    minutes = body.get("duration_minutes", APPOINTMENT_DURATION.seconds // 60)
+    if not isinstance(minutes, int) or isinstance(minutes, bool) or minutes <= 0:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Поле duration_minutes должно быть положительным числом.")
+    duration = timedelta(minutes=minutes)
+
+    try:
+        appointment_id = create_appointment(db, patient_id, doctor_id, start, duration)
+    except (PatientNotFoundError, DoctorNotFoundError) as e:
+        raise ApiError(HTTPStatus.NOT_FOUND, str(e))
+    except SlotTakenError as e:
+        raise ApiError(HTTPStatus.CONFLICT, str(e))
+    except (OutsideScheduleError, NoPartitionError) as e:
+        raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+
+    return HTTPStatus.CREATED, {
+        "id": appointment_id,
+        "patient_id": patient_id,
+        "doctor_id": doctor_id,
+        "date_time": start,
+        "end_time": start + duration
+    }
+
+
+def cancel_handler(db: Database, match: re.Match, query: dict, body: dict) -> tuple[HTTPStatus, Any]:
+    """DELETE /appointments/<id>?date_time=... — отмена записи (со временем приема читается одна секция)"""
+    date_time_value = query.get("date_time", [None])[0]
+    date_time = _parse_datetime(date_time_value, "date_time") if date_time_value else None
+
+    if not delete_appointment(db, int(match.group("id")), date_time):
+        raise ApiError(HTTPStatus.NOT_FOUND, "Запись с таким ID не найдена.")
+
+    return HTTPStatus.OK, {"deleted": True}
+
+
+def query_stats_handler(db: Database, match: re.Match, query: dict, body: dict) -> tuple[HTTPStatus, Any]:
+    """GET /_stats/queries — статистика запросов к БД и журнал медленных запросов"""
+    if db.query_stats is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, "Учет запросов отключен.")
+
+    return HTTPStatus.OK, {
+        "queries": db.query_stats.snapshot(),
+        "slow_queries": db.query_stats.slow_queries(),
+    }
+
+
+def _query_int(query: dict, name: str, default: int, maximum: int) -> int:
+    """Разбирает целочисленный параметр строки запроса"""
+    value = query.get(name, [None])[0]
+    if value is None:
+        return default
+    if not value.isdigit() or not (1 <= int(value) <= maximum):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Параметр {name} должен быть числом от 1 до {maximum}.")
+    return int(value)
+
+
+Handler = Callable[[Database, re.Match, dict, dict], tuple[HTTPStatus, Any]]
+
+ROUTES: list[tuple[str, re.Pattern, Handler]] = [
+    ("POST", re.compile(r"^/patients$"), register_patient_handler),
+    ("GET", re.compile(r"^/patients$"), search_patients_handler),
+    ("GET", re.compile(r"^/patients/(?P<id>\d+)/card$"), medical_card_handler),
+    ("GET", re.compile(r"^/doctors/(?P<id>\d+)/availability$"), availability_handler),
+    ("POST", re.compile(r"^/appointments$"), book_handler),
+    ("DELETE", re.compile(r"^/appointments/(?P<id>\d+)$"), cancel_handler),
+]
+
+# служебные маршруты: подключаются флагом --expose-stats и отвечают только клиентам с loopback-адресов
+LOCAL_ROUTES: list[tuple[str, re.Pattern, Handler]] = [
+    ("GET", re.compile(r"^/_stats/queries$"), query_stats_handler),
+]
+
+
+# СЕРВЕР
+
+class ClinicRequestHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик HTTP-запросов к JSON API.
+    HTTP/1.1: соединения с клиентами держатся открытыми (keep-alive).
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = 60 # простаивающее keep-alive соединение закрывается через минуту
+    server: "ClinicHTTPServer"
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method: str) -> None:
+        url = urlparse(self.path)
+
+        try:
+            # тело читаем до маршрутизации, чтобы не сбить следующий запрос keep-alive соединения
+            body = self._read_body()
+            handler, match = self._route(method, url.path)
+            if handler in self.server.local_handlers and not self._from_loopback():
+                raise ApiError(HTTPStatus.FORBIDDEN, "Адрес доступен только с локальной машины.")
+
+            # ограничиваем число запросов, одновременно работающих с БД
+            if not self.server.slots.acquire(timeout=self.server.queue_timeout):
+                raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "Сервер перегружен, повторите запрос позже.")
+            try:
+                status, payload = handler(self.server.db, match, parse_qs(url.query), body)
+            finally:
+                self.server.slots.release()
+
+        except ApiError as e:
+            status, payload = e.status, {"error": e.message}
+        except PoolTimeoutError:
+            status, payload = HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Нет свободных соединений с БД."}
+        except ValueError as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception:
+            self.log_error("Ошибка при обработке %s %s", method, self.path)
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Внутренняя ошибка сервера."}
+
+        self._send_json(status, payload)
+
+    def _route(self, method: str, path: str) -> tuple[Handler, re.Match]:
+        """Находит обработчик по методу и пути"""
+        path_found = False
+        for route_method, pattern, handler in self.server.routes:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            path_found = True
+            if route_method == method:
+                return handler, match
+
+        if path_found:
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "Метод не поддерживается.")
+        raise ApiError(HTTPStatus.NOT_FOUND, "Неизвестный адрес.")
+
+    def _from_loopback(self) -> bool:
+        """Пришел ли запрос с loopback-адреса"""
+        return ipaddress.ip_address(self.client_address[0]).is_loopback
+
+    def _read_body(self) -> dict:
+        """
+        Читает JSON-тело запроса (пустое тело — пустой словарь).
+        Тело с неверной длиной или длиннее MAX_BODY_BYTES не читается, а соединение после ответа
+        закрывается: иначе непрочитанные байты были бы приняты за следующий запрос keep-alive.
+        """
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            self.close_connection = True
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Неверный заголовок Content-Length.")
+
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Тело запроса больше {MAX_BODY_BYTES} байт.")
+
+        if length == 0:
+            return {}
+
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Тело запроса должно быть JSON.")
+
+        if not isinstance(body, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Тело запроса должно быть JSON-объектом.")
+        return body
+
+    def _send_json(self, status: HTTPStatus, payload: Any) -> None:
+        data = json.dumps(payload, ensure_ascii=False, default=_to_json).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close") # клиент не должен слать следующий запрос в это соединение
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class ClinicHTTPServer(ThreadingHTTPServer):
+    """
+    HTTP-сервер JSON API.
+
+    Каждое клиентское соединение обслуживается своим потоком, но к БД одновременно
+    обращается не больше max_concurrency запросов, а они делят небольшой пул соединений.
+    Служебные маршруты (LOCAL_ROUTES) подключаются только с expose_stats.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        db: Database,
+        max_concurrency: int,
+        queue_timeout: float = 10.0,
+        expose_stats: bool = False
+    ):
+        super().__init__(address, ClinicRequestHandler)
+        self.db = db
+        self.routes = ROUTES + LOCAL_ROUTES if expose_stats else ROUTES
+        self.local_handlers = {handler for _, _, handler in LOCAL_ROUTES} if expose_stats else set()
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.queue_timeout = queue_timeout
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="HTTP JSON API ветеринарной клиники.")
+    parser.add_argument("--host", default="127.0.0.1", help="адрес (по умолчанию 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="порт (по умолчанию 8080)")
+    parser.add_argument("--max-connections", type=int, default=5, help="размер пула соединений с БД")
+    parser.add_argument("--max-concurrency", type=int, default=16, help="сколько запросов одновременно обрабатывается")
+    parser.add_argument(
+        "--replica", action="append", metavar="DSN",
+        help="строка подключения к реплике для чтения (можно указать несколько раз; по умолчанию REPLICA_DSNS из main.py)"
+    )
+    parser.add_argument(
+        "--expose-stats", action="store_true",
+        help="включить GET /_stats/queries (отвечает только на запросы с локальной машины)"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    db_options = {"max_connections": args.max_connections}
+    if args.replica:
+        db_options["replica_dsns"] = args.replica
+
+    db = create_database(**db_options)
+    db.connect()
+    enable_change_feed(db)
+
+    server = ClinicHTTPServer((args.host, args.port), db, args.max_concurrency, expose_stats=args.expose_stats)
+    print(f"JSON API запущен на http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,111 @@
 from datetime import datetime, date, time, timedelta
 
-from db.database import Database
+from typing import TYPE_CHECKING, Iterable, Optional
+
+import psycopg2
+from psycopg2 import errorcodes
+
+from db.database import READ, READ_PRIMARY, Database
+from db.models import AppointmentRow, Doctor
+from db.prepared import PreparedStatement
+from services.pagination import PAGE_SIZE, NEXT, Page, build_page, check_direction
+from services.reference_cache import reference_cache
+from services.schedule_service import (
+    DEFAULT_TEMPLATE,
+    SLOT_STEP,
+    SlotTemplate,
+    get_slot_template,
+    get_slot_templates,
+)
+
+if TYPE_CHECKING:
+    from services.availability_matrix import AvailabilityMatrix
 
 
 # КОНСТАНТЫ 
-WORK_START = time(9, 0) # начало рабочего дня (старт первого слота времени)
-LAST_SLOT_START = time(16, 30) # начало последнего временного слота для записи
-APPOINTMENT_DURATION = timedelta(minutes=30) # длительность приема - 30 минут
+APPOINTMENT_DURATION = timedelta(minutes=30) # стандартная длительность приема - 30 минут
+APPOINTMENT_DURATIONS = (
+    timedelta(minutes=30),
+    timedelta(minutes=60),
+    timedelta(minutes=90),
+) # допустимые длительности приема
 BOOKING_HORIZON_DAYS = 14 # запись будет доступна на 14 дней вперед
 
+# занятый интервал врача: [начало, конец)
+Interval = tuple[datetime, datetime]
+
+
+DOCTORS_QUERY = """
+    SELECT id, full_name
+    FROM doctors
+    ORDER BY id
+"""
+
 
-def get_all_doctors(db: Database) -> list[tuple[int, str]]:
+def _load_doctors(db: Database) -> dict[int, str]:
+    """Загружает справочник врачей из БД: id -> ФИО, по возрастанию id"""
+    # справочник кэшируется на весь процесс — читаем с основного сервера, а не с отстающей реплики
+    with db.cursor(mode=READ_PRIMARY) as cursor:
+        cursor.execute(DOCTORS_QUERY)
+        return dict(cursor.fetchall())
+
+
+def get_doctors(db: Database) -> dict[int, str]:
     """
-    Получение списка всех врачей (id, ФИО).
-    Используется во время записи пациента на прием.
+    Справочник врачей (id -> ФИО) из кэша справочников процесса.
+    Таблица врачей меняется редко, поэтому в БД за ней ходим не чаще раза в REFERENCE_TTL секунд
+    (или после reference_cache.invalidate("doctors")). Возвращаемый словарь нельзя изменять.
     """
-    conn = db.get_connection()
-    
-    query = """
-        SELECT id, full_name
-        FROM doctors
-        ORDER BY id
+    return reference_cache.get("doctors", lambda: _load_doctors(db))
+
+
+def get_all_doctors(db: Database) -> list[Doctor]:
     """
+    Получение списка всех врачей (Doctor) по возрастанию id.
+    Используется во время записи пациента на прием.
+    """
+    return [Doctor(doctor_id, full_name) for doctor_id, full_name in get_doctors(db).items()]
+
 
-    with conn.cursor() as cursor:
-        cursor.execute(query)
-        return cursor.fetchall()    
+# частые запросы готовятся на сервере один раз на соединение пула (см. db/prepared.py)
+DOCTOR_EXISTS = PreparedStatement(
+    "doctor_exists",
+    "SELECT 1 FROM doctors WHERE id = $1 LIMIT 1",
+    ("integer",)
+)
+
+PATIENT_EXISTS = PreparedStatement(
+    "patient_exists",
+    "SELECT 1 FROM patients WHERE id = $1 LIMIT 1",
+    ("integer",)
+)
 
 
 def doctor_exists(db: Database, doctor_id: int) -> bool:
     """
-    Проверка сущестования врача по id.
+    Проверка сущестования врача по id (по кэшу справочника врачей).
+    Если врача в кэше нет, он проверяется одним запросом к основному серверу: несуществующие id
+    не перечитывают справочник, а новый врач будет найден сразу, не дожидаясь TTL.
     """
-    conn = db.get_connection()
+    if doctor_id in get_doctors(db):
+        return True
 
-    query = "SELECT 1 FROM doctors WHERE id = %s LIMIT 1"
+    with db.cursor(mode=READ_PRIMARY) as cursor:
+        db.execute_prepared(cursor, DOCTOR_EXISTS, (doctor_id,))
+        found = cursor.fetchone() is not None
 
-    with conn.cursor() as cursor:
-        cursor.execute(query, (doctor_id,))
-        # запись о враче is not None = True (врач существует)
-        return cursor.fetchone() is not None
+    if found:
+        reference_cache.invalidate("doctors") # справочник устарел: врач добавлен после загрузки
+    return found
 
 
 def patient_exists(db: Database, patient_id: int) -> bool:
     """
     Проверка существования пациента по id.
     """
-    conn = db.get_connection()
-
-    query = "SELECT 1 FROM patients WHERE id = %s LIMIT 1"
-
-    with conn.cursor() as cursor:
-        cursor.execute(query, (patient_id,))
+    # проверка перед записью: пациент мог быть только что зарегистрирован другим регистратором
+    with db.cursor(mode=READ_PRIMARY) as cursor:
+        db.execute_prepared(cursor, PATIENT_EXISTS, (patient_id,))
         # запись о пациенте is not None = True (пациент существует)
         return cursor.fetchone() is not None
 
@@ -66,138 +120,797 @@ def get_available_dates() -> list[date]:
     return [today + timedelta(days=i) for i in range(BOOKING_HORIZON_DAYS)]
 
 
-def generate_daily_slots(day: date) -> list[datetime]:
+def check_interval(start: datetime, duration: timedelta) -> None:
     """
-    Генерирует все возможные слоты для записи на день.
-    Первый - 9:00, последний - 16:30 (все по 30 минут).
+    Проверяет интервал приема: длительность положительна, и прием заканчивается в тот же день
+    (ограничение check_appointment_single_day, на нем держится секционирование appointments).
     """
-    slots = []
-
-    current = datetime.combine(day, WORK_START)
-    last_slot = datetime.combine(day, LAST_SLOT_START)
+    if duration <= timedelta(0):
+        raise ValueError("Длительность приема должна быть положительной.")
 
-    while current <= last_slot:
-        slots.append(current)
-        current += APPOINTMENT_DURATION
+    if start + duration > datetime.combine(start.date() + timedelta(days=1), time.min):
+        raise ValueError("Прием должен закончиться в тот же день.")
 
-    return slots
 
-
-def get_busy_slots(db: Database, doctor_id: int, day: date) -> set[datetime]:
+def generate_daily_slots(day: date, duration: timedelta = APPOINTMENT_DURATION) -> list[datetime]:
     """
-    Возвращает занятые временные слоты врача за день.
+    Генерирует все возможные начала приема заданной длительности на день по общей сетке
+    (для врачей без собственного расписания). Слоты идут с шагом 30 минут от 9:00;
+    прием должен закончиться к 17:00 (для стандартного 30-минутного приема последний слот - 16:30).
+    Расписание конкретного врача — get_slot_template(db, doctor_id).slots(day, duration).
     """
-    conn = db.get_connection()
+    return DEFAULT_TEMPLATE.slots(day, duration)
+
 
-    query = """
-        SELECT date_time
+BUSY_INTERVALS = PreparedStatement(
+    "busy_intervals",
+    """
+        SELECT date_time, end_time
         FROM appointments
-        WHERE doctor_id = %s
-          AND DATE(date_time) = %s
+        WHERE doctor_id = $1
+          AND date_time > $2 - interval '1 day'
+          AND date_time < $3
+          AND tsrange(date_time, end_time) && tsrange($2, $3)
+        ORDER BY date_time
+    """,
+    ("integer", "timestamp", "timestamp")
+)
+
+
+def get_busy_intervals(db: Database, doctor_id: int, start: datetime, end: datetime) -> list[Interval]:
     """
+    Возвращает занятые интервалы врача, пересекающиеся с [start, end), по возрастанию начала.
+    Поиск идет по GiST-индексу ограничения no_doctor_overlap секции; прием не переходит через полночь,
+    поэтому пересекающиеся интервалы начинаются не раньше start - 1 день и лишние секции отсекаются.
+    """
+    with db.cursor(mode=READ) as cursor:
+        db.execute_prepared(cursor, BUSY_INTERVALS, (doctor_id, start, end))
+        return cursor.fetchall()
 
-    with conn.cursor() as cursor:
-        cursor.execute(query, (doctor_id, day))
-        rows = cursor.fetchall()
 
-    return {row[0] for row in rows}
+def _overlaps(start: datetime, end: datetime, busy: list[Interval]) -> bool:
+    """Пересекается ли интервал [start, end) с каким-либо занятым интервалом"""
+    return any(busy_start < end and busy_end > start for busy_start, busy_end in busy)
 
 
-def get_available_slots_for_day(db: Database, doctor_id: int, day: date) -> list[datetime]:
+def get_busy_slots(db: Database, doctor_id: int, day: date) -> set[datetime]:
     """
-    Возвращает доступные временные слоты врача на выбранный день.
+    Возвращает занятые временные слоты врача за день
+    (слоты сетки расписания врача, пересекающиеся хотя бы с одной записью).
     """
-    all_slots = generate_daily_slots(day)
-    busy_slots = get_busy_slots(db, doctor_id, day)
+    day_start = datetime.combine(day, time.min)
+    busy = get_busy_intervals(db, doctor_id, day_start, day_start + timedelta(days=1))
 
-    now = datetime.now()
+    return {
+        slot
+        for slot in get_slot_template(db, doctor_id).slots(day, SLOT_STEP)
+        if _overlaps(slot, slot + SLOT_STEP, busy)
+    }
 
+
+def _filter_free_slots(
+    slots: list[datetime],
+    busy: list[Interval],
+    now: datetime,
+    duration: timedelta = APPOINTMENT_DURATION
+) -> list[datetime]:
+    """
+    Оставляет из слотов дня (шаблон расписания врача) только те начала приема, для которых
+    весь интервал [начало, начало + duration) свободен и еще не прошел.
+    """
     available = []
 
-    for slot in all_slots:
-        # если сегодня — убираем прошедшие
-        if day == now.date() and slot <= now:
+    for slot in slots:
+        # убираем прошедшие
+        if slot <= now:
             continue
 
-        if slot not in busy_slots:
+        if not _overlaps(slot, slot + duration, busy):
             available.append(slot)
 
     return available
 
 
-def is_doctor_available(db: Database, doctor_id: int, appointment_datetime: datetime) -> bool:
+def availability_by_day(
+    template: SlotTemplate,
+    busy: list[Interval],
+    start_day: date,
+    days: int,
+    duration: timedelta = APPOINTMENT_DURATION
+) -> dict[date, list[datetime]]:
     """
-    Проверка, свободен ли доктор в указанный временной интервал.
+    Свободные слоты врача по дням [start_day, start_day + days) по его шаблону расписания и занятым
+    интервалам (общая часть синхронной и асинхронной get_availability_range). Дни без слотов пропускаются.
     """
-    conn = db.get_connection()
+    # раскладываем занятые интервалы по дням, чтобы не перебирать их все для каждого дня
+    busy_by_day: dict[date, list[Interval]] = {}
+    for busy_start, busy_end in busy:
+        day = busy_start.date()
+        while day <= busy_end.date():
+            busy_by_day.setdefault(day, []).append((busy_start, busy_end))
+            day += timedelta(days=1)
+
+    now = datetime.now()
+    availability = {}
+
+    for i in range(days):
+        day = start_day + timedelta(days=i)
+        free = _filter_free_slots(template.slots(day, duration), busy_by_day.get(day, []), now, duration)
+
+        if free:
+            availability[day] = free
+
+    return availability
+
+
+# матрица доступности процесса (см. services/availability_matrix.py, enable_availability_matrix)
+_availability_matrix: Optional["AvailabilityMatrix"] = None
+
+
+def use_availability_matrix(matrix: Optional["AvailabilityMatrix"]) -> None:
+    """Подключает матрицу доступности к поиску свободных слотов (None — отключает, поиск идет в БД)"""
+    global _availability_matrix
+    _availability_matrix = matrix
+
+
+def _matrix_for(db: Database, doctor_id: int, first_day: date, last_day: date) -> Optional["AvailabilityMatrix"]:
+    """
+    Матрица доступности процесса, если по ней можно ответить о днях [first_day, last_day] врача,
+    иначе None (матрица не подключена, дни вне ее окна, врач добавлен после загрузки).
+    Раз в сутки окно матрицы сдвигается на сегодня.
+    """
+    matrix = _availability_matrix
+    if matrix is None:
+        return None
+
+    today = date.today()
+    if matrix.start_day < today:
+        matrix.load(db, today)
+
+    if not (matrix.covers(first_day) and matrix.covers(last_day) and matrix.has_doctor(doctor_id)):
+        return None
+    return matrix
+
+
+def get_available_slots_for_day(
+    db: Database,
+    doctor_id: int,
+    day: date,
+    duration: timedelta = APPOINTMENT_DURATION
+) -> list[datetime]:
+    """
+    Возвращает доступные временные слоты врача на выбранный день для приема заданной длительности
+    (по расписанию врача). Если подключена матрица доступности и день в ее окне, БД не читается.
+    """
+    matrix = _matrix_for(db, doctor_id, day, day)
+    if matrix is not None:
+        return matrix.free_slots(doctor_id, day, duration)
+
+    day_start = datetime.combine(day, time.min)
+    busy = get_busy_intervals(db, doctor_id, day_start, day_start + timedelta(days=1))
+    slots = get_slot_template(db, doctor_id).slots(day, duration)
+
+    return _filter_free_slots(slots, busy, datetime.now(), duration)
+
+
+def get_availability_range(
+    db: Database,
+    doctor_id: int,
+    start_day: date,
+    days: int = BOOKING_HORIZON_DAYS,
+    duration: timedelta = APPOINTMENT_DURATION
+) -> dict[date, list[datetime]]:
+    """
+    Возвращает свободные слоты врача сразу на несколько дней (одним запросом к БД, по расписанию врача;
+    если подключена матрица доступности и все дни в ее окне — по матрице, без запроса).
+    Ключи словаря — дни, в которых остался хотя бы один свободный слот, по возрастанию.
+    """
+    matrix = _matrix_for(db, doctor_id, start_day, start_day + timedelta(days=days - 1))
+    if matrix is not None:
+        availability = {}
+        for i in range(days):
+            day = start_day + timedelta(days=i)
+            free = matrix.free_slots(doctor_id, day, duration)
+            if free:
+                availability[day] = free
+        return availability
+
+    range_start = datetime.combine(start_day, time.min)
+    busy = get_busy_intervals(db, doctor_id, range_start, range_start + timedelta(days=days))
+
+    return availability_by_day(get_slot_template(db, doctor_id), busy, start_day, days, duration)
+
+
+# сетка слотов врачей строится на стороне БД по тем же правилам, что и compile_templates:
+# интервалы дня недели из doctor_schedules (врач без строк — WORK_START–WORK_END каждый день)
+# и дополнительные смены сливаются (range_agg), нерабочие исключения вычитаются из мультидиапазона,
+# в каждом оставшемся интервале начала приема идут с шагом SLOT_STEP от его начала;
+# занятые слоты отсекаются анти-соединением с appointments (по GiST-индексу секции)
+EARLIEST_SLOTS_QUERY = """
+    WITH
+        doctor AS (
+            SELECT unnest(%(doctor_ids)s::int[]) AS doctor_id
+        ),
+        day AS (
+            SELECT generate_series(%(first_day)s::timestamp, %(last_day)s::timestamp, interval '1 day') AS day
+        ),
+        work AS (
+            SELECT d.doctor_id, day.day, tsrange(day.day + s.start_time, day.day + s.end_time) AS shift
+            FROM doctor d
+            CROSS JOIN day
+            JOIN doctor_schedules s
+              ON s.doctor_id = d.doctor_id
+             AND s.weekday = extract(isodow FROM day.day)
+            UNION ALL
+            SELECT d.doctor_id, day.day, tsrange(day.day + %(work_start)s, day.day + %(work_end)s)
+            FROM doctor d
+            CROSS JOIN day
+            WHERE NOT EXISTS (SELECT 1 FROM doctor_schedules s WHERE s.doctor_id = d.doctor_id)
+            UNION ALL
+            SELECT e.doctor_id, day.day, tsrange(day.day + e.start_time, day.day + e.end_time)
+            FROM schedule_exceptions e
+            JOIN doctor d ON d.doctor_id = e.doctor_id
+            JOIN day ON day.day::date BETWEEN e.start_day AND e.end_day
+            WHERE e.is_working
+        ),
+        off AS (
+            SELECT e.doctor_id, day.day, range_agg(
+                CASE
+                    WHEN e.start_time IS NULL THEN tsrange(day.day, day.day + interval '1 day')
+                    ELSE tsrange(day.day + e.start_time, day.day + e.end_time)
+                END
+            ) AS shifts
+            FROM schedule_exceptions e
+            JOIN doctor d ON d.doctor_id = e.doctor_id
+            JOIN day ON day.day::date BETWEEN e.start_day AND e.end_day
+            WHERE NOT e.is_working
+            GROUP BY e.doctor_id, day.day
+        ),
+        shifts AS (
+            SELECT doctor_id, day, range_agg(shift) AS shifts
+            FROM work
+            GROUP BY doctor_id, day
+        ),
+        candidate AS (
+            SELECT sh.doctor_id, s.slot
+            FROM shifts sh
+            LEFT JOIN off o ON o.doctor_id = sh.doctor_id AND o.day = sh.day
+            CROSS JOIN LATERAL unnest(sh.shifts - coalesce(o.shifts, '{}'::tsmultirange)) AS r(shift)
+            CROSS JOIN LATERAL generate_series(lower(r.shift), upper(r.shift) - %(duration)s, %(step)s) AS s(slot)
+        )
+    SELECT c.doctor_id, c.slot
+    FROM candidate c
+    WHERE c.slot > %(after)s
+      AND NOT EXISTS (
+          SELECT 1
+          FROM appointments a
+          WHERE a.doctor_id = c.doctor_id
+            AND a.date_time > c.slot - interval '1 day'
+            AND a.date_time < c.slot + %(duration)s
+            AND tsrange(a.date_time, a.end_time) && tsrange(c.slot, c.slot + %(duration)s)
+      )
+    ORDER BY c.slot, c.doctor_id
+    LIMIT %(limit)s
+"""
+
+
+def earliest_slots_params(
+    after: datetime,
+    limit: int,
+    doctor_ids: Iterable[int],
+    duration: timedelta,
+    days: int
+) -> dict:
+    """Параметры EARLIEST_SLOTS_QUERY (общие для синхронной и асинхронной версий)"""
+    (work_start, work_end), = DEFAULT_TEMPLATE.weekly[0]
+    first_day = datetime.combine(after.date(), time.min)
+
+    return {
+        "doctor_ids": sorted(doctor_ids),
+        "first_day": first_day,
+        "last_day": first_day + timedelta(days=days - 1),
+        "work_start": work_start,
+        "work_end": work_end,
+        "step": SLOT_STEP,
+        "after": after,
+        "duration": duration,
+        "limit": limit,
+    }
+
+
+def find_earliest_slots(
+    db: Database,
+    after: Optional[datetime] = None,
+    limit: int = 10,
+    doctor_ids: Optional[Iterable[int]] = None,
+    duration: timedelta = APPOINTMENT_DURATION,
+    days: int = BOOKING_HORIZON_DAYS
+) -> list[tuple[int, datetime]]:
+    """
+    Ближайшие свободные слоты у любого из врачей (одним запросом к БД): первые limit пар
+    (id врача, начало приема) по возрастанию времени, затем id врача.
+    Сетка слотов по расписаниям и исключениям врачей строится в том же запросе (EARLIEST_SLOTS_QUERY).
+
+    Аргументы:
+        after: искать слоты позже этого момента (по умолчанию и не раньше — сейчас)
+        doctor_ids: среди каких врачей искать (по умолчанию — все врачи справочника)
+        duration: длительность приема — весь интервал должен быть свободен
+        days: сколько дней, начиная с дня after, просматривать
+    """
+    now = datetime.now()
+    after = max(after, now) if after is not None else now
+
+    if doctor_ids is None:
+        doctor_ids = get_doctors(db)
+
+    params = earliest_slots_params(after, limit, doctor_ids, duration, days)
+    if not params["doctor_ids"] or days <= 0:
+        return []
+
+    with db.cursor(mode=READ) as cursor:
+        cursor.execute(EARLIEST_SLOTS_QUERY, params)
+        return cursor.fetchall()
 
-    new_start = appointment_datetime
-    new_end = appointment_datetime + APPOINTMENT_DURATION
 
-    query = """
+# пересечение диапазонов проверяется по GiST-индексу, без просмотра всей истории врача
+DOCTOR_BUSY = PreparedStatement(
+    "doctor_busy",
+    """
         SELECT 1
         FROM appointments
-        WHERE doctor_id = %s
-          AND date_time < %s
-          AND (date_time + INTERVAL '30 minutes') > %s
+        WHERE doctor_id = $1
+          AND date_time > $2 - interval '1 day'
+          AND date_time < $3
+          AND tsrange(date_time, end_time) && tsrange($2, $3)
         LIMIT 1
+    """,
+    ("integer", "timestamp", "timestamp")
+)
+
+
+def is_doctor_available(
+    db: Database,
+    doctor_id: int,
+    appointment_datetime: datetime,
+    duration: timedelta = APPOINTMENT_DURATION
+) -> bool:
     """
+    Проверка, свободен ли доктор в указанный временной интервал.
+    """
+    new_start = appointment_datetime
+    new_end = appointment_datetime + duration
 
-    with conn.cursor() as cursor:
-        cursor.execute(query, (doctor_id, new_end, new_start))
+    # проверка перед записью: слот мог быть только что занят другим регистратором
+    with db.cursor(mode=READ_PRIMARY) as cursor:
+        db.execute_prepared(cursor, DOCTOR_BUSY, (doctor_id, new_start, new_end))
         # если ничего не вернулось, None is None = True (доктор свободен)
         return cursor.fetchone() is None 
 
 
-def create_appointment(db: Database, patient_id: int, doctor_id: int, appointment_datetime: datetime) -> None:
+# статусы записи на прием (коды причин отказа)
+BOOKED = "booked"
+PATIENT_NOT_FOUND = "patient_not_found"
+DOCTOR_NOT_FOUND = "doctor_not_found"
+SLOT_TAKEN = "slot_taken"
+OUTSIDE_SCHEDULE = "outside_schedule"
+NO_PARTITION = "no_partition"
+INVALID_INTERVAL = "invalid_interval" # только в пакетной записи: отдельная запись выбрасывает ValueError check_interval
+
+BOOKING_MESSAGES = {
+    BOOKED: "Запись создана.",
+    PATIENT_NOT_FOUND: "Пациент с таким id не найден.",
+    DOCTOR_NOT_FOUND: "Врач c таким id не найден.",
+    SLOT_TAKEN: "Врач уже занят в это время.",
+    OUTSIDE_SCHEDULE: "Врач не работает в это время.",
+    NO_PARTITION: "Запись на этот месяц еще не открыта (нет секции appointments, см. maintain_partitions.py).",
+    INVALID_INTERVAL: "Неверный интервал приема: длительность должна быть положительной, а прием — закончиться в тот же день.",
+}
+
+
+class BookingError(ValueError):
+    """Запись на прием невозможна"""
+
+
+class PatientNotFoundError(BookingError):
+    """Пациент не найден"""
+
+
+class DoctorNotFoundError(BookingError):
+    """Врач не найден"""
+
+
+class SlotTakenError(BookingError):
+    """Врач уже занят в это время"""
+
+
+class OutsideScheduleError(BookingError):
+    """Время приема вне расписания врача"""
+
+
+class NoPartitionError(BookingError):
+    """Для месяца приема нет секции appointments"""
+
+
+BOOKING_ERRORS = {
+    PATIENT_NOT_FOUND: PatientNotFoundError,
+    DOCTOR_NOT_FOUND: DoctorNotFoundError,
+    SLOT_TAKEN: SlotTakenError,
+    OUTSIDE_SCHEDULE: OutsideScheduleError,
+    NO_PARTITION: NoPartitionError,
+}
+
+
+def booking_error(status: str) -> BookingError:
+    """Создает исключение для кода причины отказа"""
+    return BOOKING_ERRORS[status](BOOKING_MESSAGES[status])
+
+
+# суффикс имени ограничения-исключения секции appointments (см. create_appointments_partition в schema.sql)
+SLOT_CONSTRAINT_SUFFIX = "_no_doctor_overlap"
+
+
+def violation_status(sqlstate: Optional[str], constraint: Optional[str]) -> Optional[str]:
+    """
+    Переводит нарушение ограничения таблицы appointments (SQLSTATE + имя ограничения)
+    в код причины отказа. Возвращает None, если нарушение не связано с записью на прием.
+    """
+    # занятость слота сторожат только ограничения no_doctor_overlap секций;
+    # остальные (например, первичный ключ (id, date_time)) к записи на прием не относятся
+    if sqlstate in (errorcodes.UNIQUE_VIOLATION, errorcodes.EXCLUSION_VIOLATION):
+        if constraint is not None and constraint.endswith(SLOT_CONSTRAINT_SUFFIX):
+            return SLOT_TAKEN
+        return None
+
+    if sqlstate == errorcodes.FOREIGN_KEY_VIOLATION:
+        if constraint == "fk_appointments_patient":
+            return PATIENT_NOT_FOUND
+        if constraint == "fk_appointments_doctor":
+            return DOCTOR_NOT_FOUND
+
+    # "no partition of relation found for row": секции нет (DEFAULT-секции у appointments нет намеренно),
+    # у нарушений CHECK-ограничений таблицы имя ограничения есть всегда
+    if sqlstate == errorcodes.CHECK_VIOLATION and constraint is None:
+        return NO_PARTITION
+
+    return None
+
+
+# условная вставка: строка вставляется только если все проверки пройдены,
+# а запрос в любом случае возвращает код причины
+BOOK_APPOINTMENT = PreparedStatement(
+    "book_appointment",
+    f"""
+        WITH
+            checks AS (
+                SELECT
+                    EXISTS (SELECT 1 FROM patients WHERE id = $1) AS patient_found,
+                    EXISTS (SELECT 1 FROM doctors WHERE id = $2) AS doctor_found,
+                    EXISTS (
+                        SELECT 1
+                        FROM appointments
+                        WHERE doctor_id = $2
+                          AND date_time > $3 - interval '1 day'
+                          AND date_time < $4
+                          AND tsrange(date_time, end_time) && tsrange($3, $4)
+                    ) AS busy
+            ),
+            inserted AS (
+                INSERT INTO appointments (patient_id, doctor_id, date_time, end_time)
+                SELECT $1, $2, $3, $4
+                FROM checks
+                WHERE patient_found AND doctor_found AND NOT busy
+                RETURNING id
+            )
+        SELECT
+            CASE
+                WHEN NOT c.patient_found THEN '{PATIENT_NOT_FOUND}'
+                WHEN NOT c.doctor_found THEN '{DOCTOR_NOT_FOUND}'
+                WHEN c.busy THEN '{SLOT_TAKEN}'
+                ELSE '{BOOKED}'
+            END,
+            (SELECT id FROM inserted)
+        FROM checks c
+    """,
+    ("integer", "integer", "timestamp", "timestamp")
+)
+
+
+def create_appointment(
+    db: Database,
+    patient_id: int,
+    doctor_id: int,
+    appointment_datetime: datetime,
+    duration: timedelta = APPOINTMENT_DURATION
+) -> int:
     """
-    Создание записи на прием.
+    Создание записи на прием. Возвращает id созданной записи.
     
     Примечания:
-    - проверяется, существует ли выбранный пациент и доктор в БД;
-    - проверяется, свободен ли врач в выбранное нами время;
-    - учитывается длительность приема (30 минут);
-    - расписание врачей не учитывается (!!!).
+    - проверки и вставка выполняются одним запросом (один обмен с БД);
+    - существование врача проверяется по кэшу справочника врачей,
+      запрос перепроверяет врача на случай, если врача удалили после загрузки кэша;
+    - при отказе выбрасывается PatientNotFoundError, DoctorNotFoundError, SlotTakenError,
+      OutsideScheduleError или NoPartitionError (все — ValueError);
+    - если слот параллельно занял другой регистратор, срабатывают ограничения таблицы
+      и их нарушение тоже превращается в SlotTakenError;
+    - учитывается длительность приема (по умолчанию 30 минут), пересечения ищутся по диапазону
+      [date_time, end_time) через GiST-индекс ограничения no_doctor_overlap;
+    - прием должен целиком лежать в рабочем интервале врача (шаблон расписания из кэша, без запроса к БД).
     """
-    
-    if not patient_exists(db, patient_id):
-        raise ValueError("Пациент с таким id не найден.")
-    
+    check_interval(appointment_datetime, duration)
+
+    # известного врача проверяем по кэшу справочника, без лишнего запроса к БД
     if not doctor_exists(db, doctor_id):
-        raise ValueError("Врач c таким id не найден.")
-    
-    if not is_doctor_available(db, doctor_id, appointment_datetime):
-        raise ValueError("Врач уже занят в это время.")
+        raise booking_error(DOCTOR_NOT_FOUND)
+
+    start = appointment_datetime
+    end = appointment_datetime + duration
+
+    if not get_slot_template(db, doctor_id).covers(start, end):
+        raise booking_error(OUTSIDE_SCHEDULE)
+
+    with db.connection():
+        try:
+            with db.cursor() as cursor:
+                db.execute_prepared(cursor, BOOK_APPOINTMENT, (patient_id, doctor_id, start, end))
+                status, appointment_id = cursor.fetchone()
+        except psycopg2.IntegrityError as e:
+            status = violation_status(e.pgcode, e.diag.constraint_name)
+            if status is None:
+                raise
+            raise booking_error(status) from e
+
+        if status != BOOKED:
+            raise booking_error(status)
+
+        # подписчики (например, матрица доступности) узнают о записи после commit
+        db.emit("appointments", "insert", {
+            "id": appointment_id,
+            "patient_id": patient_id,
+            "doctor_id": doctor_id,
+            "date_time": appointment_datetime,
+            "end_time": appointment_datetime + duration
+        })
+
+    return appointment_id
 
-    conn = db.get_connection()
 
-    try:
-        query = """
-            INSERT INTO appointments (patient_id, doctor_id, date_time)
-            VALUES (%s, %s, %s)
+class BookingResult:
+    """Результат записи одного элемента пакета"""
+
+    __slots__ = ("patient_id", "doctor_id", "date_time", "end_time", "status", "appointment_id")
+
+    def __init__(
+            self,
+            patient_id: int,
+            doctor_id: int,
+            date_time: datetime,
+            end_time: datetime,
+            status: str,
+            appointment_id: Optional[int] = None
+    ):
+        """
+        Аргументы:
+            patient_id, doctor_id, date_time, end_time: данные запрошенной записи
+            status: BOOKED или причина отказа (PATIENT_NOT_FOUND, DOCTOR_NOT_FOUND, SLOT_TAKEN,
+                OUTSIDE_SCHEDULE, INVALID_INTERVAL)
+            appointment_id: id созданной записи (только для BOOKED)
         """
+        self.patient_id = patient_id
+        self.doctor_id = doctor_id
+        self.date_time = date_time
+        self.end_time = end_time
+        self.status = status
+        self.appointment_id = appointment_id
 
-        with conn.cursor() as cursor:
-            cursor.execute(
-                query,
-                (patient_id, doctor_id, appointment_datetime)
-            )
 
-        conn.commit()
+    @property
+    def ok(self) -> bool:
+        """Создана ли запись"""
+        return self.status == BOOKED
+
 
-    except Exception:
-        conn.rollback()
-        raise
+    @property
+    def message(self) -> str:
+        """Сообщение для пользователя"""
+        return BOOKING_MESSAGES[self.status]
 
 
-def get_future_appointments(db: Database) -> list[tuple[int, str, str, datetime]]:
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return (
+            f"BookingResult(patient_id={self.patient_id}, doctor_id={self.doctor_id}, "
+            f"date_time='{self.date_time}', status='{self.status}', appointment_id={self.appointment_id})"
+        )
+
+
+# найденные пациенты и врачи блокируются (FOR KEY SHARE, как при проверке внешнего ключа) до конца
+# транзакции: параллельное удаление дождется commit и не сорвет вставку пакета ForeignKeyViolation
+BATCH_CHECK_QUERY = """
+    SELECT
+        r.idx,
+        EXISTS (SELECT 1 FROM patients p WHERE p.id = r.patient_id FOR KEY SHARE),
+        EXISTS (SELECT 1 FROM doctors d WHERE d.id = r.doctor_id FOR KEY SHARE),
+        EXISTS (
+            SELECT 1
+            FROM appointments a
+            WHERE a.doctor_id = r.doctor_id
+              AND a.date_time > r.start - interval '1 day'
+              AND a.date_time < r.finish
+              AND tsrange(a.date_time, a.end_time) && tsrange(r.start, r.finish)
+        )
+    FROM unnest(%s::int[], %s::int[], %s::int[], %s::timestamp[], %s::timestamp[])
+        AS r(idx, patient_id, doctor_id, start, finish)
+"""
+
+# все прошедшие проверку записи пакета — одним INSERT из массивов
+BATCH_INSERT_QUERY = """
+    INSERT INTO appointments (patient_id, doctor_id, date_time, end_time)
+    SELECT *
+    FROM unnest(%s::int[], %s::int[], %s::timestamp[], %s::timestamp[])
+    ON CONFLICT DO NOTHING
+    RETURNING id, doctor_id, date_time
+"""
+
+
+# Шаги пакетной записи без обращения к БД (общие для синхронной и асинхронной версий)
+
+def batch_results(requests: Iterable[tuple]) -> list[BookingResult]:
+    """Результаты пакета до проверок в БД: BOOKED или INVALID_INTERVAL (см. check_interval)"""
+    results = []
+    for patient_id, doctor_id, date_time, *rest in requests:
+        duration = rest[0] if rest else APPOINTMENT_DURATION
+        result = BookingResult(patient_id, doctor_id, date_time, date_time + duration, BOOKED)
+        try:
+            check_interval(date_time, duration)
+        except ValueError:
+            result.status = INVALID_INTERVAL
+        results.append(result)
+    return results
+
+
+def batch_check_params(results: list[BookingResult]) -> tuple:
+    """Параметры BATCH_CHECK_QUERY для еще не отклоненных элементов"""
+    to_check = [idx for idx, result in enumerate(results) if result.ok]
+    return (
+        to_check,
+        [results[idx].patient_id for idx in to_check],
+        [results[idx].doctor_id for idx in to_check],
+        [results[idx].date_time for idx in to_check],
+        [results[idx].end_time for idx in to_check],
+    )
+
+
+def apply_batch_checks(results: list[BookingResult], rows: Iterable[tuple], templates: dict[int, SlotTemplate]) -> list[BookingResult]:
     """
-    Получение списка всех предстоящих записей (просто для просмотра).
-    Список содержит id записи, имя пациента, вид, ФИО доктора и дату и время приема.
+    Применяет к пакету строки BATCH_CHECK_QUERY, расписания врачей и пересечения внутри пакета
+    (из пересекающихся запросов к одному врачу выигрывает первый). Возвращает элементы для вставки.
+    """
+    for idx, patient_found, doctor_found, busy in rows:
+        if not patient_found:
+            results[idx].status = PATIENT_NOT_FOUND
+        elif not doctor_found:
+            results[idx].status = DOCTOR_NOT_FOUND
+        elif busy:
+            results[idx].status = SLOT_TAKEN
+
+    for result in results:
+        template = templates.get(result.doctor_id, DEFAULT_TEMPLATE)
+        if result.ok and not template.covers(result.date_time, result.end_time):
+            result.status = OUTSIDE_SCHEDULE
+
+    accepted: dict[int, list[Interval]] = {}
+    for result in results:
+        if not result.ok:
+            continue
+        intervals = accepted.setdefault(result.doctor_id, [])
+        if _overlaps(result.date_time, result.end_time, intervals):
+            result.status = SLOT_TAKEN
+            continue
+        intervals.append((result.date_time, result.end_time))
+
+    return [result for result in results if result.ok]
+
+
+def batch_insert_params(to_insert: list[BookingResult]) -> tuple:
+    """Параметры BATCH_INSERT_QUERY"""
+    return (
+        [r.patient_id for r in to_insert],
+        [r.doctor_id for r in to_insert],
+        [r.date_time for r in to_insert],
+        [r.end_time for r in to_insert],
+    )
+
+
+def apply_batch_inserted(to_insert: list[BookingResult], rows: Iterable[tuple]) -> list[BookingResult]:
+    """
+    Применяет строки RETURNING вставки: строку, отброшенную ON CONFLICT (слот заняли параллельно),
+    отмечает SLOT_TAKEN. Возвращает созданные записи.
+    """
+    created = {(doctor_id, date_time): appointment_id for appointment_id, doctor_id, date_time in rows}
+    booked = []
+
+    for result in to_insert:
+        appointment_id = created.get((result.doctor_id, result.date_time))
+        if appointment_id is None:
+            result.status = SLOT_TAKEN
+            continue
+        result.appointment_id = appointment_id
+        booked.append(result)
+
+    return booked
+
+
+def booked_event(result: BookingResult) -> dict:
+    """Строка события appointments/insert для созданной записи пакета"""
+    return {
+        "id": result.appointment_id,
+        "patient_id": result.patient_id,
+        "doctor_id": result.doctor_id,
+        "date_time": result.date_time,
+        "end_time": result.end_time
+    }
+
+
+def create_appointments_batch(
+    db: Database,
+    requests: Iterable[tuple]
+) -> list[BookingResult]:
     """
-    conn = db.get_connection()
+    Пакетная запись на прием (серия визитов, групповая запись).
+    Каждый запрос: (id пациента, id врача, дата и время[, длительность]); без длительности — 30 минут.
+    Результаты возвращаются в том же порядке.
+
+    Примечания:
+    - пациенты, врачи и пересечения с существующими записями проверяются одним запросом для всего пакета,
+      найденные пациенты и врачи остаются заблокированными от удаления до конца транзакции;
+    - неверный интервал (см. check_interval) получает статус INVALID_INTERVAL и в БД не проверяется;
+    - время вне расписания врача получает статус OUTSIDE_SCHEDULE;
+    - пересечения внутри пакета: из пересекающихся запросов к одному врачу записывается первый;
+    - прошедшие проверку записи вставляются одним INSERT из массивов;
+    - если слот успели занять параллельно, элемент получает статус SLOT_TAKEN, остальные записываются;
+    - если для месяца одного из приемов нет секции appointments, пакет отменяется с NoPartitionError.
+    """
+    results = batch_results(requests)
+    if not any(result.ok for result in results):
+        return results
+
+    with db.connection():
+        with db.cursor() as cursor:
+            cursor.execute(
+                BATCH_CHECK_QUERY,
+                batch_check_params(results),
+                name="appointment_service.create_appointments_batch:check"
+            )
+            rows = cursor.fetchall()
+
+        to_insert = apply_batch_checks(results, rows, get_slot_templates(db))
+        if not to_insert:
+            return results
 
-    query = """
+        try:
+            with db.cursor() as cursor:
+                cursor.execute(
+                    BATCH_INSERT_QUERY,
+                    batch_insert_params(to_insert),
+                    name="appointment_service.create_appointments_batch:insert"
+                )
+                inserted = cursor.fetchall()
+        except psycopg2.IntegrityError as e:
+            # INSERT пакета отменяется целиком (например, для одного из месяцев нет секции)
+            status = violation_status(e.pgcode, e.diag.constraint_name)
+            if status is None:
+                raise
+            raise booking_error(status) from e
+
+        for result in apply_batch_inserted(to_insert, inserted):
+            db.emit("appointments", "insert", booked_event(result))
+
+    return results
+
+
+# предстоящие записи (строки AppointmentRow); {seek} и {order} подставляет future_appointments_page_query
+FUTURE_APPOINTMENTS_PAGE_QUERY = """
     SELECT
         a.id,
         p.name AS patient_name,
@@ -211,31 +924,141 @@ def get_future_appointments(db: Database) -> list[tuple[int, str, str, datetime]
     JOIN owners o ON p.owner_id = o.id
     JOIN doctors d ON a.doctor_id = d.id
     WHERE a.date_time >= NOW()
-    ORDER BY a.date_time
+      {seek}
+    ORDER BY {order}
+    {limit}
 """
 
-    with conn.cursor() as cursor:
-        cursor.execute(query)
+FUTURE_APPOINTMENTS_QUERY = FUTURE_APPOINTMENTS_PAGE_QUERY.format(seek="", order="a.date_time", limit="")
+
+FUTURE_APPOINTMENT_EXISTS_QUERY = "SELECT 1 FROM appointments WHERE id = %s AND date_time >= NOW() LIMIT 1"
+
+# время приема предстоящей записи (по нему отмена читает одну секцию)
+FUTURE_APPOINTMENT_TIME_QUERY = "SELECT date_time FROM appointments WHERE id = %s AND date_time >= NOW()"
+
+# по одному id секцию выбрать нельзя: проверяется индекс первичного ключа (id, date_time) каждой секции
+DELETE_APPOINTMENT_QUERY = """
+    DELETE FROM appointments
+    WHERE id = %s
+    RETURNING patient_id, doctor_id, date_time, end_time
+"""
+
+# с известным временем приема удаление читает только его секцию
+DELETE_APPOINTMENT_AT_QUERY = """
+    DELETE FROM appointments
+    WHERE id = %s
+      AND date_time = %s
+    RETURNING patient_id, doctor_id, date_time, end_time
+"""
+
+
+def delete_appointment_query(appointment_id: int, date_time: Optional[datetime]) -> tuple[str, tuple]:
+    """Запрос отмены записи и его параметры (общие для синхронной и асинхронной версий)"""
+    if date_time is None:
+        return DELETE_APPOINTMENT_QUERY, (appointment_id,)
+    return DELETE_APPOINTMENT_AT_QUERY, (appointment_id, date_time)
+
+
+def get_future_appointments(db: Database) -> list[AppointmentRow]:
+    """
+    Получение списка всех предстоящих записей (просто для просмотра).
+    Каждая запись — AppointmentRow: id записи, пациент, вид, владелец, телефон владельца, ФИО доктора и дата и время приема.
+    """
+    with db.cursor(row_factory=AppointmentRow, mode=READ) as cursor:
+        cursor.execute(FUTURE_APPOINTMENTS_QUERY)
         return cursor.fetchall()
 
 
-def delete_appointment(db: Database, appointment_id: int) -> bool:
+def future_appointments_page_query(
+    page_size: int,
+    cursor: Optional[tuple[datetime, int]],
+    direction: str
+) -> tuple[str, tuple]:
+    """Запрос и параметры одной страницы предстоящих записей (см. get_future_appointments_page)"""
+    check_direction(direction)
+
+    if direction == NEXT:
+        condition, order = "(a.date_time, a.id) > (%s, %s)", "a.date_time, a.id"
+    else:
+        condition, order = "(a.date_time, a.id) < (%s, %s)", "a.date_time DESC, a.id DESC"
+
+    seek = f"AND {condition}" if cursor is not None else ""
+    query = FUTURE_APPOINTMENTS_PAGE_QUERY.format(seek=seek, order=order, limit="LIMIT %s")
+
+    params = (*cursor, page_size + 1) if cursor is not None else (page_size + 1,)
+    return query, params
+
+
+def get_future_appointments_page(
+    db: Database,
+    page_size: int = PAGE_SIZE,
+    cursor: Optional[tuple[datetime, int]] = None,
+    direction: str = NEXT
+) -> Page:
+    """
+    Возвращает одну страницу предстоящих записей (keyset-пагинация по (date_time, id)).
+    Строки те же, что в get_future_appointments.
+
+    Аргументы:
+        page_size: количество записей на странице
+        cursor: (дата и время, id) граничной записи (Page.next_cursor / Page.prev_cursor),
+                None — первая страница (для NEXT) или последняя (для PREV)
+        direction: NEXT — записи после курсора, PREV — до курсора
+    """
+    query, params = future_appointments_page_query(page_size, cursor, direction)
+
+    with db.cursor(row_factory=AppointmentRow, mode=READ) as cur:
+        cur.execute(query, params)
+        rows = cur.fetchall()
+
+    return build_page(rows, page_size, cursor, direction, key=lambda row: (row.date_time, row.id))
+
+
+def future_appointment_exists(db: Database, appointment_id: int) -> bool:
+    """
+    Проверка существования предстоящей записи по id.
+    """
+    # проверка перед отменой: запись могла быть только что создана другим регистратором
+    with db.cursor(mode=READ_PRIMARY) as cursor:
+        cursor.execute(FUTURE_APPOINTMENT_EXISTS_QUERY, (appointment_id,))
+        return cursor.fetchone() is not None
+
+
+def get_future_appointment_time(db: Database, appointment_id: int) -> Optional[datetime]:
+    """
+    Время приема предстоящей записи по id (None — такой предстоящей записи нет).
+    Передается в delete_appointment, чтобы отмена читала одну секцию appointments.
+    """
+    # проверка перед отменой: запись могла быть только что создана другим регистратором
+    with db.cursor(mode=READ_PRIMARY) as cursor:
+        cursor.execute(FUTURE_APPOINTMENT_TIME_QUERY, (appointment_id,))
+        row = cursor.fetchone()
+        return row[0] if row is not None else None
+
+
+def delete_appointment(db: Database, appointment_id: int, date_time: Optional[datetime] = None) -> bool:
     """
     Отмена записи на прием по id.
     Возвращает True, если запись была удалена.
-    """
-    conn = db.get_connection()
 
-    query = """
-        DELETE FROM appointments
-        WHERE id = %s
+    date_time — время приема, если оно известно (например, из списка записей): тогда удаление читает
+    только секцию этого месяца, а запись с тем же id и другим временем не найдется. Без него
+    проверяется индекс первичного ключа каждой секции appointments, включая архивные месяцы.
     """
+    query, params = delete_appointment_query(appointment_id, date_time)
 
-    with conn.cursor() as cursor:
-        cursor.execute(query, (appointment_id,))
-        deleted = cursor.rowcount # получаем количество удаленных записей
+    with db.cursor() as cursor:
+        cursor.execute(query, params)
+        row = cursor.fetchone() # None, если записи с таким id не было
 
-    conn.commit()
+        if row is not None:
+            db.emit("appointments", "delete", {
+                "id": appointment_id,
+                "patient_id": row[0],
+                "doctor_id": row[1],
+                "date_time": row[2],
+                "end_time": row[3]
+            })
 
     # если запись была удалена, возвращаем True
-    return deleted > 0
\ No newline at end of file
+    return row is not None
\ No newline at end of file
@@ -0,0 +1,389 @@
+"""
+Асинхронные версии функций appointment_service (для AsyncDatabase).
+Запросы, коды отказов, исключения и возвращаемые значения совпадают с синхронными функциями.
+"""
+from datetime import datetime, date, time, timedelta
+
+from typing import Iterable, Optional
+
+import psycopg
+
+from db.async_database import AsyncDatabase
+from db.models import AppointmentRow, Doctor
+from services.appointment_service import (
+    APPOINTMENT_DURATION,
+    BATCH_CHECK_QUERY,
+    BATCH_INSERT_QUERY,
+    BOOK_APPOINTMENT,
+    BOOKED,
+    BOOKING_HORIZON_DAYS,
+    BUSY_INTERVALS,
+    FUTURE_APPOINTMENT_TIME_QUERY,
+    DOCTOR_BUSY,
+    DOCTOR_EXISTS,
+    DOCTOR_NOT_FOUND,
+    DOCTORS_QUERY,
+    EARLIEST_SLOTS_QUERY,
+    FUTURE_APPOINTMENT_EXISTS_QUERY,
+    FUTURE_APPOINTMENTS_QUERY,
+    OUTSIDE_SCHEDULE,
+    PATIENT_EXISTS,
+    SLOT_STEP,
+    BookingResult,
+    Interval,
+    _filter_free_slots,
+    _overlaps,
+    apply_batch_checks,
+    apply_batch_inserted,
+    availability_by_day,
+    batch_check_params,
+    batch_insert_params,
+    batch_results,
+    booked_event,
+    booking_error,
+    check_interval,
+    delete_appointment_query,
+    earliest_slots_params,
+    future_appointments_page_query,
+    violation_status,
+)
+from services.pagination import PAGE_SIZE, NEXT, Page, build_page
+from services.reference_cache import reference_cache
+from services.schedule_service import (
+    DEFAULT_TEMPLATE,
+    EXCEPTIONS_QUERY,
+    SCHEDULES_KEY,
+    SCHEDULES_QUERY,
+    SlotTemplate,
+    compile_templates,
+)
+
+
+async def get_doctors(db: AsyncDatabase) -> dict[int, str]:
+    """
+    Асинхронная версия appointment_service.get_doctors (тот же кэш справочников процесса).
+    """
+    doctors = reference_cache.lookup("doctors")
+    if doctors is not None:
+        return doctors
+
+    async with db.cursor() as cursor:
+        await cursor.execute(DOCTORS_QUERY)
+        doctors = dict(await cursor.fetchall())
+
+    reference_cache.store("doctors", doctors)
+    return doctors
+
+
+async def get_slot_templates(db: AsyncDatabase) -> dict[int, SlotTemplate]:
+    """
+    Асинхронная версия schedule_service.get_slot_templates (тот же кэш справочников процесса).
+    """
+    templates = reference_cache.lookup(SCHEDULES_KEY)
+    if templates is not None:
+        return templates
+
+    async with db.cursor() as cursor:
+        await cursor.execute(SCHEDULES_QUERY)
+        schedule_rows = await cursor.fetchall()
+        await cursor.execute(EXCEPTIONS_QUERY)
+        exception_rows = await cursor.fetchall()
+
+    templates = compile_templates(schedule_rows, exception_rows)
+    reference_cache.store(SCHEDULES_KEY, templates)
+    return templates
+
+
+async def get_slot_template(db: AsyncDatabase, doctor_id: int) -> SlotTemplate:
+    """
+    Асинхронная версия schedule_service.get_slot_template.
+    """
+    return (await get_slot_templates(db)).get(doctor_id, DEFAULT_TEMPLATE)
+
+
+async def get_all_doctors(db: AsyncDatabase) -> list[Doctor]:
+    """
+    Асинхронная версия appointment_service.get_all_doctors.
+    """
+    return [Doctor(doctor_id, full_name) for doctor_id, full_name in (await get_doctors(db)).items()]
+
+
+async def doctor_exists(db: AsyncDatabase, doctor_id: int) -> bool:
+    """
+    Асинхронная версия appointment_service.doctor_exists.
+    """
+    if doctor_id in await get_doctors(db):
+        return True
+
+    async with db.cursor() as cursor:
+        await db.execute_prepared(cursor, DOCTOR_EXISTS, (doctor_id,))
+        found = (await cursor.fetchone()) is not None
+
+    if found:
+        reference_cache.invalidate("doctors")
+    return found
+
+
+async def patient_exists(db: AsyncDatabase, patient_id: int) -> bool:
+    """
+    Асинхронная версия appointment_service.patient_exists.
+    """
+    async with db.cursor() as cursor:
+        await db.execute_prepared(cursor, PATIENT_EXISTS, (patient_id,))
+        # запись о пациенте is not None = True (пациент существует)
+        return (await cursor.fetchone()) is not None
+
+
+async def get_busy_intervals(db: AsyncDatabase, doctor_id: int, start: datetime, end: datetime) -> list[Interval]:
+    """
+    Асинхронная версия appointment_service.get_busy_intervals.
+    """
+    async with db.cursor() as cursor:
+        await db.execute_prepared(cursor, BUSY_INTERVALS, (doctor_id, start, end))
+        return await cursor.fetchall()
+
+
+async def get_busy_slots(db: AsyncDatabase, doctor_id: int, day: date) -> set[datetime]:
+    """
+    Асинхронная версия appointment_service.get_busy_slots.
+    """
+    day_start = datetime.combine(day, time.min)
+    busy = await get_busy_intervals(db, doctor_id, day_start, day_start + timedelta(days=1))
+
+    template = await get_slot_template(db, doctor_id)
+
+    return {
+        slot
+        for slot in template.slots(day, SLOT_STEP)
+        if _overlaps(slot, slot + SLOT_STEP, busy)
+    }
+
+
+async def get_available_slots_for_day(
+    db: AsyncDatabase,
+    doctor_id: int,
+    day: date,
+    duration: timedelta = APPOINTMENT_DURATION
+) -> list[datetime]:
+    """
+    Асинхронная версия appointment_service.get_available_slots_for_day.
+    """
+    day_start = datetime.combine(day, time.min)
+    busy = await get_busy_intervals(db, doctor_id, day_start, day_start + timedelta(days=1))
+
+    slots = (await get_slot_template(db, doctor_id)).slots(day, duration)
+
+    return _filter_free_slots(slots, busy, datetime.now(), duration)
+
+
+async def get_availability_range(
+    db: AsyncDatabase,
+    doctor_id: int,
+    start_day: date,
+    days: int = BOOKING_HORIZON_DAYS,
+    duration: timedelta = APPOINTMENT_DURATION
+) -> dict[date, list[datetime]]:
+    """
+    Асинхронная версия appointment_service.get_availability_range.
+    """
+    range_start = datetime.combine(start_day, time.min)
+    busy = await get_busy_intervals(db, doctor_id, range_start, range_start + timedelta(days=days))
+
+    return availability_by_day(await get_slot_template(db, doctor_id), busy, start_day, days, duration)
+
+
+async def find_earliest_slots(
+    db: AsyncDatabase,
+    after: Optional[datetime] = None,
+    limit: int = 10,
+    doctor_ids: Optional[Iterable[int]] = None,
+    duration: timedelta = APPOINTMENT_DURATION,
+    days: int = BOOKING_HORIZON_DAYS
+) -> list[tuple[int, datetime]]:
+    """
+    Асинхронная версия appointment_service.find_earliest_slots.
+    """
+    now = datetime.now()
+    after = max(after, now) if after is not None else now
+
+    if doctor_ids is None:
+        doctor_ids = await get_doctors(db)
+
+    params = earliest_slots_params(after, limit, doctor_ids, duration, days)
+    if not params["doctor_ids"] or days <= 0:
+        return []
+
+    async with db.cursor() as cursor:
+        await cursor.execute(EARLIEST_SLOTS_QUERY, params)
+        return await cursor.fetchall()
+
+
+async def is_doctor_available(
+    db: AsyncDatabase,
+    doctor_id: int,
+    appointment_datetime: datetime,
+    duration: timedelta = APPOINTMENT_DURATION
+) -> bool:
+    """
+    Асинхронная версия appointment_service.is_doctor_available.
+    """
+    new_start = appointment_datetime
+    new_end = appointment_datetime + duration
+
+    async with db.cursor() as cursor:
+        await db.execute_prepared(cursor, DOCTOR_BUSY, (doctor_id, new_start, new_end))
+        # если ничего не вернулось, None is None = True (доктор свободен)
+        return (await cursor.fetchone()) is None
+
+
+async def create_appointment(
+    db: AsyncDatabase,
+    patient_id: int,
+    doctor_id: int,
+    appointment_datetime: datetime,
+    duration: timedelta = APPOINTMENT_DURATION
+) -> int:
+    """
+    Асинхронная версия appointment_service.create_appointment.
+    """
+    check_interval(appointment_datetime, duration)
+
+    # известного врача проверяем по кэшу справочника, без лишнего запроса к БД
+    if not await doctor_exists(db, doctor_id):
+        raise booking_error(DOCTOR_NOT_FOUND)
+
+    start = appointment_datetime
+    end = appointment_datetime + duration
+
+    if not (await get_slot_template(db, doctor_id)).covers(start, end):
+        raise booking_error(OUTSIDE_SCHEDULE)
+
+    async with db.connection():
+        try:
+            async with db.cursor() as cursor:
+                await db.execute_prepared(cursor, BOOK_APPOINTMENT, (patient_id, doctor_id, start, end))
+                status, appointment_id = await cursor.fetchone()
+        except psycopg.IntegrityError as e:
+            status = violation_status(e.sqlstate, e.diag.constraint_name)
+            if status is None:
+                raise
+            raise booking_error(status) from e
+
+        if status != BOOKED:
+            raise booking_error(status)
+
+        # подписчики (например, матрица доступности) узнают о записи после commit
+        db.emit("appointments", "insert", {
+            "id": appointment_id,
+            "patient_id": patient_id,
+            "doctor_id": doctor_id,
+            "date_time": appointment_datetime,
+            "end_time": appointment_datetime + duration
+        })
+
+    return appointment_id
+
+
+async def create_appointments_batch(
+    db: AsyncDatabase,
+    requests: Iterable[tuple]
+) -> list[BookingResult]:
+    """
+    Асинхронная версия appointment_service.create_appointments_batch.
+    """
+    results = batch_results(requests)
+    if not any(result.ok for result in results):
+        return results
+
+    async with db.connection():
+        async with db.cursor() as cursor:
+            await cursor.execute(BATCH_CHECK_QUERY, batch_check_params(results))
+            rows = await cursor.fetchall()
+
+        to_insert = apply_batch_checks(results, rows, await get_slot_templates(db))
+        if not to_insert:
+            return results
+
+        try:
+            async with db.cursor() as cursor:
+                await cursor.execute(BATCH_INSERT_QUERY, batch_insert_params(to_insert))
+                inserted = await cursor.fetchall()
+        except psycopg.IntegrityError as e:
+            status = violation_status(e.sqlstate, e.diag.constraint_name)
+            if status is None:
+                raise
+            raise booking_error(status) from e
+
+        for result in apply_batch_inserted(to_insert, inserted):
+            db.emit("appointments", "insert", booked_event(result))
+
+    return results
+
+
+async def get_future_appointments(db: AsyncDatabase) -> list[AppointmentRow]:
+    """
+    Асинхронная версия appointment_service.get_future_appointments.
+    """
+    async with db.cursor(row_factory=AppointmentRow) as cursor:
+        await cursor.execute(FUTURE_APPOINTMENTS_QUERY)
+        return await cursor.fetchall()
+
+
+async def get_future_appointments_page(
+    db: AsyncDatabase,
+    page_size: int = PAGE_SIZE,
+    cursor: Optional[tuple[datetime, int]] = None,
+    direction: str = NEXT
+) -> Page:
+    """
+    Асинхронная версия appointment_service.get_future_appointments_page.
+    """
+    query, params = future_appointments_page_query(page_size, cursor, direction)
+
+    async with db.cursor(row_factory=AppointmentRow) as cur:
+        await cur.execute(query, params)
+        rows = await cur.fetchall()
+
+    return build_page(rows, page_size, cursor, direction, key=lambda row: (row.date_time, row.id))
+
+
+async def future_appointment_exists(db: AsyncDatabase, appointment_id: int) -> bool:
+    """
+    Асинхронная версия appointment_service.future_appointment_exists.
+    """
+    async with db.cursor() as cursor:
+        await cursor.execute(FUTURE_APPOINTMENT_EXISTS_QUERY, (appointment_id,))
+        return (await cursor.fetchone()) is not None
+
+
+async def get_future_appointment_time(db: AsyncDatabase, appointment_id: int) -> Optional[datetime]:
+    """
+    Асинхронная версия appointment_service.get_future_appointment_time.
+    """
+    async with db.cursor() as cursor:
+        await cursor.execute(FUTURE_APPOINTMENT_TIME_QUERY, (appointment_id,))
+        row = await cursor.fetchone()
+        return row[0] if row is not None else None
+
+
+async def delete_appointment(db: AsyncDatabase, appointment_id: int, date_time: Optional[datetime] = None) -> bool:
+    """
+    Асинхронная версия appointment_service.delete_appointment.
+    """
+    query, params = delete_appointment_query(appointment_id, date_time)
+
+    async with db.cursor() as cursor:
+        await cursor.execute(query, params)
+        row = await cursor.fetchone() # None, если записи с таким id не было
+
+        if row is not None:
+            db.emit("appointments", "delete", {
+                "id": appointment_id,
+                "patient_id": row[0],
+                "doctor_id": row[1],
+                "date_time": row[2],
+                "end_time": row[3]
+            })
+
+    # если запись была удалена, возвращаем True
+    return row is not None
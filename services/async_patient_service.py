@@ -0,0 +1,203 @@
+"""
+Асинхронные версии функций patient_service (для AsyncDatabase).
+Запросы и возвращаемые значения совпадают с синхронными функциями.
+"""
+from typing import Iterable, Optional, Sequence
+
+from db.async_database import AsyncDatabase
+from db.models import Owner, Patient, PatientRow, VisitRow
+from services.pagination import PAGE_SIZE, NEXT, Page, build_page
+from services.patient_service import (
+    CREATE_OWNER_QUERY,
+    CREATE_PATIENT_QUERY,
+    IMPORT_COPY_QUERY,
+    IMPORT_FILE_CONFLICTS_QUERY,
+    IMPORT_OWNER_CONFLICTS_QUERY,
+    IMPORT_OWNERS_QUERY,
+    IMPORT_PATIENTS_QUERY,
+    IMPORT_STAGING_QUERY,
+    MEDICAL_CARD_QUERY,
+    OWNER_BY_PHONE,
+    PATIENT_APPOINTMENTS_QUERY,
+    PATIENT_CARD_INFO_QUERY,
+    PATIENTS_QUERY,
+    SEARCH_PATIENTS_QUERY,
+    ImportResult,
+    MedicalCard,
+    _staging_lines,
+    medical_card_from_row,
+    patients_page_query,
+    reject_file_conflicts,
+    reject_owner_conflicts,
+    search_patients_params,
+)
+
+
+async def get_owner_by_phone(db: AsyncDatabase, phone: str) -> Optional[Owner]:
+    """
+    Асинхронная версия patient_service.get_owner_by_phone.
+    """
+    async with db.cursor(row_factory=Owner) as cursor:
+        await db.execute_prepared(cursor, OWNER_BY_PHONE, (phone,))
+        return await cursor.fetchone()
+
+
+async def create_owner(db: AsyncDatabase, owner: Owner) -> Owner:
+    """
+    Асинхронная версия patient_service.create_owner.
+    """
+    async with db.cursor() as cursor:
+        await cursor.execute(CREATE_OWNER_QUERY, (owner.full_name, owner.phone))
+        owner_id = (await cursor.fetchone())[0]
+
+    owner.id = owner_id # присваиваем объекту id, назначенный базой данных
+    return owner
+
+
+async def create_patient(db: AsyncDatabase, patient: Patient) -> Patient:
+    """
+    Асинхронная версия patient_service.create_patient.
+    """
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            CREATE_PATIENT_QUERY,
+            (patient.owner_id, patient.name, patient.species)
+        )
+        patient_id = (await cursor.fetchone())[0]
+
+    patient.id = patient_id
+    return patient
+
+
+async def register_patient(
+    db: AsyncDatabase,
+    owner_full_name: str,
+    owner_phone: str,
+    patient_name: str,
+    species: str
+) -> Patient:
+    """
+    Асинхронная версия patient_service.register_patient.
+    """
+    # все шаги выполняются на одном соединении и фиксируются одной транзакцией
+    async with db.connection():
+        owner = await get_owner_by_phone(db, owner_phone)
+
+        if owner is None:
+            owner = Owner(
+                id=None,
+                full_name=owner_full_name,
+                phone=owner_phone
+            )
+            owner = await create_owner(db, owner)
+
+        patient = Patient(
+            id=None,
+            owner_id=owner.id,
+            name=patient_name,
+            species=species
+        )
+
+        patient = await create_patient(db, patient)
+
+    return patient
+
+
+async def get_all_patients(db: AsyncDatabase) -> list[PatientRow]:
+    """
+    Асинхронная версия patient_service.get_all_patients.
+    """
+    async with db.cursor(row_factory=PatientRow) as cursor:
+        await cursor.execute(PATIENTS_QUERY)
+        return await cursor.fetchall()
+
+
+async def get_patients_page(
+    db: AsyncDatabase,
+    page_size: int = PAGE_SIZE,
+    cursor: Optional[int] = None,
+    direction: str = NEXT
+) -> Page:
+    """
+    Асинхронная версия patient_service.get_patients_page.
+    """
+    query, params = patients_page_query(page_size, cursor, direction)
+
+    async with db.cursor(row_factory=PatientRow) as cur:
+        await cur.execute(query, params)
+        rows = await cur.fetchall()
+
+    return build_page(rows, page_size, cursor, direction, key=lambda row: row.id)
+
+
+async def search_patients(db: AsyncDatabase, query: str, limit: int = 10) -> list[PatientRow]:
+    """
+    Асинхронная версия patient_service.search_patients.
+    """
+    query = query.strip()
+    if not query:
+        return []
+
+    async with db.cursor(row_factory=PatientRow) as cursor:
+        await cursor.execute(SEARCH_PATIENTS_QUERY, search_patients_params(query, limit))
+        return await cursor.fetchall()
+
+
+async def get_patient_card_info(db: AsyncDatabase, patient_id: int) -> Optional[PatientRow]:
+    """
+    Асинхронная версия patient_service.get_patient_card_info.
+    """
+    async with db.cursor(row_factory=PatientRow) as cursor:
+        await cursor.execute(PATIENT_CARD_INFO_QUERY, (patient_id,))
+        return await cursor.fetchone()
+
+
+async def get_patient_appointments(db: AsyncDatabase, patient_id: int) -> list[VisitRow]:
+    """
+    Асинхронная версия patient_service.get_patient_appointments.
+    """
+    async with db.cursor(row_factory=VisitRow) as cursor:
+        await cursor.execute(PATIENT_APPOINTMENTS_QUERY, (patient_id,))
+        return await cursor.fetchall()
+
+
+async def get_medical_card(db: AsyncDatabase, patient_id: int) -> Optional[MedicalCard]:
+    """
+    Асинхронная версия patient_service.get_medical_card.
+    """
+    async with db.cursor() as cursor:
+        await cursor.execute(MEDICAL_CARD_QUERY, (patient_id,))
+        return medical_card_from_row(await cursor.fetchone())
+
+
+async def bulk_register_patients(db: AsyncDatabase, rows: Iterable[Sequence[str]]) -> ImportResult:
+    """
+    Асинхронная версия patient_service.bulk_register_patients.
+    """
+    result = ImportResult()
+
+    async with db.connection():
+        async with db.cursor() as cursor:
+            await cursor.execute(IMPORT_STAGING_QUERY)
+
+            async with cursor.copy(IMPORT_COPY_QUERY) as copy:
+                for line in _staging_lines(rows, result):
+                    await copy.write(line)
+
+            await cursor.execute(IMPORT_OWNER_CONFLICTS_QUERY)
+            reject_owner_conflicts(result, await cursor.fetchall())
+
+            await cursor.execute(IMPORT_FILE_CONFLICTS_QUERY)
+            reject_file_conflicts(result, await cursor.fetchall())
+
+            await cursor.execute(IMPORT_OWNERS_QUERY)
+            result.owners_created = cursor.rowcount
+
+            await cursor.execute(IMPORT_OWNER_CONFLICTS_QUERY)
+            reject_owner_conflicts(result, await cursor.fetchall())
+
+            await cursor.execute(IMPORT_PATIENTS_QUERY)
+            result.imported = cursor.rowcount
+
+    result.rejects.sort()
+    return result
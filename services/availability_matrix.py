@@ -0,0 +1,328 @@
+import threading
+from array import array
+from datetime import datetime, date, time, timedelta
+from typing import Any, Optional
+
+from db.database import READ_PRIMARY, Database
+from db.events import RESYNC
+from services.appointment_service import APPOINTMENT_DURATION, BOOKING_HORIZON_DAYS, use_availability_matrix
+from services.schedule_service import DEFAULT_TEMPLATE, SLOT_STEP, SlotTemplate, get_slot_templates
+
+
+class AvailabilityMatrix:
+    """
+    Матрица занятости врачей в памяти: врачи × дни × слоты.
+
+    Каждая пара (врач, день) хранится одним 64-битным числом в array('Q'),
+    i-й бит которого означает, что i-й 30-минутный слот суток занят.
+    Прием любой длительности занимает все слоты, с которыми пересекается.
+    Вторая такая же матрица отмечает слоты вне расписания врача (шаблоны schedule_service:
+    выходные, отпуска, часы вне смен) — они тоже не свободны.
+    Матрица загружается из БД одним запросом, а после attach(db) обновляется по событиям
+    создания и отмены записей (RESYNC — перезагружается целиком) и изменения расписаний.
+
+    Примечания:
+    - покрывает дни [start_day, start_day + days), для других дней выбрасывается KeyError;
+    - врачи, добавленные после загрузки, появятся только после повторного load();
+    - сетка идет от полуночи с шагом SLOT_STEP: слот, лишь частично попадающий в смену,
+      считается нерабочим (для смен, выровненных по сетке, слоты совпадают с шаблоном).
+    """
+
+    def __init__(self, start_day: Optional[date] = None, days: int = BOOKING_HORIZON_DAYS):
+        self.start_day = start_day or date.today()
+        self.days = days
+
+        # сетка слотов суток (шаг SLOT_STEP): смещения от полуночи
+        self._slot_offsets = [SLOT_STEP * i for i in range(timedelta(days=1) // SLOT_STEP)]
+        self._slots_per_day = len(self._slot_offsets)
+
+        if self._slots_per_day > 64:
+            raise ValueError("В дне не может быть больше 64 слотов.")
+
+        self._full_mask = (1 << self._slots_per_day) - 1
+        self._doctor_rows: dict[int, int] = {} # id врача -> номер строки матрицы
+        self._doctor_ids: list[int] = []
+        self._bits = array("Q")
+        self._closed = array("Q") # слоты вне расписания врача, та же раскладка, что у _bits
+        self._lock = threading.Lock()
+        self._db: Optional[Database] = None # откуда перезагружаться по RESYNC
+
+    # ЗАГРУЗКА
+
+    def _read(self, db: Database, start_day: date) -> tuple[dict[int, int], list[int], array]:
+        """Строит матрицу окна, начинающегося с start_day, по данным БД (один запрос: врачи + их записи в окне)"""
+        range_start = datetime.combine(start_day, time.min)
+        range_end = range_start + timedelta(days=self.days)
+
+        # окно выровнено по суткам, а прием не переходит через полночь: все записи, пересекающиеся
+        # с окном, начинаются внутри него — условие по date_time читает только секции окна
+        query = """
+            SELECT d.id, a.date_time, a.end_time
+            FROM doctors d
+            LEFT JOIN appointments a
+              ON a.doctor_id = d.id
+             AND a.date_time >= %s
+             AND a.date_time < %s
+            ORDER BY d.id
+        """
+
+        # дальше матрица живет событиями основного сервера, поэтому и снимок берется с него
+        with db.cursor(mode=READ_PRIMARY) as cursor:
+            cursor.execute(query, (range_start, range_end))
+            rows = cursor.fetchall()
+
+        doctor_rows: dict[int, int] = {}
+        doctor_ids: list[int] = []
+
+        for doctor_id, _, _ in rows:
+            if doctor_id not in doctor_rows:
+                doctor_rows[doctor_id] = len(doctor_ids)
+                doctor_ids.append(doctor_id)
+
+        bits = array("Q", bytes(8 * len(doctor_ids) * self.days))
+
+        for doctor_id, date_time, end_time in rows:
+            if date_time is None:
+                continue # у врача нет записей в окне
+            for index, mask in self._masks_for(date_time, end_time, start_day):
+                bits[doctor_rows[doctor_id] * self.days + index] |= mask
+
+        return doctor_rows, doctor_ids, bits
+
+    def _open_mask(self, template: SlotTemplate, day: date) -> int:
+        """Маска слотов сетки, целиком лежащих в рабочих интервалах врача в день day"""
+        mask = 0
+        for shift_start, shift_end in template.shifts(day):
+            for i, slot_offset in enumerate(self._slot_offsets):
+                if shift_start <= slot_offset and slot_offset + SLOT_STEP <= shift_end:
+                    mask |= 1 << i
+        return mask
+
+    def _schedule_masks(self, doctor_ids: list[int], templates: dict[int, SlotTemplate], start_day: date) -> array:
+        """Строит матрицу нерабочих слотов окна, начинающегося с start_day, по шаблонам расписания"""
+        closed = array("Q", bytes(8 * len(doctor_ids) * self.days))
+
+        for row, doctor_id in enumerate(doctor_ids):
+            template = templates.get(doctor_id, DEFAULT_TEMPLATE)
+            for index in range(self.days):
+                day = start_day + timedelta(days=index)
+                closed[row * self.days + index] = ~self._open_mask(template, day) & self._full_mask
+
+        return closed
+
+    def load(self, db: Database, start_day: Optional[date] = None) -> None:
+        """
+        Загружает (или перезагружает) матрицу из БД.
+        start_day сдвигает окно матрицы (например, на сегодня, когда прошли сутки).
+        """
+        start_day = start_day or self.start_day
+        doctor_rows, doctor_ids, bits = self._read(db, start_day)
+        closed = self._schedule_masks(doctor_ids, get_slot_templates(db), start_day)
+
+        with self._lock:
+            self.start_day = start_day
+            self._doctor_rows = doctor_rows
+            self._doctor_ids = doctor_ids
+            self._bits = bits
+            self._closed = closed
+
+    def reload_schedules(self, db: Database) -> None:
+        """Перестраивает нерабочие слоты по текущим шаблонам расписания (занятость не трогается)"""
+        templates = get_slot_templates(db)
+
+        with self._lock:
+            self._closed = self._schedule_masks(self._doctor_ids, templates, self.start_day)
+
+    def attach(self, db: Database) -> None:
+        """Подписывает матрицу на создание и отмену записей и на изменения расписаний"""
+        self._db = db
+        db.subscribe("appointments", self._on_change)
+        db.subscribe("doctor_schedules", self._on_schedule_change)
+        db.subscribe("schedule_exceptions", self._on_schedule_change)
+
+    def detach(self, db: Database) -> None:
+        """Отписывает матрицу от изменений"""
+        db.unsubscribe("appointments", self._on_change)
+        db.unsubscribe("doctor_schedules", self._on_schedule_change)
+        db.unsubscribe("schedule_exceptions", self._on_schedule_change)
+        self._db = None
+
+    def _on_schedule_change(self, op: str, row: dict[str, Any]) -> None:
+        """Обработчик событий таблиц расписаний (шаблоны к этому моменту уже сброшены в кэше)"""
+        if self._db is not None:
+            self.reload_schedules(self._db)
+
+    def _on_change(self, op: str, row: dict[str, Any]) -> None:
+        """Обработчик событий таблицы appointments"""
+        if op == "insert":
+            self.mark_busy(row["doctor_id"], row["date_time"], row["end_time"])
+        elif op == "delete":
+            self.mark_free(row["doctor_id"], row["date_time"], row["end_time"])
+        elif op == RESYNC and self._db is not None:
+            self.load(self._db)
+
+    # ИНКРЕМЕНТАЛЬНЫЕ ОБНОВЛЕНИЯ
+
+    def _masks_for(self, start: datetime, end: datetime, start_day: Optional[date] = None) -> list[tuple[int, int]]:
+        """
+        Переводит интервал [start, end) в пары (индекс дня, битовая маска пересекаемых слотов)
+        относительно окна, начинающегося с start_day (по умолчанию — текущего окна матрицы).
+        Части интервала вне окна матрицы пропускаются (рабочее время проверяется по матрице расписаний).
+        """
+        start_day = start_day or self.start_day
+        masks = []
+        day = start.date()
+
+        while day <= end.date():
+            day_index = (day - start_day).days
+            midnight = datetime.combine(day, time.min)
+            start_offset = start - midnight
+            end_offset = end - midnight
+
+            mask = 0
+            if 0 <= day_index < self.days:
+                for i, slot_offset in enumerate(self._slot_offsets):
+                    # слот пересекается с приемом
+                    if slot_offset < end_offset and slot_offset + SLOT_STEP > start_offset:
+                        mask |= 1 << i
+
+            if mask:
+                masks.append((day_index, mask))
+            day += timedelta(days=1)
+
+        return masks
+
+    def mark_busy(self, doctor_id: int, start: datetime, end: Optional[datetime] = None) -> None:
+        """Отмечает слоты приема как занятые (по умолчанию прием стандартной длительности)"""
+        end = end or start + APPOINTMENT_DURATION
+        with self._lock:
+            row = self._doctor_rows.get(doctor_id)
+            if row is None:
+                return
+            for index, mask in self._masks_for(start, end):
+                self._bits[row * self.days + index] |= mask
+
+    def mark_free(self, doctor_id: int, start: datetime, end: Optional[datetime] = None) -> None:
+        """
+        Отмечает слоты приема как свободные.
+        Слот, частично занятый другим приемом, тоже освободится — в таком случае поможет load().
+        """
+        end = end or start + APPOINTMENT_DURATION
+        with self._lock:
+            row = self._doctor_rows.get(doctor_id)
+            if row is None:
+                return
+            for index, mask in self._masks_for(start, end):
+                self._bits[row * self.days + index] &= ~mask & self._full_mask
+
+    # ЗАПРОСЫ
+
+    def _cell(self, doctor_id: int, day: date) -> int:
+        """Возвращает битовую маску недоступных слотов врача на день: занятые и вне расписания"""
+        day_index = (day - self.start_day).days
+        if not (0 <= day_index < self.days):
+            raise KeyError(f"День {day} вне окна матрицы доступности")
+        cell = self._doctor_rows[doctor_id] * self.days + day_index
+        return self._bits[cell] | self._closed[cell]
+
+    def covers(self, day: date) -> bool:
+        """Попадает ли день в окно матрицы"""
+        return 0 <= (day - self.start_day).days < self.days
+
+    def has_doctor(self, doctor_id: int) -> bool:
+        """Есть ли врач в матрице (врачи, добавленные после загрузки, появятся после load())"""
+        return doctor_id in self._doctor_rows
+
+    def _window(self, duration: timedelta) -> tuple[int, int]:
+        """Маска из подряд идущих слотов, покрывающих прием длительностью duration, и их количество"""
+        count = -(-duration // SLOT_STEP) # деление с округлением вверх
+        return (1 << count) - 1, count
+
+    def free_slots(
+        self,
+        doctor_id: int,
+        day: date,
+        duration: timedelta = APPOINTMENT_DURATION,
+        now: Optional[datetime] = None
+    ) -> list[datetime]:
+        """
+        Свободные начала приема заданной длительности у врача на день.
+        Для сегодняшнего дня прошедшие слоты не возвращаются (как в get_available_slots_for_day).
+        """
+        busy = self._cell(doctor_id, day)
+        window, count = self._window(duration)
+        now = now or datetime.now()
+        midnight = datetime.combine(day, time.min)
+
+        free = []
+        for i in range(self._slots_per_day - count + 1):
+            if busy & (window << i):
+                continue
+            slot = midnight + self._slot_offsets[i]
+            if day == now.date() and slot <= now:
+                continue
+            free.append(slot)
+
+        return free
+
+    def is_free(self, doctor_id: int, moment: datetime, duration: timedelta = APPOINTMENT_DURATION) -> bool:
+        """Свободен ли врач в интервале [moment, moment + duration)"""
+        masks = self._masks_for(moment, moment + duration)
+        if not masks:
+            return False # вне окна матрицы
+        return all(
+            self._cell(doctor_id, self.start_day + timedelta(days=index)) & mask == 0
+            for index, mask in masks
+        )
+
+    def doctors_free_at(self, moment: datetime, duration: timedelta = APPOINTMENT_DURATION) -> list[int]:
+        """Все врачи, свободные в интервале [moment, moment + duration)"""
+        masks = self._masks_for(moment, moment + duration)
+        if not masks:
+            return []
+
+        bits = self._bits
+        closed = self._closed
+        return [
+            doctor_id
+            for row, doctor_id in enumerate(self._doctor_ids)
+            if all((bits[row * self.days + index] | closed[row * self.days + index]) & mask == 0 for index, mask in masks)
+        ]
+
+    # ПРОВЕРКА
+
+    def verify(self, db: Database) -> list[tuple[int, date, int, int]]:
+        """
+        Сверяет матрицу с БД.
+        Возвращает расхождения в виде (id врача, день, маска в памяти, маска в БД); пустой список — все совпадает.
+        """
+        doctor_rows, doctor_ids, bits = self._read(db, self.start_day)
+        mismatches = []
+
+        with self._lock:
+            for doctor_id in set(doctor_ids) | set(self._doctor_ids):
+                for day_index in range(self.days):
+                    in_memory = 0
+                    in_db = 0
+                    if doctor_id in self._doctor_rows:
+                        in_memory = self._bits[self._doctor_rows[doctor_id] * self.days + day_index]
+                    if doctor_id in doctor_rows:
+                        in_db = bits[doctor_rows[doctor_id] * self.days + day_index]
+                    if in_memory != in_db:
+                        day = self.start_day + timedelta(days=day_index)
+                        mismatches.append((doctor_id, day, in_memory, in_db))
+
+        return sorted(mismatches)
+
+
+def enable_availability_matrix(db: Database) -> AvailabilityMatrix:
+    """
+    Создает матрицу доступности процесса: загружает ее из БД, подписывает на изменения db
+    и подключает к get_available_slots_for_day / get_availability_range.
+    Для долгоживущих процессов с запущенным слушателем изменений (см. main.enable_change_feed).
+    """
+    matrix = AvailabilityMatrix()
+    matrix.load(db)
+    matrix.attach(db)
+    use_availability_matrix(matrix)
+    return matrix
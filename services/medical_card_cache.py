@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from db.database import Database
+from services.patient_service import MedicalCard, get_medical_card
+
+
+MEDICAL_CARD_CACHE_SIZE = 256 # сколько медкарт держать в памяти
+
+
+class MedicalCardCache:
+    """
+    LRU-кэш медкарт пациентов со сквозным чтением (read-through).
+
+    При промахе карта загружается get_medical_card и запоминается; при переполнении
+    вытесняется карта, которую дольше всех не открывали. Кэш подписывается на события
+    таблиц appointments, patients и owners и сбрасывает карту пациента, как только меняются
+    его записи или данные (изменение владельца сбрасывает все карты).
+
+    Примечания:
+    - подписка на события оформляется при первом обращении с данным db (или явно через attach);
+    - изменения, сделанные в обход сервисов процесса, кэш видит, только если запущен
+      слушатель изменений (db.start_listener()), иначе поможет invalidate();
+    - возвращаемые карты общие для всех вызывающих, изменять их нельзя.
+    """
+
+    def __init__(self, max_entries: int = MEDICAL_CARD_CACHE_SIZE):
+        if max_entries < 1:
+            raise ValueError("Размер кэша медкарт должен быть положительным.")
+
+        self.max_entries = max_entries
+        self._cards: OrderedDict[int, MedicalCard] = OrderedDict() # id пациента -> медкарта
+        self._attached: list[Database] = []
+        self._version = 0 # растет при каждой инвалидации
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, db: Database, patient_id: int) -> Optional[MedicalCard]:
+        """Возвращает медкарту пациента из кэша или из БД (None — пациента нет)"""
+        self.attach(db)
+
+        with self._lock:
+            card = self._cards.get(patient_id)
+            if card is not None:
+                self._cards.move_to_end(patient_id)
+                self.hits += 1
+                return card
+
+            self.misses += 1
+            version = self._version
+
+        card = get_medical_card(db, patient_id)
+        if card is None:
+            return None
+
+        with self._lock:
+            # пока карта читалась, записи могли измениться — такую карту не запоминаем
+            if version == self._version:
+                self._cards[patient_id] = card
+                self._cards.move_to_end(patient_id)
+
+                while len(self._cards) > self.max_entries:
+                    self._cards.popitem(last=False)
+                    self.evictions += 1
+
+        return card
+
+    def invalidate(self, patient_id: Optional[int] = None) -> None:
+        """Сбрасывает медкарту пациента (или все медкарты, если пациент не указан)"""
+        with self._lock:
+            self._version += 1
+            if patient_id is None:
+                self._cards.clear()
+            else:
+                self._cards.pop(patient_id, None)
+
+    def attach(self, db: Database) -> None:
+        """Подписывает кэш на создание и отмену записей (повторный вызов ничего не делает)"""
+        with self._lock:
+            if any(attached is db for attached in self._attached):
+                return
+            self._attached.append(db)
+
+        db.subscribe("appointments", self._on_change)
+        db.subscribe("patients", self._on_patient_change)
+        db.subscribe("owners", self._on_owner_change)
+
+    def detach(self, db: Database) -> None:
+        """Отписывает кэш от изменений"""
+        with self._lock:
+            self._attached = [attached for attached in self._attached if attached is not db]
+
+        db.unsubscribe("appointments", self._on_change)
+        db.unsubscribe("patients", self._on_patient_change)
+        db.unsubscribe("owners", self._on_owner_change)
+
+    def _on_change(self, op: str, row: dict[str, Any]) -> None:
+        """Обработчик событий таблицы appointments (RESYNC без пациента сбрасывает все карты)"""
+        self.invalidate(row.get("patient_id"))
+
+    def _on_patient_change(self, op: str, row: dict[str, Any]) -> None:
+        """Обработчик событий таблицы patients"""
+        self.invalidate(row.get("id"))
+
+    def _on_owner_change(self, op: str, row: dict[str, Any]) -> None:
+        """Обработчик событий таблицы owners: карты по владельцу не проиндексированы, сбрасываются все"""
+        self.invalidate()
+
+    def stats(self) -> dict[str, int]:
+        """Счетчики кэша: попадания, промахи, вытеснения и текущее число карт"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._cards),
+            }
+
+
+# общий кэш медкарт процесса
+medical_card_cache = MedicalCardCache()
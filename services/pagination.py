@@ -0,0 +1,75 @@
+from typing import Any, Callable, Optional
+
+
+PAGE_SIZE = 20 # размер страницы по умолчанию
+
+NEXT = "next" # листать вперед (после курсора)
+PREV = "prev" # листать назад (до курсора)
+
+
+class Page:
+    """
+    Страница результатов keyset-пагинации.
+
+    Курсор — ключ сортировки граничной строки страницы:
+    next_cursor нужно передать, чтобы получить следующую страницу,
+    prev_cursor — чтобы получить предыдущую.
+    """
+
+    def __init__(
+            self,
+            rows: list,
+            has_next: bool,
+            has_prev: bool,
+            next_cursor: Optional[Any],
+            prev_cursor: Optional[Any]
+    ):
+        self.rows = rows
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return f"Page(rows={len(self.rows)}, has_next={self.has_next}, has_prev={self.has_prev})"
+
+
+def check_direction(direction: str) -> None:
+    """Проверяет направление пагинации"""
+    if direction not in (NEXT, PREV):
+        raise ValueError(f"Неизвестное направление пагинации: {direction}")
+
+
+def build_page(
+    rows: list,
+    page_size: int,
+    cursor: Optional[Any],
+    direction: str,
+    key: Callable[[Any], Any]
+) -> Page:
+    """
+    Собирает Page из строк, выбранных запросом с LIMIT page_size + 1.
+
+    Для direction=PREV строки ожидаются в обратном порядке сортировки (ORDER BY ... DESC)
+    и разворачиваются здесь. Лишняя (page_size + 1)-я строка лишь сообщает, что дальше есть данные.
+    """
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if direction == PREV:
+        rows.reverse()
+        has_next = cursor is not None
+        has_prev = has_more
+    else:
+        has_next = has_more
+        has_prev = cursor is not None
+
+    return Page(
+        rows=rows,
+        has_next=has_next,
+        has_prev=has_prev,
+        next_cursor=key(rows[-1]) if rows else None,
+        prev_cursor=key(rows[0]) if rows else None
+    )
@@ -0,0 +1,120 @@
+from datetime import date, datetime
+from typing import Optional
+
+from db.database import Database
+
+
+PARTITION_MONTHS_AHEAD = 3 # на сколько месяцев вперед держать готовые секции appointments
+ARCHIVE_AFTER_MONTHS = 12 # секции старше стольких месяцев переносятся в архив
+
+PARTITION_PREFIX = "appointments_" # секции называются appointments_ГГГГ_ММ
+
+
+def month_start(day: date) -> date:
+    """Первое число месяца"""
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    """Первое число месяца, отстоящего от day на months месяцев (months может быть отрицательным)"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Месяц секции по ее имени; None, если имя не по схеме appointments_ГГГГ_ММ"""
+    try:
+        return datetime.strptime(name, f"{PARTITION_PREFIX}%Y_%m").date()
+    except ValueError:
+        return None
+
+
+def get_partitions(db: Database, table: str = "appointments") -> list[tuple[str, date]]:
+    """Секции таблицы (appointments или appointments_archive): (имя, месяц) по возрастанию месяца"""
+    query = """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """
+
+    with db.cursor() as cursor:
+        cursor.execute(query, (table,))
+        names = [name for name, in cursor.fetchall()]
+
+    partitions = [(name, partition_month(name)) for name in names]
+    return sorted((p for p in partitions if p[1] is not None), key=lambda p: p[1])
+
+
+def ensure_partitions(db: Database, start: date, end: date) -> list[str]:
+    """
+    Создает недостающие секции appointments на все месяцы от start до end включительно
+    (функция create_appointments_partition из schema.sql). Возвращает имена созданных секций.
+    Месяцы, чьи секции уже перенесены в архив, не пересоздаются.
+    """
+    query = """
+        SELECT create_appointments_partition(month::date)
+        FROM generate_series(date_trunc('month', %s::date), %s::date, interval '1 month') AS month
+    """
+
+    with db.cursor() as cursor:
+        cursor.execute(query, (start, end))
+        return [name for name, in cursor.fetchall() if name is not None]
+
+
+def archive_partitions(db: Database, before: date, detach_only: bool = False) -> list[str]:
+    """
+    Убирает из appointments секции месяцев, закончившихся до before.
+
+    По умолчанию секция переносится в appointments_archive: строки не копируются,
+    меняются только метаданные, и история (представление appointment_history) остается полной.
+    С detach_only=True секция остается отдельной таблицей вне истории — ее можно выгрузить
+    (pg_dump -t) и удалить.
+
+    Примечания:
+    - каждая секция переносится в своей транзакции;
+    - DETACH PARTITION ненадолго блокирует appointments целиком, запускать лучше в тихие часы.
+    Возвращает имена перенесенных секций.
+    """
+    moved = []
+
+    for name, month in get_partitions(db):
+        if add_months(month, 1) > month_start(before):
+            break
+
+        with db.connection():
+            with db.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE appointments DETACH PARTITION "{name}"')
+                if not detach_only:
+                    cursor.execute(
+                        f'ALTER TABLE appointments_archive ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+                        (month, add_months(month, 1))
+                    )
+
+        moved.append(name)
+
+    return moved
+
+
+def maintain_partitions(
+    db: Database,
+    today: Optional[date] = None,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    archive_after_months: Optional[int] = ARCHIVE_AFTER_MONTHS,
+    detach_only: bool = False
+) -> tuple[list[str], list[str]]:
+    """
+    Обслуживание секций appointments (запускать регулярно, например раз в сутки):
+    - создает секции на текущий месяц и months_ahead месяцев вперед;
+    - переносит в архив секции старше archive_after_months месяцев (None — не переносить).
+    Возвращает (созданные секции, перенесенные секции).
+    """
+    today = today or date.today()
+
+    created = ensure_partitions(db, month_start(today), add_months(today, months_ahead))
+
+    archived = []
+    if archive_after_months is not None:
+        archived = archive_partitions(db, add_months(today, -archive_after_months), detach_only)
+
+    return created, archived
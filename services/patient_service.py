@@ -1,51 +1,98 @@
-from typing import Optional
+import csv
+import io
+import re
+from typing import Iterable, Iterator, Optional, Sequence
 from datetime import datetime
 
-from db.database import Database
-from db.models import Owner, Patient
+from db.database import READ, READ_PRIMARY, Database
+from db.prepared import PreparedStatement
+from db.models import Owner, Patient, PatientRow, VisitRow
+from services.pagination import PAGE_SIZE, NEXT, Page, build_page, check_direction
 
 
-def get_owner_by_phone(db: Database, phone: str) -> Optional[Owner]:
-    """
-    Ищет владельца по номеру телефона.
-    Возвращает Owner или None, если хозяин не найден.
-    """
-    conn = db.get_connection() 
+# шаблон для проверки номера телефона владельца
+PHONE_PATTERN = re.compile(r"^\+7\d{10}$")
+
+# длины полей импорта — как у колонок owners и patients (schema.sql)
+IMPORT_FIELD_LIMITS = (
+    ("ФИО владельца", 255),
+    ("телефон", 50),
+    ("кличка", 100),
+    ("вид", 100),
+)
 
-    query = """
+# подготовленные запросы горячего пути (см. db/prepared.py)
+OWNER_BY_PHONE = PreparedStatement(
+    "owner_by_phone",
+    """
         SELECT id, full_name, phone
         FROM owners
-        WHERE phone = %s
-    """
-
-    with conn.cursor() as cursor:
-        cursor.execute(query, (phone,))
-        row = cursor.fetchone()
+        WHERE phone = $1
+    """,
+    ("varchar",)
+)
+
+
+CREATE_OWNER_QUERY = """
+    INSERT INTO owners (full_name, phone)
+    VALUES (%s, %s)
+    RETURNING id
+"""
+
+CREATE_PATIENT_QUERY = """
+    INSERT INTO patients (owner_id, name, species)
+    VALUES (%s, %s, %s)
+    RETURNING id
+"""
+
+# строки PatientRow; {where}, {order} и {limit} подставляет patients_page_query
+PATIENTS_PAGE_QUERY = """
+    SELECT
+        p.id,
+        p.name,
+        p.species,
+        o.full_name,
+        o.phone
+    FROM patients p
+    JOIN owners o ON p.owner_id = o.id
+    {where}
+    ORDER BY {order}
+    {limit}
+"""
+
+PATIENTS_QUERY = PATIENTS_PAGE_QUERY.format(where="", order="p.id", limit="")
+
+PATIENT_CARD_INFO_QUERY = PATIENTS_PAGE_QUERY.format(where="WHERE p.id = %s", order="p.id", limit="")
+
+PATIENT_APPOINTMENTS_QUERY = """
+    SELECT
+        a.id,
+        d.full_name,
+        a.date_time
+    FROM appointment_history a
+    JOIN doctors d ON a.doctor_id = d.id
+    WHERE a.patient_id = %s
+    ORDER BY a.date_time
+"""
 
-    if row is None:
-        return None
 
-    return Owner(
-        id=row[0],
-        full_name=row[1],
-        phone=row[2]
-    )
+def get_owner_by_phone(db: Database, phone: str) -> Optional[Owner]:
+    """
+    Ищет владельца по номеру телефона.
+    Возвращает Owner или None, если хозяин не найден.
+    """
+    # по результату решается, создавать ли владельца, — нужны свежие данные
+    with db.cursor(row_factory=Owner, mode=READ_PRIMARY) as cursor:
+        db.execute_prepared(cursor, OWNER_BY_PHONE, (phone,))
+        return cursor.fetchone()
 
 
 def create_owner(db: Database, owner: Owner) -> Owner:
     """
     Создает нового владельца в БД и возвращает его с id.
     """
-    conn = db.get_connection()
-
-    query = """
-        INSERT INTO owners (full_name, phone)
-        VALUES (%s, %s)
-        RETURNING id
-    """
-
-    with conn.cursor() as cursor:
-        cursor.execute(query, (owner.full_name, owner.phone))
+    with db.cursor() as cursor:
+        cursor.execute(CREATE_OWNER_QUERY, (owner.full_name, owner.phone))
         owner_id = cursor.fetchone()[0]
 
     owner.id = owner_id # присваиваем объекту id, назначенный базой данных
@@ -56,17 +103,9 @@ def create_patient(db: Database, patient: Patient) -> Patient:
     """
     Создает нового пациента в БД и возвращает его с id.
     """
-    conn = db.get_connection()
-
-    query = """
-        INSERT INTO patients (owner_id, name, species)
-        VALUES (%s, %s, %s)
-        RETURNING id
-    """
-
-    with conn.cursor() as cursor:
+    with db.cursor() as cursor:
         cursor.execute(
-            query,
+            CREATE_PATIENT_QUERY,
             (patient.owner_id, patient.name, patient.species)
         )
         patient_id = cursor.fetchone()[0]
@@ -86,9 +125,8 @@ def register_patient(
     Регистрирует нового пациента.
     Если владелец уже существует — используется он, иначе создается новый.
     """
-    conn = db.get_connection()
-
-    try:
+    # все шаги выполняются на одном соединении и фиксируются одной транзакцией
+    with db.connection():
         owner = get_owner_by_phone(db, owner_phone)
 
         if owner is None:
@@ -108,81 +146,440 @@ def register_patient(
 
         patient = create_patient(db, patient)
 
-        conn.commit()
-        return patient
-
-    except Exception:
-        conn.rollback()
-        raise
+    return patient
 
 
-def get_all_patients(db: Database) -> list[tuple[int, str, str, str, str]]:
+def get_all_patients(db: Database) -> list[PatientRow]:
     """
     Возвращает список всех пациентов с данными о владельцах.
     """
-    conn = db.get_connection()
+    with db.cursor(row_factory=PatientRow, mode=READ) as cursor:
+        cursor.execute(PATIENTS_QUERY)
+        return cursor.fetchall()
 
-    query = """
-        SELECT
-            p.id,
-            p.name,
-            p.species,
-            o.full_name,
-            o.phone
-        FROM patients p
-        JOIN owners o ON p.owner_id = o.id
-        ORDER BY p.id
-    """
 
-    with conn.cursor() as cursor:
-        cursor.execute(query)
-        rows = cursor.fetchall()
+def patients_page_query(page_size: int, cursor: Optional[int], direction: str) -> tuple[str, tuple]:
+    """Запрос и параметры одной страницы списка пациентов (см. get_patients_page)"""
+    check_direction(direction)
+
+    if direction == NEXT:
+        condition, order = "p.id > %s", "p.id"
+    else:
+        condition, order = "p.id < %s", "p.id DESC"
+
+    where = f"WHERE {condition}" if cursor is not None else ""
+    query = PATIENTS_PAGE_QUERY.format(where=where, order=order, limit="LIMIT %s")
 
-    return rows
+    params = (cursor, page_size + 1) if cursor is not None else (page_size + 1,)
+    return query, params
 
 
-def get_patient_card_info(db: Database, patient_id: int) -> Optional[tuple[int, str, str, str, str]]:
+def get_patients_page(
+    db: Database,
+    page_size: int = PAGE_SIZE,
+    cursor: Optional[int] = None,
+    direction: str = NEXT
+) -> Page:
     """
-    Возвращает информацию для шапки медкарты пациента
+    Возвращает одну страницу списка пациентов (keyset-пагинация по id).
+
+    Аргументы:
+        page_size: количество пациентов на странице
+        cursor: id граничного пациента (Page.next_cursor / Page.prev_cursor),
+                None — первая страница (для NEXT) или последняя (для PREV)
+        direction: NEXT — пациенты после курсора, PREV — до курсора
     """
-    conn = db.get_connection()
+    query, params = patients_page_query(page_size, cursor, direction)
+
+    with db.cursor(row_factory=PatientRow, mode=READ) as cur:
+        cur.execute(query, params)
+        rows = cur.fetchall()
+
+    return build_page(rows, page_size, cursor, direction, key=lambda row: row.id)
 
-    query = """
-        SELECT
-            p.id,
-            p.name,
-            p.species,
-            o.full_name,
-            o.phone
-        FROM patients p
-        JOIN owners o ON p.owner_id = o.id
-        WHERE p.id = %s
+
+# поиск пациентов (см. search_patients); параметры — search_patients_params
+SEARCH_PATIENTS_QUERY = """
+    WITH matches AS (
+        (
+            SELECT p.id, p.name <-> %(q)s AS distance
+            FROM patients p
+            WHERE p.name ILIKE %(contains)s
+            ORDER BY p.name <-> %(q)s
+            LIMIT %(limit)s
+        )
+        UNION ALL
+        (
+            SELECT p.id, o.distance
+            FROM (
+                SELECT id, full_name <-> %(q)s AS distance
+                FROM owners
+                WHERE full_name ILIKE %(contains)s
+                ORDER BY full_name <-> %(q)s
+                LIMIT %(limit)s
+            ) o
+            JOIN patients p ON p.owner_id = o.id
+        )
+        UNION ALL
+        (
+            SELECT p.id, 0::real AS distance
+            FROM (
+                SELECT id
+                FROM owners
+                WHERE phone LIKE %(prefix)s
+                ORDER BY phone
+                LIMIT %(limit)s
+            ) o
+            JOIN patients p ON p.owner_id = o.id
+        )
+    ),
+    best AS (
+        SELECT id, MIN(distance) AS distance
+        FROM matches
+        GROUP BY id
+    )
+    SELECT
+        p.id,
+        p.name,
+        p.species,
+        o.full_name,
+        o.phone
+    FROM best b
+    JOIN patients p ON p.id = b.id
+    JOIN owners o ON p.owner_id = o.id
+    ORDER BY b.distance, p.id
+    LIMIT %(limit)s
+"""
+
+
+def _escape_like(value: str) -> str:
+    """Экранирует спецсимволы шаблона LIKE"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_patients_params(query: str, limit: int) -> dict[str, object]:
+    """Параметры SEARCH_PATIENTS_QUERY для непустой строки поиска (уже без пробелов по краям)"""
+    escaped = _escape_like(query)
+
+    return {
+        "q": query,
+        "contains": f"%{escaped}%",
+        "prefix": f"{escaped}%",
+        "limit": limit
+    }
+
+
+def search_patients(db: Database, query: str, limit: int = 10) -> list[PatientRow]:
     """
+    Поиск пациентов по кличке, ФИО владельца или началу номера телефона.
+    Возвращает не больше limit самых похожих пациентов (строки как в get_all_patients).
 
-    with conn.cursor() as cursor:
-        cursor.execute(query, (patient_id,))
+    Примечания:
+    - кличка и ФИО ищутся по подстроке без учета регистра (триграммные GiST-индексы);
+    - телефон ищется по префиксу (индекс с varchar_pattern_ops);
+    - каждая ветка поиска сама ограничена limit, поэтому стоимость не растет с числом пациентов.
+    """
+    query = query.strip()
+    if not query:
+        return []
+
+    with db.cursor(row_factory=PatientRow, mode=READ) as cursor:
+        cursor.execute(SEARCH_PATIENTS_QUERY, search_patients_params(query, limit))
+        return cursor.fetchall()
+
+
+def get_patient_card_info(db: Database, patient_id: int) -> Optional[PatientRow]:
+    """
+    Возвращает информацию для шапки медкарты пациента
+    """
+    with db.cursor(row_factory=PatientRow, mode=READ) as cursor:
+        cursor.execute(PATIENT_CARD_INFO_QUERY, (patient_id,))
         return cursor.fetchone()
 
 
-def get_patient_appointments(db: Database, patient_id: int) -> list[tuple[int, str, datetime]]:
+def get_patient_appointments(db: Database, patient_id: int) -> list[VisitRow]:
     """
     Возвращает список всех записей клиента (прошедших и будущих).
     Используется в медкарте.
     """
-    conn = db.get_connection()
+    with db.cursor(row_factory=VisitRow, mode=READ) as cursor:
+        cursor.execute(PATIENT_APPOINTMENTS_QUERY, (patient_id,))
+        return cursor.fetchall()
+
+
+class MedicalCard:
+    """Медицинская карта пациента: шапка и история записей к врачу"""
+
+    __slots__ = ("patient_id", "name", "species", "owner_full_name", "owner_phone", "appointments")
+
+    def __init__(
+            self,
+            patient_id: int,
+            name: str,
+            species: str,
+            owner_full_name: str,
+            owner_phone: str,
+            appointments: list[VisitRow]
+    ):
+        """
+        Аргументы:
+            patient_id, name, species: данные пациента
+            owner_full_name, owner_phone: данные владельца
+            appointments: записи к врачу по возрастанию даты
+        """
+        self.patient_id = patient_id
+        self.name = name
+        self.species = species
+        self.owner_full_name = owner_full_name
+        self.owner_phone = owner_phone
+        self.appointments = appointments
+
+
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return f"MedicalCard(patient_id={self.patient_id}, name='{self.name}', appointments={len(self.appointments)})"
+
+
+# шапка медкарты и вся история записей одним запросом: история собирается в JSON-массив
+MEDICAL_CARD_QUERY = """
+    SELECT
+        p.id,
+        p.name,
+        p.species,
+        o.full_name,
+        o.phone,
+        COALESCE(
+            (
+                SELECT json_agg(
+                    json_build_array(a.id, d.full_name, a.date_time)
+                    ORDER BY a.date_time, a.id
+                )
+                FROM appointment_history a
+                JOIN doctors d ON a.doctor_id = d.id
+                WHERE a.patient_id = p.id
+            ),
+            '[]'::json
+        )
+    FROM patients p
+    JOIN owners o ON p.owner_id = o.id
+    WHERE p.id = %s
+"""
+
+
+def medical_card_from_row(row: Optional[tuple]) -> Optional[MedicalCard]:
+    """Собирает MedicalCard из строки MEDICAL_CARD_QUERY (драйвер уже разобрал JSON в списки)"""
+    if row is None:
+        return None
+
+    pid, name, species, owner_full_name, owner_phone, history = row
+
+    return MedicalCard(
+        patient_id=pid,
+        name=name,
+        species=species,
+        owner_full_name=owner_full_name,
+        owner_phone=owner_phone,
+        # в JSON дата и время приходят строкой ISO 8601
+        appointments=[
+            VisitRow(aid, doctor_full_name, datetime.fromisoformat(date_time))
+            for aid, doctor_full_name, date_time in history
+        ]
+    )
+
 
-    query = """
-        SELECT
-            a.id,
-            d.full_name,
-            a.date_time
-        FROM appointments a
-        JOIN doctors d ON a.doctor_id = d.id
-        WHERE a.patient_id = %s
-        ORDER BY a.date_time
+def get_medical_card(db: Database, patient_id: int) -> Optional[MedicalCard]:
+    """
+    Возвращает медкарту пациента (шапка + все записи) одним запросом
+    или None, если пациента с таким id нет.
     """
+    # карта попадает в общий кэш медкарт — читаем с основного сервера
+    with db.cursor(mode=READ_PRIMARY) as cursor:
+        cursor.execute(MEDICAL_CARD_QUERY, (patient_id,))
+        return medical_card_from_row(cursor.fetchone())
 
-    with conn.cursor() as cursor:
-        cursor.execute(query, (patient_id,))
-        return cursor.fetchall()
 
+class ImportResult:
+    """Итог массового импорта пациентов"""
+
+    def __init__(self):
+        self.imported = 0 # сколько пациентов добавлено
+        self.owners_created = 0 # сколько новых владельцев создано
+        self.rejects: list[tuple[int, str]] = [] # (номер строки, причина)
+
+
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return f"ImportResult(imported={self.imported}, owners_created={self.owners_created}, rejects={len(self.rejects)})"
+
+
+class _CopyStream:
+    """
+    Файлоподобный объект для COPY FROM STDIN: отдает строки CSV по мере чтения,
+    не накапливая весь файл в памяти.
+    """
+
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+
+        if size < 0:
+            data, self._buffer = self._buffer, ""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _staging_lines(rows: Iterable[Sequence[str]], result: ImportResult) -> Iterator[str]:
+    """
+    Проверяет строки импорта и превращает корректные в строки CSV для staging-таблицы.
+    Некорректные строки попадают в result.rejects.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    for line_no, row in enumerate(rows, start=1):
+        if len(row) != 4:
+            result.rejects.append((line_no, "ожидается 4 поля: ФИО владельца, телефон, кличка, вид"))
+            continue
+
+        owner_full_name, owner_phone, patient_name, species = (value.strip() for value in row)
+
+        if not (owner_full_name and owner_phone and patient_name and species):
+            result.rejects.append((line_no, "пустое поле"))
+            continue
+
+        if not PHONE_PATTERN.match(owner_phone):
+            result.rejects.append((line_no, f"телефон {owner_phone} не в формате +7XXXXXXXXXX"))
+            continue
+
+        # слишком длинное значение сорвало бы весь COPY ошибкой DataError
+        too_long = [
+            f"{field} длиннее {limit} символов"
+            for (field, limit), value in zip(IMPORT_FIELD_LIMITS, (owner_full_name, owner_phone, patient_name, species))
+            if len(value) > limit
+        ]
+        if too_long:
+            result.rejects.append((line_no, ", ".join(too_long)))
+            continue
+
+        writer.writerow((line_no, owner_full_name, owner_phone, patient_name, species))
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        yield line
+
+
+def reject_owner_conflicts(result: ImportResult, rows: Iterable[tuple]) -> None:
+    """Отклоняет строки, телефон которых уже принадлежит владельцу с другим ФИО (строки (номер, ФИО))"""
+    for line_no, existing_name in rows:
+        result.rejects.append((line_no, f"телефон уже принадлежит владельцу {existing_name}"))
+
+
+def reject_file_conflicts(result: ImportResult, rows: Iterable[tuple]) -> None:
+    """Отклоняет строки, телефон которых выше в файле указан с другим ФИО (строки (номер, ФИО))"""
+    for line_no, first_name in rows:
+        result.rejects.append((line_no, f"телефон выше в файле указан для владельца {first_name}"))
+
+
+# запросы массового импорта (общие для синхронной и асинхронной версий)
+IMPORT_STAGING_QUERY = """
+    CREATE TEMP TABLE import_staging (
+        line_no INTEGER NOT NULL,
+        owner_full_name VARCHAR(255) NOT NULL,
+        owner_phone VARCHAR(50) NOT NULL,
+        patient_name VARCHAR(100) NOT NULL,
+        species VARCHAR(100) NOT NULL
+    ) ON COMMIT DROP
+"""
+
+IMPORT_COPY_QUERY = "COPY import_staging FROM STDIN WITH (FORMAT csv)"
+
+# телефон уже принадлежит владельцу с другим ФИО. Выполняется дважды: до вставки владельцев
+# и после нее — ON CONFLICT DO NOTHING молча пропускает владельца, которого с тем же телефоном,
+# но другим ФИО успела сохранить параллельная транзакция, и его строки иначе ушли бы чужому владельцу
+IMPORT_OWNER_CONFLICTS_QUERY = """
+    DELETE FROM import_staging s
+    USING owners o
+    WHERE o.phone = s.owner_phone
+      AND o.full_name <> s.owner_full_name
+    RETURNING s.line_no, o.full_name
+"""
+
+# в самом файле один телефон указан с разными ФИО — побеждает первая строка
+IMPORT_FILE_CONFLICTS_QUERY = """
+    DELETE FROM import_staging s
+    USING (
+        SELECT DISTINCT ON (owner_phone) owner_phone, owner_full_name
+        FROM import_staging
+        ORDER BY owner_phone, line_no
+    ) f
+    WHERE f.owner_phone = s.owner_phone
+      AND f.owner_full_name <> s.owner_full_name
+    RETURNING s.line_no, f.owner_full_name
+"""
+
+IMPORT_OWNERS_QUERY = """
+    INSERT INTO owners (full_name, phone)
+    SELECT DISTINCT owner_full_name, owner_phone
+    FROM import_staging
+    ON CONFLICT (phone) DO NOTHING
+"""
+
+IMPORT_PATIENTS_QUERY = """
+    INSERT INTO patients (owner_id, name, species)
+    SELECT o.id, s.patient_name, s.species
+    FROM import_staging s
+    JOIN owners o ON o.phone = s.owner_phone
+    ORDER BY s.line_no
+"""
+
+
+def bulk_register_patients(db: Database, rows: Iterable[Sequence[str]]) -> ImportResult:
+    """
+    Массовая регистрация пациентов (например, при переносе базы клиники-партнера).
+    Каждая строка: (ФИО владельца, телефон, кличка, вид); строки нумеруются с 1.
+
+    Примечания:
+    - строки потоком загружаются через COPY во временную staging-таблицу;
+    - владельцы объединяются по телефону, пациенты вставляются одним INSERT ... SELECT;
+    - все выполняется в одной транзакции;
+    - отклоняются строки с некорректным телефоном, пустыми или слишком длинными полями, а также строки,
+      в которых ФИО не совпадает с уже сохраненным (или первым в файле) владельцем с этим телефоном,
+      в том числе сохраненным параллельным импортом или регистрацией во время загрузки.
+    """
+    result = ImportResult()
+
+    with db.connection():
+        with db.cursor() as cursor:
+            cursor.execute(IMPORT_STAGING_QUERY, name="patient_service.bulk_register_patients:staging")
+
+            cursor.copy_expert(
+                IMPORT_COPY_QUERY,
+                _CopyStream(_staging_lines(rows, result)),
+                name="patient_service.bulk_register_patients:copy"
+            )
+
+            cursor.execute(IMPORT_OWNER_CONFLICTS_QUERY, name="patient_service.bulk_register_patients:owner_conflicts")
+            reject_owner_conflicts(result, cursor.fetchall())
+
+            cursor.execute(IMPORT_FILE_CONFLICTS_QUERY, name="patient_service.bulk_register_patients:file_conflicts")
+            reject_file_conflicts(result, cursor.fetchall())
+
+            cursor.execute(IMPORT_OWNERS_QUERY, name="patient_service.bulk_register_patients:owners")
+            result.owners_created = cursor.rowcount
+
+            cursor.execute(IMPORT_OWNER_CONFLICTS_QUERY, name="patient_service.bulk_register_patients:concurrent_owners")
+            reject_owner_conflicts(result, cursor.fetchall())
+
+            cursor.execute(IMPORT_PATIENTS_QUERY, name="patient_service.bulk_register_patients:patients")
+            result.imported = cursor.rowcount
+
+    result.rejects.sort()
+    return result
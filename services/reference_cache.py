@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from db.events import ChangeNotifier
+
+
+REFERENCE_TTL = 300.0 # сколько секунд справочник считается свежим
+REFERENCE_MAX_ENTRIES = 64 # сколько справочников держать в памяти одновременно
+
+
+class ReferenceCache:
+    """
+    Кэш справочных данных процесса (врачи и другие небольшие, редко меняющиеся таблицы).
+
+    Каждая запись — результат загрузки справочника целиком, ключ — имя справочника
+    (обычно имя таблицы) или кортеж (имя таблицы, ...), если по таблице кэшируется несколько выборок.
+
+    Примечания:
+    - запись живет не дольше ttl секунд, после этого следующее обращение загружает ее заново;
+    - в памяти не больше max_entries записей, при переполнении вытесняется давно не использованная;
+    - invalidate(table) сбрасывает все записи таблицы; attach(db, table) делает это
+      автоматически по событиям изменения таблицы (см. ChangeNotifier);
+    - кэш не привязан к конкретному Database: в процессе предполагается одна база.
+    """
+
+    def __init__(
+        self,
+        ttl: float = REFERENCE_TTL,
+        max_entries: int = REFERENCE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if ttl <= 0 or max_entries < 1:
+            raise ValueError("Некорректные параметры кэша справочников.")
+
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict() # ключ -> (значение, срок годности)
+        self._listeners: dict[tuple[str, Hashable], Callable[[str, dict[str, Any]], None]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _table(key: Hashable) -> Hashable:
+        """Таблица, к которой относится ключ"""
+        return key[0] if isinstance(key, tuple) else key
+
+    def lookup(self, key: Hashable) -> Optional[Any]:
+        """Возвращает свежее значение из кэша или None (промах)"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[1] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            if entry is not None:
+                del self._entries[key] # устарело
+            self.misses += 1
+            return None
+
+    def store(self, key: Hashable, value: Any) -> None:
+        """Кладет значение в кэш на ttl секунд"""
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Возвращает значение из кэша, при промахе загружает его через loader() и запоминает.
+        Загрузка идет без блокировки: при одновременных промахах справочник может загрузиться дважды.
+        """
+        value = self.lookup(key)
+        if value is None:
+            value = loader()
+            self.store(key, value)
+        return value
+
+    def invalidate(self, table: Optional[Hashable] = None) -> None:
+        """Сбрасывает записи таблицы (или весь кэш, если таблица не указана)"""
+        with self._lock:
+            if table is None:
+                self._entries.clear()
+                return
+
+            for key in [key for key in self._entries if self._table(key) == table]:
+                del self._entries[key]
+
+    def _invalidator(self, table: str, key: Optional[Hashable] = None) -> Callable[[str, dict[str, Any]], None]:
+        """Обработчик событий, сбрасывающий записи key (один и тот же для attach и detach)"""
+        key = table if key is None else key
+        with self._lock:
+            listener = self._listeners.get((table, key))
+            if listener is None:
+                listener = self._listeners[(table, key)] = lambda op, row: self.invalidate(key)
+            return listener
+
+    def attach(self, db: ChangeNotifier, table: str, key: Optional[Hashable] = None) -> None:
+        """
+        Сбрасывает записи при каждом изменении таблицы через сервисы.
+        key — какие записи сбрасывать, если справочник собран из нескольких таблиц (по умолчанию — сама таблица).
+        """
+        db.subscribe(table, self._invalidator(table, key))
+
+    def detach(self, db: ChangeNotifier, table: str, key: Optional[Hashable] = None) -> None:
+        """Отписывает кэш от изменений таблицы"""
+        db.unsubscribe(table, self._invalidator(table, key))
+
+    def stats(self) -> dict[str, int]:
+        """Счетчики кэша: попадания, промахи, вытеснения и текущее число записей"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
+
+    def reset_stats(self) -> None:
+        """Обнуляет счетчики"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+# общий кэш справочников процесса
+reference_cache = ReferenceCache()
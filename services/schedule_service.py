@@ -0,0 +1,310 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from db.database import READ_PRIMARY, Database
+from services.reference_cache import reference_cache
+
+
+# КОНСТАНТЫ
+WORK_START = time(9, 0) # начало рабочего дня по умолчанию (для врачей без расписания)
+WORK_END = time(17, 0) # конец рабочего дня по умолчанию (прием должен закончиться не позже)
+SLOT_STEP = timedelta(minutes=30) # шаг сетки слотов - 30 минут
+
+SCHEDULES_KEY = "doctor_schedules" # ключ скомпилированных расписаний в кэше справочников
+
+# рабочий интервал дня: [начало, конец) как смещения от полуночи
+Shift = tuple[timedelta, timedelta]
+
+
+def _offset(value: time) -> timedelta:
+    """Смещение времени от полуночи"""
+    return timedelta(hours=value.hour, minutes=value.minute, seconds=value.second)
+
+
+def _merge(shifts: Iterable[Shift]) -> tuple[Shift, ...]:
+    """Объединяет пересекающиеся и смежные интервалы, результат — по возрастанию"""
+    merged: list[Shift] = []
+    for start, end in sorted(shifts):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+def _subtract(shifts: tuple[Shift, ...], cut: Shift) -> tuple[Shift, ...]:
+    """Вырезает интервал cut из рабочих интервалов"""
+    cut_start, cut_end = cut
+    result = []
+    for start, end in shifts:
+        if end <= cut_start or start >= cut_end:
+            result.append((start, end))
+            continue
+        if start < cut_start:
+            result.append((start, cut_start))
+        if end > cut_end:
+            result.append((cut_end, end))
+    return tuple(result)
+
+
+@lru_cache(maxsize=256)
+def _slot_offsets(shifts: tuple[Shift, ...], duration: timedelta) -> tuple[timedelta, ...]:
+    """
+    Начала приемов длительности duration в рабочих интервалах (смещения от полуночи).
+    Слоты идут с шагом SLOT_STEP от начала каждого интервала, прием должен закончиться
+    до конца интервала. Наборов интервалов у врачей немного, поэтому результат запоминается.
+    """
+    offsets = []
+    for start, end in shifts:
+        current = start
+        while current + duration <= end:
+            offsets.append(current)
+            current += SLOT_STEP
+    return tuple(offsets)
+
+
+DEFAULT_SHIFTS = ((_offset(WORK_START), _offset(WORK_END)),)
+
+
+class SlotTemplate:
+    """
+    Скомпилированное расписание врача: рабочие интервалы по дням недели и переопределения
+    на конкретные даты (исключения: отпуск, больничный, дополнительная смена).
+
+    Слоты дня получаются сложением полуночи со смещениями начал приема, которые
+    вычисляются один раз на набор интервалов и длительность (_slot_offsets).
+    """
+
+    __slots__ = ("doctor_id", "weekly", "overrides")
+
+    def __init__(
+            self,
+            doctor_id: Optional[int],
+            weekly: tuple[tuple[Shift, ...], ...],
+            overrides: Optional[dict[date, tuple[Shift, ...]]] = None
+    ):
+        """
+        Аргументы:
+            doctor_id: id врача (None — общее расписание по умолчанию)
+            weekly: рабочие интервалы на каждый день недели (0 — понедельник ... 6 — воскресенье)
+            overrides: рабочие интервалы конкретных дат с учетом исключений
+        """
+        self.doctor_id = doctor_id
+        self.weekly = weekly
+        self.overrides = overrides or {}
+
+
+    def __repr__(self):
+        """Строковое представление (для отладки)"""
+        return f"SlotTemplate(doctor_id={self.doctor_id}, overrides={len(self.overrides)})"
+
+
+    def shifts(self, day: date) -> tuple[Shift, ...]:
+        """Рабочие интервалы врача в день day (пусто — выходной)"""
+        shifts = self.overrides.get(day)
+        return shifts if shifts is not None else self.weekly[day.weekday()]
+
+    def slots(self, day: date, duration: timedelta) -> list[datetime]:
+        """Все возможные начала приема длительности duration в день day по расписанию врача"""
+        midnight = datetime.combine(day, time.min)
+        return [midnight + offset for offset in _slot_offsets(self.shifts(day), duration)]
+
+    def work_minutes(self, day: date) -> int:
+        """Рабочие минуты врача в день day (емкость расписания)"""
+        return sum((end - start) // timedelta(minutes=1) for start, end in self.shifts(day))
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        """Лежит ли прием [start, end) целиком внутри одного рабочего интервала"""
+        midnight = datetime.combine(start.date(), time.min)
+        return any(
+            midnight + shift_start <= start and end <= midnight + shift_end
+            for shift_start, shift_end in self.shifts(start.date())
+        )
+
+
+# расписание врача без строк в doctor_schedules: WORK_START–WORK_END каждый день
+DEFAULT_TEMPLATE = SlotTemplate(None, (DEFAULT_SHIFTS,) * 7)
+
+SCHEDULES_QUERY = """
+    SELECT doctor_id, weekday, start_time, end_time
+    FROM doctor_schedules
+"""
+
+# исключения, закончившиеся до вчерашнего дня, на доступность уже не влияют
+EXCEPTIONS_QUERY = """
+    SELECT doctor_id, start_day, end_day, start_time, end_time, is_working
+    FROM schedule_exceptions
+    WHERE end_day >= CURRENT_DATE - 1
+    ORDER BY id
+"""
+
+# исключения, пересекающиеся с периодом (для отчетов за прошлые периоды)
+EXCEPTIONS_BETWEEN_QUERY = """
+    SELECT doctor_id, start_day, end_day, start_time, end_time, is_working
+    FROM schedule_exceptions
+    WHERE end_day >= %s AND start_day <= %s
+    ORDER BY id
+"""
+
+
+def compile_templates(schedule_rows: Iterable[tuple], exception_rows: Iterable[tuple]) -> dict[int, SlotTemplate]:
+    """
+    Компилирует строки doctor_schedules и schedule_exceptions в шаблоны слотов по врачам.
+
+    Примечания:
+    - врач без строк в doctor_schedules работает по расписанию по умолчанию (DEFAULT_TEMPLATE);
+    - день недели без строк — выходной;
+    - исключения раскладываются по датам: дополнительные смены добавляются к интервалам дня,
+      затем вырезаются нерабочие интервалы (без времени — весь день).
+    """
+    weekly: dict[int, list[list[Shift]]] = {}
+    for doctor_id, weekday, start_time, end_time in schedule_rows:
+        days = weekly.setdefault(doctor_id, [[] for _ in range(7)])
+        days[weekday - 1].append((_offset(start_time), _offset(end_time)))
+
+    templates = {
+        doctor_id: SlotTemplate(doctor_id, tuple(_merge(shifts) for shifts in days))
+        for doctor_id, days in weekly.items()
+    }
+
+    extra: dict[tuple[int, date], list[Shift]] = {}
+    off: dict[tuple[int, date], list[Shift]] = {}
+    for doctor_id, start_day, end_day, start_time, end_time, is_working in exception_rows:
+        shift = (
+            (_offset(start_time), _offset(end_time))
+            if start_time is not None
+            else (timedelta(0), timedelta(days=1))
+        )
+        target = extra if is_working else off
+
+        day = start_day
+        while day <= end_day:
+            target.setdefault((doctor_id, day), []).append(shift)
+            day += timedelta(days=1)
+
+    for doctor_id, day in extra.keys() | off.keys():
+        template = templates.get(doctor_id)
+        if template is None:
+            template = templates[doctor_id] = SlotTemplate(doctor_id, DEFAULT_TEMPLATE.weekly)
+
+        shifts = _merge(template.shifts(day) + tuple(extra.get((doctor_id, day), ())))
+        for cut in off.get((doctor_id, day), ()):
+            shifts = _subtract(shifts, cut)
+        template.overrides[day] = shifts
+
+    return templates
+
+
+def _load_templates(db: Database, exceptions_query: str = EXCEPTIONS_QUERY, params: tuple = ()) -> dict[int, SlotTemplate]:
+    """Загружает расписания и исключения из БД и компилирует их (два запроса)"""
+    # шаблоны кэшируются на весь процесс — читаем с основного сервера
+    with db.cursor(mode=READ_PRIMARY) as cursor:
+        cursor.execute(SCHEDULES_QUERY)
+        schedule_rows = cursor.fetchall()
+        cursor.execute(exceptions_query, params)
+        exception_rows = cursor.fetchall()
+
+    return compile_templates(schedule_rows, exception_rows)
+
+
+def load_templates_between(db: Database, start: date, end: date) -> dict[int, SlotTemplate]:
+    """
+    Шаблоны слотов с исключениями, пересекающимися с [start, end] (без кэша).
+    Нужны отчетам за прошлые периоды: кэшированные шаблоны знают только текущие исключения.
+    """
+    return _load_templates(db, EXCEPTIONS_BETWEEN_QUERY, (start, end))
+
+
+def get_slot_templates(db: Database) -> dict[int, SlotTemplate]:
+    """
+    Шаблоны слотов всех врачей с собственным расписанием (id врача -> SlotTemplate)
+    из кэша справочников процесса; компилируются не чаще раза в REFERENCE_TTL секунд
+    или после изменения расписаний через этот модуль. Возвращаемый словарь нельзя изменять.
+    """
+    return reference_cache.get(SCHEDULES_KEY, lambda: _load_templates(db))
+
+
+def get_slot_template(db: Database, doctor_id: int) -> SlotTemplate:
+    """Шаблон слотов врача (для врача без расписания — DEFAULT_TEMPLATE)"""
+    return get_slot_templates(db).get(doctor_id, DEFAULT_TEMPLATE)
+
+
+def set_weekly_schedule(db: Database, doctor_id: int, weekday: int, shifts: Iterable[tuple[time, time]]) -> None:
+    """
+    Заменяет рабочие интервалы врача в день недели weekday (1 — понедельник ... 7 — воскресенье).
+    Пустой shifts делает день выходным (если у врача есть другие строки расписания).
+    """
+    shifts = list(shifts)
+    if not 1 <= weekday <= 7:
+        raise ValueError("День недели должен быть от 1 до 7.")
+    if any(end <= start for start, end in shifts):
+        raise ValueError("Конец рабочего интервала должен быть позже начала.")
+
+    with db.connection():
+        with db.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM doctor_schedules WHERE doctor_id = %s AND weekday = %s",
+                (doctor_id, weekday)
+            )
+            for start, end in shifts:
+                cursor.execute(
+                    "INSERT INTO doctor_schedules (doctor_id, weekday, start_time, end_time) VALUES (%s, %s, %s, %s)",
+                    (doctor_id, weekday, start, end)
+                )
+
+    # сначала сбрасываем шаблоны, потом сообщаем подписчикам — они перечитают уже новые
+    reference_cache.invalidate(SCHEDULES_KEY)
+    db.emit("doctor_schedules", "update", {"doctor_id": doctor_id, "weekday": weekday})
+
+
+def add_schedule_exception(
+    db: Database,
+    doctor_id: int,
+    start_day: date,
+    end_day: date,
+    is_working: bool,
+    start_time: Optional[time] = None,
+    end_time: Optional[time] = None
+) -> int:
+    """
+    Добавляет исключение из расписания врача на даты [start_day, end_day]:
+    is_working=False — отпуск / больничный (без времени — на весь день), True — дополнительная смена.
+    Возвращает id исключения.
+    """
+    if end_day < start_day:
+        raise ValueError("Конец периода исключения раньше начала.")
+    if (start_time is None) != (end_time is None):
+        raise ValueError("Время исключения задается началом и концом.")
+    if start_time is not None and end_time <= start_time:
+        raise ValueError("Конец интервала исключения должен быть позже начала.")
+    if is_working and start_time is None:
+        raise ValueError("Для дополнительной смены нужно указать время.")
+
+    query = """
+        INSERT INTO schedule_exceptions (doctor_id, start_day, end_day, start_time, end_time, is_working)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        RETURNING id
+    """
+
+    with db.connection():
+        with db.cursor() as cursor:
+            cursor.execute(query, (doctor_id, start_day, end_day, start_time, end_time, is_working))
+            exception_id = cursor.fetchone()[0]
+
+    reference_cache.invalidate(SCHEDULES_KEY)
+    db.emit("schedule_exceptions", "insert", {"id": exception_id, "doctor_id": doctor_id})
+    return exception_id
+
+
+def delete_schedule_exception(db: Database, exception_id: int) -> bool:
+    """Удаляет исключение из расписания. Возвращает True, если оно было"""
+    with db.connection():
+        with db.cursor() as cursor:
+            cursor.execute("DELETE FROM schedule_exceptions WHERE id = %s RETURNING doctor_id", (exception_id,))
+            row = cursor.fetchone()
+
+    reference_cache.invalidate(SCHEDULES_KEY)
+    if row is not None:
+        db.emit("schedule_exceptions", "delete", {"id": exception_id, "doctor_id": row[0]})
+    return row is not None
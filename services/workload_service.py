@@ -0,0 +1,209 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from db.database import READ, Database
+from db.models import WorkloadRow
+from services.appointment_service import get_doctors
+from services.schedule_service import DEFAULT_TEMPLATE, load_templates_between
+
+
+# периоды отчета о загрузке
+DAY = "day"
+WEEK = "week"
+
+PERIOD_STEPS = {
+    DAY: "1 day",
+    WEEK: "1 week",
+}
+
+
+def refresh_workload(db: Database) -> int:
+    """
+    Пересчитывает сводку doctor_day_stats по журналу doctor_day_changes и очищает журнал.
+    Обрабатываются только дни врачей, где записи создавались, переносились или отменялись;
+    остальные строки сводки не трогаются. Возвращает число пересчитанных (врач, день).
+
+    Выборка, пересчет и очистка журнала выполняются одним запросом, поэтому изменения,
+    зафиксированные параллельно, остаются в журнале до следующего обновления.
+    """
+    query = """
+        WITH
+            changed AS (
+                DELETE FROM doctor_day_changes
+                RETURNING doctor_id, day
+            ),
+            days AS (
+                SELECT DISTINCT doctor_id, day FROM changed
+            ),
+            hours AS (
+                SELECT
+                    d.doctor_id,
+                    d.day,
+                    EXTRACT(HOUR FROM a.date_time)::int AS hour,
+                    COUNT(*) AS booked,
+                    SUM(EXTRACT(EPOCH FROM a.end_time - a.date_time)) / 60 AS booked_minutes,
+                    MIN(a.date_time) AS first_slot,
+                    MAX(a.date_time) AS last_slot
+                FROM days d
+                JOIN appointment_history a
+                  ON a.doctor_id = d.doctor_id
+                 AND a.date_time >= d.day
+                 AND a.date_time < d.day + 1
+                GROUP BY d.doctor_id, d.day, hour
+            ),
+            fresh AS (
+                SELECT
+                    doctor_id,
+                    day,
+                    SUM(booked)::int AS booked,
+                    SUM(booked_minutes)::int AS booked_minutes,
+                    MIN(first_slot) AS first_slot,
+                    MAX(last_slot) AS last_slot,
+                    jsonb_object_agg(hour, booked) AS hourly
+                FROM hours
+                GROUP BY doctor_id, day
+            ),
+            removed AS (
+                -- дни, в которых не осталось записей, из сводки удаляются
+                DELETE FROM doctor_day_stats s
+                USING days d
+                WHERE s.doctor_id = d.doctor_id
+                  AND s.day = d.day
+                  AND NOT EXISTS (SELECT 1 FROM fresh f WHERE f.doctor_id = d.doctor_id AND f.day = d.day)
+            ),
+            upserted AS (
+                INSERT INTO doctor_day_stats (doctor_id, day, booked, booked_minutes, first_slot, last_slot, hourly)
+                SELECT doctor_id, day, booked, booked_minutes, first_slot, last_slot, hourly
+                FROM fresh
+                ON CONFLICT (doctor_id, day) DO UPDATE SET
+                    booked = EXCLUDED.booked,
+                    booked_minutes = EXCLUDED.booked_minutes,
+                    first_slot = EXCLUDED.first_slot,
+                    last_slot = EXCLUDED.last_slot,
+                    hourly = EXCLUDED.hourly
+            )
+        SELECT COUNT(*) FROM days
+    """
+
+    with db.cursor() as cursor:
+        cursor.execute(query)
+        return cursor.fetchone()[0]
+
+
+def rebuild_workload(db: Database) -> int:
+    """
+    Строит сводку doctor_day_stats заново по всей истории записей (первое заполнение
+    или восстановление после ручных правок). Возвращает число (врач, день) в сводке.
+    """
+    with db.connection():
+        with db.cursor() as cursor:
+            cursor.execute("TRUNCATE doctor_day_stats, doctor_day_changes")
+            cursor.execute("""
+                INSERT INTO doctor_day_changes (doctor_id, day)
+                SELECT DISTINCT doctor_id, date_time::date
+                FROM appointment_history
+            """)
+
+        return refresh_workload(db)
+
+
+def get_workload(db: Database, start: date, end: date, period: str = DAY) -> list[WorkloadRow]:
+    """
+    Загрузка каждого врача по дням (DAY) или неделям (WEEK) за [start, end] — только по сводке doctor_day_stats.
+    В отчет попадают все врачи справочника, в том числе без записей за период.
+    Емкость — рабочие минуты врача по его расписанию (с выходными и исключениями) в днях периода,
+    попавших в [start, end].
+    Строки упорядочены по периоду и id врача.
+    """
+    if period not in PERIOD_STEPS:
+        raise ValueError(f"Неизвестный период отчета: {period}")
+
+    query = """
+        WITH capacity AS (
+            SELECT *
+            FROM unnest(%(capacity_doctor_ids)s::int[], %(capacity_days)s::date[], %(capacity_minutes)s::int[])
+                AS c(doctor_id, day, minutes)
+        ),
+        periods AS (
+            SELECT
+                p::date AS period_start,
+                GREATEST(p::date, %(start)s) AS from_day,
+                LEAST((p + %(step)s::interval)::date, %(end)s + 1) AS to_day
+            FROM generate_series(
+                date_trunc(%(period)s, %(start)s::date),
+                %(end)s::date,
+                %(step)s::interval
+            ) AS p
+        )
+        SELECT
+            d.doctor_id,
+            p.period_start,
+            COALESCE(SUM(s.booked), 0)::int,
+            COALESCE(SUM(s.booked_minutes), 0)::int,
+            (
+                SELECT COALESCE(SUM(c.minutes), 0)
+                FROM capacity c
+                WHERE c.doctor_id = d.doctor_id
+                  AND c.day >= p.from_day
+                  AND c.day < p.to_day
+            )::int,
+            MIN(s.first_slot),
+            MAX(s.last_slot)
+        FROM unnest(%(doctor_ids)s::int[]) AS d(doctor_id)
+        CROSS JOIN periods p
+        LEFT JOIN doctor_day_stats s
+          ON s.doctor_id = d.doctor_id
+         AND s.day >= p.from_day
+         AND s.day < p.to_day
+        GROUP BY d.doctor_id, p.period_start, p.from_day, p.to_day
+        ORDER BY p.period_start, d.doctor_id
+    """
+
+    # врачи берутся из кэша справочника, а не из таблицы doctors
+    doctor_ids = sorted(get_doctors(db))
+
+    # емкость по дням считается по шаблонам расписания с исключениями периода
+    templates = load_templates_between(db, start, end)
+    capacity_doctor_ids, capacity_days, capacity_minutes = [], [], []
+    for doctor_id in doctor_ids:
+        template = templates.get(doctor_id, DEFAULT_TEMPLATE)
+        for i in range((end - start).days + 1):
+            day = start + timedelta(days=i)
+            capacity_doctor_ids.append(doctor_id)
+            capacity_days.append(day)
+            capacity_minutes.append(template.work_minutes(day))
+
+    params = {
+        "start": start,
+        "end": end,
+        "period": period,
+        "step": PERIOD_STEPS[period],
+        "doctor_ids": doctor_ids,
+        "capacity_doctor_ids": capacity_doctor_ids,
+        "capacity_days": capacity_days,
+        "capacity_minutes": capacity_minutes,
+    }
+
+    with db.cursor(row_factory=WorkloadRow, mode=READ) as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+
+def get_peak_hours(db: Database, start: date, end: date, doctor_id: Optional[int] = None) -> dict[int, int]:
+    """
+    Записи по часам начала приема за [start, end] (по всем врачам или по одному): час -> число записей.
+    Читается только сводка doctor_day_stats.
+    """
+    query = """
+        SELECT h.key::int, SUM(h.value::int)::int
+        FROM doctor_day_stats s
+        CROSS JOIN jsonb_each_text(s.hourly) AS h
+        WHERE s.day BETWEEN %s AND %s
+          AND (%s::int IS NULL OR s.doctor_id = %s)
+        GROUP BY 1
+        ORDER BY 1
+    """
+
+    with db.cursor(mode=READ) as cursor:
+        cursor.execute(query, (start, end, doctor_id, doctor_id))
+        return dict(cursor.fetchall())
@@ -0,0 +1,88 @@
+"""
+Интеграционные тесты с настоящей PostgreSQL 14+.
+
+Запускаются, только если задана переменная окружения CLINIC_TEST_DSN — строка подключения
+к отдельной пустой базе (пользователь — владелец базы): перед каждым тестом схема public
+пересоздается из schema.sql. Без CLINIC_TEST_DSN тесты пропускаются.
+CLINIC_TEST_REPLICA_DSN — реплика для тестов чтения с реплик (по умолчанию та же база).
+"""
+import os
+from datetime import date, timedelta
+from pathlib import Path
+
+import psycopg2
+import pytest
+
+from db.database import Database
+from services.appointment_service import use_availability_matrix
+from services.reference_cache import reference_cache
+
+
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / "schema.sql"
+
+
+@pytest.fixture(scope="session")
+def dsn() -> str:
+    """Строка подключения к тестовой базе (без нее тест пропускается)"""
+    value = os.environ.get("CLINIC_TEST_DSN")
+    if not value:
+        pytest.skip("CLINIC_TEST_DSN не задана: интеграционные тесты пропущены")
+    return value
+
+
+@pytest.fixture(scope="session")
+def replica_dsn(dsn) -> str:
+    """Строка подключения к реплике (по умолчанию — та же база, что и основной сервер)"""
+    return os.environ.get("CLINIC_TEST_REPLICA_DSN") or dsn
+
+
+@pytest.fixture
+def schema(dsn) -> None:
+    """Пересоздает схему public и загружает schema.sql с тестовыми данными"""
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DROP SCHEMA public CASCADE")
+            cursor.execute("CREATE SCHEMA public")
+            cursor.execute(SCHEMA_PATH.read_text(encoding="utf-8"))
+    finally:
+        conn.close()
+
+    # кэши процесса не должны пережить пересоздание базы
+    reference_cache.invalidate()
+    use_availability_matrix(None)
+
+
+@pytest.fixture
+def make_db(dsn, schema):
+    """Фабрика подключенных Database к тестовой базе; все созданные закрываются после теста"""
+    created = []
+
+    def make(**options) -> Database:
+        options.setdefault("dsn", dsn)
+        database = Database(**options)
+        database.connect()
+        created.append(database)
+        return database
+
+    yield make
+
+    for database in created:
+        database.close()
+    reference_cache.invalidate()
+
+
+@pytest.fixture
+def db(make_db) -> Database:
+    """Database к пересозданной тестовой базе"""
+    return make_db(max_connections=10)
+
+
+@pytest.fixture
+def workday() -> date:
+    """Ближайший будний день после сегодняшнего: первый врач тестовых данных работает 09:00–17:00"""
+    day = date.today() + timedelta(days=1)
+    while day.isoweekday() > 5:
+        day += timedelta(days=1)
+    return day
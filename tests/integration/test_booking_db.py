@@ -0,0 +1,103 @@
+import threading
+from datetime import datetime, time, timedelta
+
+from services.appointment_service import (
+    BOOKED,
+    DOCTOR_NOT_FOUND,
+    INVALID_INTERVAL,
+    OUTSIDE_SCHEDULE,
+    PATIENT_NOT_FOUND,
+    SLOT_TAKEN,
+    SlotTakenError,
+    create_appointment,
+    create_appointments_batch,
+    delete_appointment,
+)
+from services.workload_service import get_workload, refresh_workload
+
+
+def at(day, hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(day, time(hour, minute))
+
+
+def count_appointments(db, doctor_id: int) -> int:
+    with db.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM appointments WHERE doctor_id = %s", (doctor_id,))
+        return cursor.fetchone()[0]
+
+
+def test_concurrent_bookings_of_overlapping_slots_have_one_winner(db, workday):
+    # половина сессий берет 10:00, половина — пересекающиеся 10:15: проверки до вставки
+    # проходят у всех, и победителя выбирает ограничение-исключение секции
+    starts = [at(workday, 10), at(workday, 10, 15)] * 4
+    barrier = threading.Barrier(len(starts))
+    booked, taken, errors = [], [], []
+
+    def book(patient_id: int, start: datetime) -> None:
+        barrier.wait()
+        try:
+            booked.append(create_appointment(db, patient_id, 1, start))
+        except SlotTakenError:
+            taken.append(start)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=book, args=(i % 4 + 1, start))
+        for i, start in enumerate(starts)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(booked) == 1
+    assert len(taken) == len(starts) - 1
+    assert count_appointments(db, 1) == 1
+
+
+def test_batch_reports_status_of_each_item(db, workday):
+    create_appointment(db, 1, 1, at(workday, 12))
+
+    results = create_appointments_batch(db, [
+        (1, 1, at(workday, 10)),
+        (999, 1, at(workday, 11)),
+        (1, 999, at(workday, 11)),
+        (2, 1, at(workday, 10, 15)), # пересекается с первым элементом пакета
+        (3, 1, at(workday, 12)), # занято записью вне пакета
+        (4, 1, at(workday, 20)),
+        (1, 1, at(workday, 23, 45), timedelta(minutes=30)),
+        (2, 2, at(workday, 10) if workday.isoweekday() in (1, 3, 5) else at(workday, 14)),
+    ])
+
+    assert [result.status for result in results] == [
+        BOOKED, PATIENT_NOT_FOUND, DOCTOR_NOT_FOUND, SLOT_TAKEN, SLOT_TAKEN, OUTSIDE_SCHEDULE, INVALID_INTERVAL, BOOKED
+    ]
+    assert all(result.appointment_id is not None for result in results if result.ok)
+    assert count_appointments(db, 1) == 2
+    assert count_appointments(db, 2) == 1
+
+
+def test_workload_refresh_follows_bookings_and_cancellations(db, workday):
+    first = create_appointment(db, 1, 1, at(workday, 10))
+    second = create_appointment(db, 2, 1, at(workday, 11))
+
+    assert refresh_workload(db) == 1
+    row = next(row for row in get_workload(db, workday, workday) if row.doctor_id == 1)
+    assert (row.booked, row.booked_minutes) == (2, 60)
+    assert (row.first_slot, row.last_slot) == (at(workday, 10), at(workday, 11))
+
+    assert delete_appointment(db, first, at(workday, 10))
+    assert refresh_workload(db) == 1
+    row = next(row for row in get_workload(db, workday, workday) if row.doctor_id == 1)
+    assert (row.booked, row.first_slot) == (1, at(workday, 11))
+
+    # отмена без времени приема тоже находит запись (по всем секциям)
+    assert delete_appointment(db, second)
+    assert refresh_workload(db) == 1
+    row = next(row for row in get_workload(db, workday, workday) if row.doctor_id == 1)
+    assert row.booked == 0
+
+    # журнал очищен: повторное обновление ничего не пересчитывает
+    assert refresh_workload(db) == 0
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import psycopg2
+
+from services.patient_service import bulk_register_patients, get_owner_by_phone
+
+
+def test_copy_import_reports_rejected_lines(db):
+    result = bulk_register_patients(db, [
+        ("Орлова Мария Игоревна", "+79990000001", "Пушок", "Кот"),
+        ("Орлова Мария Игоревна", "+79990000001", "Рыжик", "Кот"), # тот же владелец
+        ("Другое Имя", "+79161234567", "Бобик", "Собака"), # телефон Иванова из тестовых данных
+        ("Иванов Иван Иванович", "+79161234567", "Тузик", "Собака"), # Иванов — добавится к нему
+        ("Лебедев Олег", "+79990000002", "Гоша", "Попугай"),
+        ("Лебедева Ольга", "+79990000002", "Кеша", "Попугай"), # телефон выше указан с другим ФИО
+        ("Без телефона", "89990000003", "Марс", "Кот"),
+        ("Пустая кличка", "+79990000004", "", "Кот"),
+        ("Слишком длинная кличка", "+79990000005", "К" * 101, "Кот"),
+        ("Только три поля", "+79990000006", "Кот"),
+    ])
+
+    assert [line_no for line_no, _ in result.rejects] == [3, 6, 7, 8, 9, 10]
+    assert "Иванов Иван Иванович" in result.rejects[0][1]
+    assert "Лебедев Олег" in result.rejects[1][1]
+    assert result.imported == 4
+    assert result.owners_created == 2
+
+    with db.cursor() as cursor:
+        cursor.execute("""
+            SELECT p.name
+            FROM patients p
+            JOIN owners o ON o.id = p.owner_id
+            WHERE o.phone = '+79161234567'
+            ORDER BY p.id
+        """)
+        assert [name for name, in cursor.fetchall()] == ["Барсик", "Шарик", "Тузик"]
+
+
+def wait_for_lock(conn, timeout: float = 10.0) -> None:
+    """Ждет, пока какой-нибудь другой сеанс встанет в ожидание блокировки"""
+    deadline = time.monotonic() + timeout
+    with conn.cursor() as cursor:
+        while time.monotonic() < deadline:
+            cursor.execute("""
+                SELECT 1
+                FROM pg_stat_activity
+                WHERE pid <> pg_backend_pid()
+                  AND datname = current_database()
+                  AND wait_event_type = 'Lock'
+            """)
+            if cursor.fetchone() is not None:
+                return
+            time.sleep(0.05)
+    raise AssertionError("импорт не дошел до ожидания блокировки")
+
+
+def test_import_rejects_owner_saved_concurrently_with_other_name(db, dsn):
+    other = psycopg2.connect(dsn)
+    monitor = psycopg2.connect(dsn)
+    monitor.autocommit = True
+    outcome = {}
+
+    try:
+        # параллельная регистрация владельца с тем же телефоном еще не зафиксирована
+        with other.cursor() as cursor:
+            cursor.execute("INSERT INTO owners (full_name, phone) VALUES ('Новиков Петр', '+79990000009')")
+
+        def run_import():
+            outcome["result"] = bulk_register_patients(db, [
+                ("Новикова Анна", "+79990000009", "Снежок", "Кот"),
+                ("Орлова Мария Игоревна", "+79990000001", "Пушок", "Кот"),
+            ])
+
+        thread = threading.Thread(target=run_import)
+        thread.start()
+
+        # вставка владельцев ждет исхода чужой вставки того же телефона
+        wait_for_lock(monitor)
+        other.commit()
+        thread.join(timeout=30)
+    finally:
+        other.close()
+        monitor.close()
+
+    result = outcome["result"]
+    assert [line_no for line_no, _ in result.rejects] == [1]
+    assert "Новиков Петр" in result.rejects[0][1]
+    assert result.imported == 1
+
+    owner = get_owner_by_phone(db, "+79990000009")
+    with db.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM patients WHERE owner_id = %s", (owner.id,))
+        assert cursor.fetchone()[0] == 0
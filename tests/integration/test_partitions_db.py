@@ -0,0 +1,81 @@
+from datetime import date, datetime, time
+
+import pytest
+
+from services.appointment_service import NoPartitionError, create_appointment
+from services.partition_service import (
+    add_months,
+    archive_partitions,
+    ensure_partitions,
+    get_partitions,
+    maintain_partitions,
+    month_start,
+)
+
+
+def partition_name(month: date) -> str:
+    return f"appointments_{month:%Y_%m}"
+
+
+def insert_past_appointment(db, when: datetime) -> int:
+    # прошлые приемы создаются напрямую: сервис записи проверяет расписание и горизонт записи
+    with db.cursor() as cursor:
+        cursor.execute(
+            """
+                INSERT INTO appointments (patient_id, doctor_id, date_time, end_time)
+                VALUES (1, 1, %s, %s + interval '30 minutes')
+                RETURNING id
+            """,
+            (when, when)
+        )
+        return cursor.fetchone()[0]
+
+
+def history_ids(db) -> set[int]:
+    with db.cursor() as cursor:
+        cursor.execute("SELECT id FROM appointment_history")
+        return {appointment_id for appointment_id, in cursor.fetchall()}
+
+
+def test_ensure_partitions_creates_missing_months_once(db):
+    first = add_months(month_start(date.today()), 5)
+    last = add_months(first, 1)
+
+    assert ensure_partitions(db, first, last) == [partition_name(first), partition_name(last)]
+    assert ensure_partitions(db, first, last) == []
+    assert {name for name, _ in get_partitions(db)} >= {partition_name(first), partition_name(last)}
+
+
+def test_booking_into_month_without_partition_is_rejected(db):
+    day = add_months(month_start(date.today()), 8)
+    while day.isoweekday() > 5:
+        day = day.replace(day=day.day + 1)
+
+    with pytest.raises(NoPartitionError):
+        create_appointment(db, 1, 1, datetime.combine(day, time(10)))
+
+
+def test_archive_moves_old_partitions_out_of_hot_table(db):
+    today = date.today()
+    old = add_months(month_start(today), -14)
+    older = add_months(old, -1)
+    ensure_partitions(db, older, old)
+    kept = insert_past_appointment(db, datetime.combine(old, time(10)))
+    dropped = insert_past_appointment(db, datetime.combine(older, time(10)))
+
+    # старший месяц только отсоединяется, младший переносится в архив
+    assert archive_partitions(db, old, detach_only=True) == [partition_name(older)]
+    created, archived = maintain_partitions(db, today=today, archive_after_months=12)
+
+    assert created == []
+    assert archived == [partition_name(old)]
+    assert [name for name, _ in get_partitions(db, "appointments_archive")] == [partition_name(old)]
+    assert all(month >= month_start(today) for _, month in get_partitions(db))
+
+    # архивная секция остается в истории, отсоединенная — отдельная таблица вне нее
+    ids = history_ids(db)
+    assert kept in ids
+    assert dropped not in ids
+    with db.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM "{partition_name(older)}"')
+        assert cursor.fetchone()[0] == 1
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from db.database import READ, READ_PRIMARY, WRITE
+from services.patient_service import register_patient, search_patients
+
+
+# соединения с основным сервером передают метку процесса clinic.origin, соединения с репликой — нет
+ORIGIN_QUERY = "SELECT current_setting('clinic.origin', true)"
+
+UNREACHABLE_REPLICA = "host=127.0.0.1 port=1 dbname=clinic connect_timeout=1"
+
+
+def served_by_primary(db, mode: str) -> bool:
+    with db.cursor(mode=mode) as cursor:
+        cursor.execute(ORIGIN_QUERY)
+        return cursor.fetchone()[0] == db.origin
+
+
+@pytest.fixture
+def replicated(make_db, replica_dsn):
+    return make_db(replica_dsns=[replica_dsn], read_your_writes=0.5)
+
+
+def test_reads_go_to_replica_and_writes_to_primary(replicated):
+    assert not served_by_primary(replicated, READ)
+    assert served_by_primary(replicated, READ_PRIMARY)
+    assert served_by_primary(replicated, WRITE)
+
+
+def test_reads_stay_on_primary_within_read_your_writes_window(replicated):
+    patient = register_patient(replicated, "Зайцева Нина", "+79990000010", "Граф", "Кот")
+
+    assert served_by_primary(replicated, READ)
+    assert patient.id in [row.id for row in search_patients(replicated, "Граф")]
+
+    time.sleep(0.6)
+    assert not served_by_primary(replicated, READ)
+
+
+def test_window_is_per_thread(replicated):
+    register_patient(replicated, "Зайцева Нина", "+79990000010", "Граф", "Кот")
+    other = {}
+    thread = threading.Thread(target=lambda: other.setdefault("primary", served_by_primary(replicated, READ)))
+    thread.start()
+    thread.join()
+
+    assert served_by_primary(replicated, READ)
+    assert other["primary"] is False
+
+
+def test_primary_block_inside_replica_block_is_an_error(replicated):
+    with replicated.connection(mode=READ):
+        with pytest.raises(RuntimeError):
+            with replicated.connection(mode=WRITE):
+                pass
+        with pytest.raises(RuntimeError):
+            with replicated.connection(mode=READ_PRIMARY):
+                pass
+
+
+def test_unreachable_replica_falls_back_to_primary(make_db):
+    db = make_db(replica_dsns=[UNREACHABLE_REPLICA])
+
+    assert served_by_primary(db, READ)
+    assert served_by_primary(db, READ) # реплика пропускается без повторной попытки подключения
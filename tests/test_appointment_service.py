@@ -0,0 +1,153 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from psycopg2 import errorcodes
+
+from services.appointment_service import (
+    BOOKING_MESSAGES,
+    DOCTOR_NOT_FOUND,
+    INVALID_INTERVAL,
+    NO_PARTITION,
+    PATIENT_NOT_FOUND,
+    SLOT_TAKEN,
+    BookingError,
+    DoctorNotFoundError,
+    NoPartitionError,
+    PatientNotFoundError,
+    SlotTakenError,
+    booking_error,
+    check_interval,
+    create_appointments_batch,
+    delete_appointment_query,
+    doctor_exists,
+    earliest_slots_params,
+    violation_status,
+)
+from services.reference_cache import reference_cache
+
+
+def test_overlap_constraint_means_slot_taken():
+    constraint = "appointments_2026_10_no_doctor_overlap"
+
+    assert violation_status(errorcodes.EXCLUSION_VIOLATION, constraint) == SLOT_TAKEN
+    assert violation_status(errorcodes.UNIQUE_VIOLATION, constraint) == SLOT_TAKEN
+
+
+def test_unrelated_unique_violation_is_not_mapped():
+    assert violation_status(errorcodes.UNIQUE_VIOLATION, "appointments_pkey") is None
+    assert violation_status(errorcodes.EXCLUSION_VIOLATION, None) is None
+
+
+def test_foreign_keys_map_to_not_found():
+    assert violation_status(errorcodes.FOREIGN_KEY_VIOLATION, "fk_appointments_patient") == PATIENT_NOT_FOUND
+    assert violation_status(errorcodes.FOREIGN_KEY_VIOLATION, "fk_appointments_doctor") == DOCTOR_NOT_FOUND
+    assert violation_status(errorcodes.FOREIGN_KEY_VIOLATION, "fk_patients_owner") is None
+
+
+def test_missing_partition_is_mapped():
+    assert violation_status(errorcodes.CHECK_VIOLATION, None) == NO_PARTITION
+
+
+def test_other_errors_are_not_mapped():
+    assert violation_status(errorcodes.CHECK_VIOLATION, "check_appointment_duration") is None
+    assert violation_status(None, None) is None
+
+
+def test_booking_error_types():
+    assert isinstance(booking_error(PATIENT_NOT_FOUND), PatientNotFoundError)
+    assert isinstance(booking_error(DOCTOR_NOT_FOUND), DoctorNotFoundError)
+    assert isinstance(booking_error(SLOT_TAKEN), SlotTakenError)
+    assert isinstance(booking_error(SLOT_TAKEN), BookingError)
+    assert isinstance(booking_error(SLOT_TAKEN), ValueError)
+    assert isinstance(booking_error(NO_PARTITION), NoPartitionError)
+
+
+def test_booking_error_message():
+    assert str(booking_error(SLOT_TAKEN)) == BOOKING_MESSAGES[SLOT_TAKEN]
+
+
+def test_check_interval():
+    check_interval(datetime(2026, 10, 19, 23, 30), timedelta(minutes=30))
+
+    with pytest.raises(ValueError):
+        check_interval(datetime(2026, 10, 19, 23, 30), timedelta(minutes=60))
+    with pytest.raises(ValueError):
+        check_interval(datetime(2026, 10, 19, 10), timedelta(0))
+
+
+def test_batch_marks_invalid_intervals_per_item():
+    # все элементы отбракованы до обращения к БД
+    results = create_appointments_batch(None, [
+        (1, 2, datetime(2026, 10, 19, 10, 0), timedelta(0)),
+        (1, 2, datetime(2026, 10, 19, 23, 30), timedelta(hours=1)),
+    ])
+
+    assert [result.status for result in results] == [INVALID_INTERVAL, INVALID_INTERVAL]
+    assert results[0].message == BOOKING_MESSAGES[INVALID_INTERVAL]
+
+
+def test_earliest_slots_params_describe_server_side_grid():
+    params = earliest_slots_params(datetime(2026, 10, 19, 12, 15), 5, {3, 1}, timedelta(minutes=60), 3)
+
+    assert params["doctor_ids"] == [1, 3]
+    assert params["first_day"] == datetime(2026, 10, 19)
+    assert params["last_day"] == datetime(2026, 10, 21)
+    assert (params["work_start"], params["work_end"]) == (timedelta(hours=9), timedelta(hours=17))
+    assert params["duration"] == timedelta(minutes=60)
+
+
+def test_delete_with_known_time_filters_by_partition_key():
+    query, params = delete_appointment_query(7, datetime(2026, 10, 19, 10, 0))
+    assert "date_time = %s" in query
+    assert params == (7, datetime(2026, 10, 19, 10, 0))
+
+    query, params = delete_appointment_query(7, None)
+    assert "date_time" not in query.split("RETURNING")[0]
+    assert params == (7,)
+
+
+class ProbeDatabase:
+    """БД со справочником врачей, которая считает запросы к ней"""
+
+    def __init__(self, doctors: dict[int, str]):
+        self.doctors = doctors
+        self.loads = 0
+        self.probes = 0
+        self._result = []
+
+    @contextmanager
+    def cursor(self, row_factory=None, mode=None):
+        yield self
+
+    def execute(self, query, params=None):
+        self.loads += 1
+        self._result = list(self.doctors.items())
+
+    def execute_prepared(self, cursor, statement, params):
+        self.probes += 1
+        self._result = [(1,)] if params[0] in self.doctors else []
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+
+def test_unknown_doctor_is_probed_without_reloading_directory():
+    reference_cache.invalidate("doctors")
+    db = ProbeDatabase({1: "Смирнова"})
+
+    try:
+        assert doctor_exists(db, 1)
+        assert not doctor_exists(db, 99)
+        assert not doctor_exists(db, 99)
+        assert (db.loads, db.probes) == (1, 2)
+
+        db.doctors[2] = "Кузнецов" # добавлен в другом процессе
+        assert doctor_exists(db, 2)
+        assert doctor_exists(db, 2)
+        assert (db.loads, db.probes) == (2, 3)
+    finally:
+        reference_cache.invalidate("doctors")
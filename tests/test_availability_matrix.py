@@ -0,0 +1,249 @@
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from db.events import RESYNC
+from services.appointment_service import get_availability_range, get_available_slots_for_day, use_availability_matrix
+from services.availability_matrix import AvailabilityMatrix
+from services.reference_cache import reference_cache
+from services.schedule_service import SCHEDULES_KEY
+
+
+MONDAY = date(2026, 10, 19)
+TUESDAY = MONDAY + timedelta(days=1)
+PAST = datetime(2026, 1, 1) # now для free_slots: прошедших слотов в окне матрицы нет
+
+
+def at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(day, time(hour, minute))
+
+
+class FakeCursor:
+    def __init__(self, db: "FakeDatabase"):
+        self._db = db
+        self._rows: list = []
+
+    def execute(self, query, params=None):
+        if "FROM doctor_schedules" in query:
+            self._rows = list(self._db.schedule_rows)
+            return
+        if "FROM schedule_exceptions" in query:
+            self._rows = list(self._db.exception_rows)
+            return
+
+        # запрос матрицы: врачи и их записи в окне
+        rows = []
+        for doctor_id in self._db.doctor_ids:
+            booked = [(start, end) for d, start, end in self._db.appointments if d == doctor_id]
+            rows.extend((doctor_id, start, end) for start, end in booked or [(None, None)])
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeDatabase:
+    """Database без сервера: отдает заранее заданные строки и рассылает события сразу"""
+
+    def __init__(self, doctor_ids, appointments=(), schedule_rows=(), exception_rows=()):
+        self.doctor_ids = list(doctor_ids)
+        self.appointments = list(appointments)
+        self.schedule_rows = list(schedule_rows)
+        self.exception_rows = list(exception_rows)
+        self._listeners: dict[str, list] = {}
+
+    @contextmanager
+    def cursor(self, row_factory=None, mode=None):
+        yield FakeCursor(self)
+
+    def subscribe(self, table, listener):
+        self._listeners.setdefault(table, []).append(listener)
+
+    def unsubscribe(self, table, listener):
+        self._listeners[table].remove(listener)
+
+    def emit(self, table, op, row):
+        for listener in self._listeners.get(table, []):
+            listener(op, row)
+
+
+@pytest.fixture(autouse=True)
+def fresh_templates():
+    reference_cache.invalidate(SCHEDULES_KEY)
+    yield
+    reference_cache.invalidate(SCHEDULES_KEY)
+
+
+def loaded(db: FakeDatabase, days: int = 2) -> AvailabilityMatrix:
+    matrix = AvailabilityMatrix(MONDAY, days)
+    matrix.load(db)
+    return matrix
+
+
+def test_free_slots_follow_default_schedule():
+    matrix = loaded(FakeDatabase([1]))
+
+    slots = matrix.free_slots(1, MONDAY, now=PAST)
+
+    assert slots[0] == at(MONDAY, 9)
+    assert slots[-1] == at(MONDAY, 16, 30)
+    assert len(slots) == 16
+
+
+def test_loaded_appointments_are_busy():
+    matrix = loaded(FakeDatabase([1, 2], [(1, at(MONDAY, 10), at(MONDAY, 11))]))
+
+    assert not matrix.is_free(1, at(MONDAY, 10))
+    assert not matrix.is_free(1, at(MONDAY, 10, 30))
+    assert matrix.is_free(1, at(MONDAY, 11))
+    assert matrix.doctors_free_at(at(MONDAY, 10)) == [2]
+    assert at(MONDAY, 10) not in matrix.free_slots(1, MONDAY, now=PAST)
+
+
+def test_mark_busy_and_free_update_bits():
+    matrix = loaded(FakeDatabase([1]))
+
+    matrix.mark_busy(1, at(MONDAY, 10))
+    assert not matrix.is_free(1, at(MONDAY, 10))
+
+    matrix.mark_free(1, at(MONDAY, 10))
+    assert matrix.is_free(1, at(MONDAY, 10))
+
+
+def test_interval_marks_every_overlapped_slot():
+    matrix = loaded(FakeDatabase([1]))
+
+    # прием 10:15–10:45 задевает два слота сетки
+    matrix.mark_busy(1, at(MONDAY, 10, 15), at(MONDAY, 10, 45))
+    assert not matrix.is_free(1, at(MONDAY, 10))
+    assert not matrix.is_free(1, at(MONDAY, 10, 30))
+
+    matrix.mark_free(1, at(MONDAY, 10, 15), at(MONDAY, 10, 45))
+    assert matrix.is_free(1, at(MONDAY, 10))
+    assert matrix.is_free(1, at(MONDAY, 10, 30))
+
+
+def test_longer_duration_needs_consecutive_free_slots():
+    matrix = loaded(FakeDatabase([1], [(1, at(MONDAY, 10), at(MONDAY, 10, 30))]))
+
+    slots = matrix.free_slots(1, MONDAY, timedelta(hours=1), now=PAST)
+
+    assert at(MONDAY, 9) in slots
+    assert at(MONDAY, 9, 30) not in slots
+    assert at(MONDAY, 10) not in slots
+    assert at(MONDAY, 10, 30) in slots
+    assert not matrix.is_free(1, at(MONDAY, 9, 30), timedelta(hours=1))
+
+
+def test_slots_outside_schedule_are_closed():
+    # врач работает только по понедельникам 12:00–14:00
+    matrix = loaded(FakeDatabase([1], schedule_rows=[(1, 1, time(12), time(14))]))
+
+    assert matrix.free_slots(1, MONDAY, now=PAST) == [at(MONDAY, 12), at(MONDAY, 12, 30), at(MONDAY, 13), at(MONDAY, 13, 30)]
+    assert matrix.free_slots(1, TUESDAY, now=PAST) == []
+    assert not matrix.is_free(1, at(MONDAY, 9))
+    assert matrix.doctors_free_at(at(MONDAY, 9)) == []
+
+
+def test_schedule_change_rebuilds_closed_slots():
+    db = FakeDatabase([1])
+    matrix = loaded(db)
+    matrix.attach(db)
+
+    # день 2026-10-20 стал выходным; шаблоны сбрасываются в кэше до рассылки события
+    db.exception_rows.append((1, TUESDAY, TUESDAY, None, None, False))
+    reference_cache.invalidate(SCHEDULES_KEY)
+    db.emit("schedule_exceptions", "insert", {})
+
+    assert matrix.free_slots(1, TUESDAY, now=PAST) == []
+    assert len(matrix.free_slots(1, MONDAY, now=PAST)) == 16
+
+
+def test_today_skips_past_slots():
+    matrix = loaded(FakeDatabase([1]))
+
+    slots = matrix.free_slots(1, MONDAY, now=at(MONDAY, 12))
+
+    assert slots[0] == at(MONDAY, 12, 30)
+
+
+def test_events_update_attached_matrix():
+    db = FakeDatabase([1])
+    matrix = loaded(db)
+    matrix.attach(db)
+
+    row = {"doctor_id": 1, "date_time": at(TUESDAY, 9), "end_time": at(TUESDAY, 9, 30)}
+    db.emit("appointments", "insert", row)
+    assert not matrix.is_free(1, at(TUESDAY, 9))
+
+    db.emit("appointments", "delete", row)
+    assert matrix.is_free(1, at(TUESDAY, 9))
+
+    matrix.detach(db)
+    db.emit("appointments", "insert", row)
+    assert matrix.is_free(1, at(TUESDAY, 9))
+
+
+def test_resync_reloads_attached_matrix():
+    db = FakeDatabase([1])
+    matrix = loaded(db)
+    matrix.attach(db)
+
+    # изменение, о котором матрица не получила события
+    db.appointments.append((1, at(MONDAY, 9), at(MONDAY, 9, 30)))
+    assert matrix.is_free(1, at(MONDAY, 9))
+
+    db.emit("appointments", RESYNC, {})
+    assert not matrix.is_free(1, at(MONDAY, 9))
+
+
+def test_verify_reports_drift():
+    db = FakeDatabase([1])
+    matrix = loaded(db)
+    assert matrix.verify(db) == []
+
+    matrix.mark_busy(1, at(MONDAY, 9))
+    assert [(doctor_id, day) for doctor_id, day, _, _ in matrix.verify(db)] == [(1, MONDAY)]
+
+
+def test_day_outside_window_raises():
+    matrix = loaded(FakeDatabase([1]))
+
+    assert not matrix.covers(MONDAY + timedelta(days=2))
+    with pytest.raises(KeyError):
+        matrix.free_slots(1, MONDAY + timedelta(days=2))
+
+
+@pytest.fixture
+def attached_matrix():
+    yield
+    use_availability_matrix(None)
+
+
+def test_slot_search_reads_attached_matrix(attached_matrix):
+    # у FakeDatabase нет execute_prepared: поиск по БД упал бы
+    day = date.today() + timedelta(days=1)
+    db = FakeDatabase([1], [(1, at(day, 9), at(day, 10))])
+    matrix = AvailabilityMatrix(day, 2)
+    matrix.load(db)
+    use_availability_matrix(matrix)
+
+    slots = get_available_slots_for_day(db, 1, day)
+    assert len(slots) == 14
+    assert slots[0] == at(day, 10)
+
+    availability = get_availability_range(db, 1, day, 2)
+    assert list(availability) == [day, day + timedelta(days=1)]
+    assert availability[day] == slots
+
+
+def test_stale_matrix_window_moves_to_today(attached_matrix):
+    today = date.today()
+    db = FakeDatabase([1])
+    matrix = AvailabilityMatrix(today - timedelta(days=3), 5)
+    matrix.load(db)
+    use_availability_matrix(matrix)
+
+    get_available_slots_for_day(db, 1, today + timedelta(days=1))
+    assert matrix.start_day == today
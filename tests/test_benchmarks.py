@@ -0,0 +1,24 @@
+from benchmarks.run import percentile, summarize
+
+
+def test_percentile_nearest_rank():
+    samples = [float(value) for value in range(1, 101)]
+
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 95) == 95.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile(samples, 100) == 100.0
+
+
+def test_percentile_small_sample():
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([1.0, 2.0, 3.0], 0) == 1.0
+
+
+def test_summarize():
+    summary = summarize([3.0, 1.0, 2.0])
+
+    assert summary["min_ms"] == 1.0
+    assert summary["max_ms"] == 3.0
+    assert summary["p50_ms"] == 2.0
+    assert summary["mean_ms"] == 2.0
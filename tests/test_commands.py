@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pytest
+
+from cli.commands import CommandError, _csv_rows, build_parser, run_command
+from db.database import READ, READ_PRIMARY, WRITE
+
+
+@pytest.fixture
+def parser():
+    return build_parser()
+
+
+def test_book_arguments(parser):
+    args = parser.parse_args(["book", "1", "2", "2026-10-19T10:00", "--duration", "60"])
+
+    assert (args.patient_id, args.doctor_id, args.duration) == (1, 2, 60)
+    assert args.date_time == datetime(2026, 10, 19, 10, 0)
+
+
+def test_cancel_accepts_appointment_time(parser):
+    args = parser.parse_args(["cancel", "5", "--date-time", "2026-10-19T10:00"])
+
+    assert args.appointment_id == 5
+    assert args.date_time == datetime(2026, 10, 19, 10, 0)
+    assert parser.parse_args(["cancel", "5"]).date_time is None
+
+
+def test_slots_defaults(parser):
+    args = parser.parse_args(["--format", "csv", "slots", "3", "--start", "2026-10-19"])
+
+    assert args.format == "csv"
+    assert args.doctor_id == 3
+    assert args.start == date(2026, 10, 19)
+
+
+@pytest.mark.parametrize("argv", [
+    ["book", "1", "2", "завтра"],
+    ["book", "1", "2", "2026-10-19T10:00+03:00"],
+    ["slots", "--days", "0"],
+    ["patients", "search", "Барсик", "--limit", "-1"],
+    ["unknown"],
+])
+def test_invalid_arguments_raise_command_error(parser, argv):
+    with pytest.raises(CommandError):
+        parser.parse_args(argv)
+
+
+def test_csv_rows_flatten_nested_list():
+    rows = _csv_rows({"id": 1, "appointments": [{"id": 10}, {"id": 11}]})
+
+    assert rows == [{"id": 1, "appointments_id": 10}, {"id": 1, "appointments_id": 11}]
+
+
+class ModeRecorder:
+    """Database, запоминающий режимы открытых соединений"""
+
+    def __init__(self):
+        self.modes = []
+
+    @contextmanager
+    def connection(self, mode=WRITE):
+        self.modes.append(mode)
+        yield None
+
+
+@pytest.mark.parametrize("argv, modes", [
+    (["patients", "search", "Барсик"], [READ]),
+    (["slots", "3"], []),
+    (["card", "1"], [READ_PRIMARY]),
+    (["book", "1", "2", "2026-10-19T10:00"], [WRITE]),
+    (["cancel", "5"], [WRITE]),
+])
+def test_only_write_commands_open_write_connection(parser, argv, modes):
+    db = ModeRecorder()
+    args = parser.parse_args(argv)
+    args.handler = lambda db, args: None
+
+    run_command(db, args)
+
+    assert db.modes == modes
@@ -0,0 +1,90 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from db.events import ChangeNotifier
+from db.listener import NOTIFY_TABLES, NotificationListener, parse_change
+from services.reference_cache import ReferenceCache
+from services.schedule_service import SCHEDULES_KEY
+
+
+def message(**fields) -> str:
+    return json.dumps(fields)
+
+
+def test_parse_change_converts_timestamps():
+    table, op, origin, row = parse_change(message(
+        t="appointments", op="insert", o="abc",
+        r={"id": 1, "doctor_id": 2, "date_time": "2026-10-19T10:00:00", "end_time": "2026-10-19T10:30:00"}
+    ))
+
+    assert (table, op, origin) == ("appointments", "insert", "abc")
+    assert row["id"] == 1
+    assert row["date_time"] == datetime(2026, 10, 19, 10, 0)
+    assert row["end_time"] == datetime(2026, 10, 19, 10, 30)
+
+
+def test_parse_change_resync_without_row_and_origin():
+    assert parse_change(message(t="patients", op="resync")) == ("patients", "resync", None, {})
+
+
+def test_parse_change_rejects_malformed_payload():
+    with pytest.raises(ValueError):
+        parse_change("not json")
+    with pytest.raises(KeyError):
+        parse_change(message(op="insert"))
+
+
+def make_listener(origin="self"):
+    notifier = ChangeNotifier()
+    events = []
+    notifier.subscribe("appointments", lambda op, row: events.append((op, row)))
+    listener = NotificationListener(notifier, connect=lambda: None, origin=origin)
+    return listener, events
+
+
+def test_handle_dispatches_foreign_changes():
+    listener, events = make_listener()
+
+    listener.handle(message(t="appointments", op="delete", o="other", r={"id": 5}))
+
+    assert events == [("delete", {"id": 5})]
+    assert listener.received == 1
+
+
+def test_handle_skips_own_changes():
+    listener, events = make_listener()
+
+    listener.handle(message(t="appointments", op="insert", o="self", r={"id": 5}))
+
+    assert events == []
+    assert listener.skipped == 1
+
+
+def test_handle_ignores_malformed_payload():
+    listener, events = make_listener()
+
+    listener.handle("{")
+
+    assert events == []
+    assert listener.received == 0
+
+
+def test_foreign_schedule_changes_reset_templates():
+    notifier = ChangeNotifier()
+    cache = ReferenceCache()
+    cache.attach(notifier, "doctor_schedules", SCHEDULES_KEY)
+    cache.attach(notifier, "schedule_exceptions", SCHEDULES_KEY)
+    listener = NotificationListener(notifier, connect=lambda: None, origin="self")
+
+    for table in ("doctor_schedules", "schedule_exceptions"):
+        assert table in NOTIFY_TABLES
+        cache.store(SCHEDULES_KEY, {})
+        listener.handle(message(t=table, op="insert", o="other", r={"id": 1, "doctor_id": 2}))
+        assert cache.lookup(SCHEDULES_KEY) is None
+
+    cache.detach(notifier, "schedule_exceptions", SCHEDULES_KEY)
+    cache.store(SCHEDULES_KEY, {})
+    listener.handle(message(t="schedule_exceptions", op="delete", o="other", r={"id": 1}))
+    assert cache.lookup(SCHEDULES_KEY) == {}
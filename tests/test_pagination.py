@@ -0,0 +1,48 @@
+import pytest
+
+from services.pagination import NEXT, PREV, build_page, check_direction
+
+
+def test_first_page_with_more_rows():
+    page = build_page([1, 2, 3, 4], page_size=3, cursor=None, direction=NEXT, key=lambda row: row)
+
+    assert page.rows == [1, 2, 3]
+    assert page.has_next
+    assert not page.has_prev
+    assert page.next_cursor == 3
+    assert page.prev_cursor == 1
+
+
+def test_last_page_after_cursor():
+    page = build_page([4, 5], page_size=3, cursor=3, direction=NEXT, key=lambda row: row)
+
+    assert page.rows == [4, 5]
+    assert not page.has_next
+    assert page.has_prev
+
+
+def test_prev_page_is_reversed():
+    # для PREV запрос отдает строки по убыванию ключа
+    page = build_page([6, 5, 4, 3], page_size=3, cursor=7, direction=PREV, key=lambda row: row)
+
+    assert page.rows == [4, 5, 6]
+    assert page.has_next
+    assert page.has_prev
+    assert page.prev_cursor == 4
+    assert page.next_cursor == 6
+
+
+def test_empty_page():
+    page = build_page([], page_size=3, cursor=None, direction=NEXT, key=lambda row: row)
+
+    assert page.rows == []
+    assert not page.has_next
+    assert page.next_cursor is None
+    assert page.prev_cursor is None
+
+
+def test_check_direction():
+    check_direction(NEXT)
+    check_direction(PREV)
+    with pytest.raises(ValueError):
+        check_direction("sideways")
@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+from db.pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeInfo:
+    def __init__(self):
+        self.transaction_status = TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    """Соединение без сервера: хватает того, что пул читает и вызывает"""
+
+    def __init__(self):
+        self.closed = 0
+        self.info = FakeInfo()
+        self.rollbacks = 0
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+
+def make_pool(**kwargs) -> tuple[ConnectionPool, list[FakeConnection]]:
+    opened = []
+
+    def connect():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def test_opens_min_size_connections():
+    pool, opened = make_pool(min_size=2, max_size=4)
+
+    assert len(opened) == 2
+    assert pool.size == 2
+    assert pool.idle == 2
+
+
+def test_reuses_returned_connection():
+    pool, opened = make_pool(min_size=1, max_size=2)
+
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    assert pool.getconn() is conn
+    assert len(opened) == 1
+
+
+def test_grows_up_to_max_size():
+    pool, opened = make_pool(min_size=0, max_size=2)
+
+    first = pool.getconn()
+    second = pool.getconn()
+
+    assert first is not second
+    assert pool.size == 2
+    assert len(opened) == 2
+
+
+def test_getconn_times_out_when_exhausted():
+    pool, _ = make_pool(min_size=1, max_size=1)
+    pool.getconn()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn(timeout=0.05)
+
+
+def test_waiting_getconn_receives_released_connection():
+    pool, _ = make_pool(min_size=1, max_size=1)
+    conn = pool.getconn()
+    received = []
+
+    waiter = threading.Thread(target=lambda: received.append(pool.getconn(timeout=5)))
+    waiter.start()
+    pool.putconn(conn)
+    waiter.join(timeout=5)
+
+    assert received == [conn]
+
+
+def test_putconn_rolls_back_open_transaction():
+    pool, _ = make_pool(min_size=1, max_size=1)
+    conn = pool.getconn()
+    conn.info.transaction_status = TRANSACTION_STATUS_INTRANS
+
+    pool.putconn(conn)
+
+    assert conn.rollbacks == 1
+    assert pool.idle == 1
+
+
+def test_closed_connection_is_replaced():
+    pool, opened = make_pool(min_size=1, max_size=1)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.closed = 1
+
+    replacement = pool.getconn()
+
+    assert replacement is not conn
+    assert len(opened) == 2
+    assert pool.size == 1
+
+
+def test_failed_connect_releases_reserved_slot():
+    def connect():
+        raise OSError("нет сети")
+
+    pool = ConnectionPool(connect, min_size=0, max_size=1)
+
+    with pytest.raises(OSError):
+        pool.getconn()
+    assert pool.size == 0
+
+
+def test_closeall_closes_idle_and_rejects_getconn():
+    pool, opened = make_pool(min_size=2, max_size=2)
+
+    pool.closeall()
+
+    assert all(conn.closed for conn in opened)
+    assert pool.size == 0
+    with pytest.raises(RuntimeError):
+        pool.getconn()
+
+
+def test_rejects_invalid_sizes():
+    with pytest.raises(ValueError):
+        make_pool(min_size=3, max_size=2)
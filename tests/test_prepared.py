@@ -0,0 +1,15 @@
+from db.prepared import PreparedStatement
+
+
+def test_execute_and_prepare_sql():
+    statement = PreparedStatement("doctor_busy", "SELECT 1 WHERE $1 = $2", ("integer", "integer"))
+
+    assert statement.prepare_sql == "PREPARE doctor_busy (integer, integer) AS SELECT 1 WHERE $1 = $2"
+    assert statement.execute_sql == "EXECUTE doctor_busy(%s, %s)"
+
+
+def test_driver_query_keeps_parameter_types():
+    statement = PreparedStatement("search", "SELECT $1 LIKE '%x' OR $1 = $2", ("text", "varchar"))
+
+    assert statement.query == "SELECT %(p1)s::text LIKE '%%x' OR %(p1)s::text = %(p2)s::varchar"
+    assert statement.query_params(("a", "b")) == {"p1": "a", "p2": "b"}
@@ -0,0 +1,74 @@
+from datetime import date, datetime, time, timedelta
+
+from services.schedule_service import DEFAULT_TEMPLATE, compile_templates
+
+
+MONDAY = date(2026, 10, 19)
+TUESDAY = MONDAY + timedelta(days=1)
+HALF_HOUR = timedelta(minutes=30)
+HOUR = timedelta(hours=1)
+
+
+def at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(day, time(hour, minute))
+
+
+def test_default_template_slots():
+    slots = DEFAULT_TEMPLATE.slots(MONDAY, HALF_HOUR)
+
+    assert slots[0] == at(MONDAY, 9)
+    assert slots[-1] == at(MONDAY, 16, 30)
+    assert len(slots) == 16
+
+
+def test_slots_end_before_shift_end():
+    slots = DEFAULT_TEMPLATE.slots(MONDAY, HOUR)
+
+    assert slots[-1] == at(MONDAY, 16)
+    assert all(slot + HOUR <= at(MONDAY, 17) for slot in slots)
+
+
+def test_covers_requires_whole_interval_inside_shift():
+    assert DEFAULT_TEMPLATE.covers(at(MONDAY, 9), at(MONDAY, 9, 30))
+    assert DEFAULT_TEMPLATE.covers(at(MONDAY, 16, 30), at(MONDAY, 17))
+    assert not DEFAULT_TEMPLATE.covers(at(MONDAY, 8, 30), at(MONDAY, 9, 30))
+    assert not DEFAULT_TEMPLATE.covers(at(MONDAY, 16, 30), at(MONDAY, 17, 30))
+
+
+def test_weekly_schedule_with_break_and_day_off():
+    # понедельник: 09:00–12:00 и 13:00–15:00, остальные дни — выходные
+    templates = compile_templates(
+        [(1, 1, time(9), time(12)), (1, 1, time(13), time(15))],
+        []
+    )
+    template = templates[1]
+
+    assert not template.covers(at(MONDAY, 11, 30), at(MONDAY, 13, 30)) # через перерыв
+    assert template.covers(at(MONDAY, 13), at(MONDAY, 14))
+    assert template.slots(TUESDAY, HALF_HOUR) == []
+    assert template.work_minutes(MONDAY) == 300
+    assert at(MONDAY, 12) not in template.slots(MONDAY, HALF_HOUR)
+
+
+def test_exceptions_cut_and_extend_shifts():
+    templates = compile_templates(
+        [(1, 1, time(9), time(17)), (1, 2, time(9), time(17))],
+        [
+            (1, MONDAY, MONDAY, None, None, False), # весь день нерабочий
+            (1, TUESDAY, TUESDAY, time(17), time(19), True), # дополнительная смена
+        ]
+    )
+    template = templates[1]
+
+    assert template.slots(MONDAY, HALF_HOUR) == []
+    assert template.covers(at(TUESDAY, 16), at(TUESDAY, 19))
+    assert template.work_minutes(TUESDAY) == 600
+
+
+def test_exception_for_doctor_without_weekly_schedule_uses_default():
+    templates = compile_templates([], [(2, MONDAY, MONDAY, time(12), time(14), False)])
+    template = templates[2]
+
+    assert not template.covers(at(MONDAY, 12), at(MONDAY, 12, 30))
+    assert template.covers(at(MONDAY, 14), at(MONDAY, 14, 30))
+    assert template.slots(TUESDAY, HALF_HOUR) == DEFAULT_TEMPLATE.slots(TUESDAY, HALF_HOUR)
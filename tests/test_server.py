@@ -0,0 +1,73 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from server import MAX_BODY_BYTES, ClinicHTTPServer
+
+
+class NoStatsDatabase:
+    """Database без учета запросов: обработчикам этих тестов БД не нужна"""
+
+    query_stats = None
+
+
+@pytest.fixture
+def start_server():
+    servers = []
+
+    def start(**options):
+        server = ClinicHTTPServer(("127.0.0.1", 0), NoStatsDatabase(), max_concurrency=2, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return http.client.HTTPConnection(*server.server_address, timeout=5)
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def send(conn: http.client.HTTPConnection, method: str, path: str, headers=None, body=None):
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read()), response.will_close
+
+
+@pytest.mark.parametrize("length, status", [
+    ("-1", 400),
+    ("abc", 400),
+    (str(MAX_BODY_BYTES + 1), 413),
+])
+def test_bad_content_length_is_rejected_and_connection_closed(start_server, length, status):
+    conn = start_server()
+
+    # тело не отправляется: сервер не должен его ждать
+    conn.putrequest("POST", "/appointments")
+    conn.putheader("Content-Length", length)
+    conn.endheaders()
+    response = conn.getresponse()
+
+    assert response.status == status
+    assert "error" in json.loads(response.read())
+    assert response.will_close
+
+
+def test_stats_route_is_hidden_by_default(start_server):
+    conn = start_server()
+
+    status, payload, _ = send(conn, "GET", "/_stats/queries")
+
+    assert status == 404
+    assert payload == {"error": "Неизвестный адрес."}
+
+
+def test_stats_route_answers_loopback_when_exposed(start_server):
+    conn = start_server(expose_stats=True)
+
+    status, payload, _ = send(conn, "GET", "/_stats/queries")
+
+    assert status == 404
+    assert payload == {"error": "Учет запросов отключен."}